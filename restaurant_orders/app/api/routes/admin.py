@@ -0,0 +1,30 @@
+import secrets
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+
+from app.api.routes.webhook import printer_service
+from app.config import settings
+
+router = APIRouter()
+
+def require_admin_token(x_admin_token: str | None = Header(None)):
+    """Valida la cabecera X-Admin-Token contra ADMIN_API_TOKEN."""
+    if not settings.ADMIN_API_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin API is disabled")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, settings.ADMIN_API_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+@router.post("/admin/orders/{order_id}/reprint", dependencies=[Depends(require_admin_token)])
+async def reprint_order(order_id: int, station: str | None = None):
+    """Reimprime el ticket de un pedido directamente desde el journal de impresión."""
+    if station is not None and station not in printer_service.stations:
+        raise HTTPException(status_code=404, detail=f"Unknown printer station '{station}'")
+    try:
+        reprinted = await printer_service.reprint(order_id, station)
+    except Exception as e:
+        print(f"Error reprinting order {order_id}: {e}")
+        raise HTTPException(status_code=503, detail=f"Printer unavailable: {e}")
+
+    if not reprinted:
+        raise HTTPException(status_code=404, detail=f"No ticket for order {order_id} in the print journal")
+    return {"status": "reprinted", "order_id": order_id}
@@ -0,0 +1,17 @@
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Depends
+
+from app.api.routes.admin import require_admin_token
+from app.services.sales_rollups import sales_rollups
+
+router = APIRouter(dependencies=[Depends(require_admin_token)])
+
+@router.get("/analytics/sales")
+async def sales_summary(day: Optional[date] = None):
+    """
+    Ventas de un día de servicio (hoy por defecto): totales, por hora, por
+    producto y por método de pago, leídos de los agregados por hora.
+    """
+    return await sales_rollups.day_summary(day)
@@ -1,12 +1,14 @@
-from fastapi import APIRouter, Form
+from fastapi import APIRouter, Depends, Form
 from fastapi.responses import HTMLResponse
 from sqlalchemy.future import select
 from sqlalchemy import update
 import bcrypt
 from datetime import datetime
 
-from app.database.connection import get_session
+from app.database.unit_of_work import UnitOfWork, get_unit_of_work
+from app.database.hot_queries import hot_queries
 from app.models.user import User, UserSession
+from app.services.auth_cache import auth_cache
 
 router = APIRouter()
 
@@ -14,73 +16,91 @@ def verify_password(password: str, hashed: str) -> bool:
     """Verify a password against its hash"""
     return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
 
+async def find_login_session(uow: UnitOfWork, token: str, username: str):
+    """
+    Sesión de Telegram vigente y usuario del formulario en una sola consulta:
+    (session_id, telegram_chat_id, user_id, password_hash, user_is_active), o
+    None si el enlace no es válido. user_id es None si el usuario no existe.
+    """
+    if hot_queries is not None:
+        row = await hot_queries.login_session(uow.session, token, username)
+        return tuple(row) if row else None
+
+    result = await uow.session.execute(
+        select(UserSession.id, UserSession.telegram_chat_id, User.id, User.password_hash, User.is_active)
+        .outerjoin(User, User.username == username)
+        .where(
+            UserSession.token == token,
+            UserSession.is_active == True,
+            UserSession.expires_at > datetime.utcnow()
+        )
+    )
+    row = result.first()
+    return tuple(row) if row else None
+
+async def link_login_session(uow: UnitOfWork, session_id: int, user_id: int):
+    if hot_queries is not None:
+        await hot_queries.link_session(uow.session, session_id, user_id)
+    else:
+        await uow.session.execute(
+            update(UserSession)
+            .where(UserSession.id == session_id)
+            .values(user_id=user_id)
+        )
+    await uow.commit()
+
 @router.post("/auth/login", response_class=HTMLResponse)
 async def handle_login_form(
     username: str = Form(...),
     password: str = Form(...),
-    token: str = Form(...)
+    token: str = Form(...),
+    uow: UnitOfWork = Depends(get_unit_of_work)
 ):
     """Procesa los datos del formulario, valida y vincula el usuario con la sesión de Telegram."""
     try:
-        # Verificar que el token de sesión existe y no ha expirado
-        async for db_session in get_session():
-            result = await db_session.execute(
-                select(UserSession).where(
-                    UserSession.token == token,
-                    UserSession.is_active == True,
-                    UserSession.expires_at > datetime.utcnow()
-                )
-            )
-            user_session = result.scalars().first()
+        login = await find_login_session(uow, token, username)
+        session_id, telegram_chat_id, user_id, password_hash, user_is_active = login or (None,) * 5
 
-            if not user_session:
-                error_html = """
-                <!DOCTYPE html><html lang="es"><head><title>Error</title><style>body{font-family: sans-serif; text-align: center; padding-top: 50px; color: #333;} h1{color: #dc3545;}</style></head>
-                <body><h1>Error de autenticación</h1><p>El enlace ha expirado o es inválido. Por favor, solicita un nuevo enlace en Telegram.</p></body></html>
-                """
-                return HTMLResponse(content=error_html, status_code=401)
-
-            # Buscar usuario por username
-            result = await db_session.execute(select(User).where(User.username == username))
-            user = result.scalars().first()
+        if session_id is None:
+            error_html = """
+            <!DOCTYPE html><html lang="es"><head><title>Error</title><style>body{font-family: sans-serif; text-align: center; padding-top: 50px; color: #333;} h1{color: #dc3545;}</style></head>
+            <body><h1>Error de autenticación</h1><p>El enlace ha expirado o es inválido. Por favor, solicita un nuevo enlace en Telegram.</p></body></html>
+            """
+            return HTMLResponse(content=error_html, status_code=401)
 
-            if not user:
-                error_html = """
-                <!DOCTYPE html><html lang="es"><head><title>Error</title><style>body{font-family: sans-serif; text-align: center; padding-top: 50px; color: #333;} h1{color: #dc3545;}</style></head>
-                <body><h1>Error de autenticación</h1><p>Usuario no encontrado. Verifica tus credenciales.</p></body></html>
-                """
-                return HTMLResponse(content=error_html, status_code=401)
+        if user_id is None:
+            error_html = """
+            <!DOCTYPE html><html lang="es"><head><title>Error</title><style>body{font-family: sans-serif; text-align: center; padding-top: 50px; color: #333;} h1{color: #dc3545;}</style></head>
+            <body><h1>Error de autenticación</h1><p>Usuario no encontrado. Verifica tus credenciales.</p></body></html>
+            """
+            return HTMLResponse(content=error_html, status_code=401)
 
-            # Verificar contraseña
-            if not verify_password(password, user.password_hash):
-                error_html = """
-                <!DOCTYPE html><html lang="es"><head><title>Error</title><style>body{font-family: sans-serif; text-align: center; padding-top: 50px; color: #333;} h1{color: #dc3545;}</style></head>
-                <body><h1>Error de autenticación</h1><p>Contraseña incorrecta. Verifica tus credenciales.</p></body></html>
-                """
-                return HTMLResponse(content=error_html, status_code=401)
+        # Verificar contraseña
+        if not verify_password(password, password_hash):
+            error_html = """
+            <!DOCTYPE html><html lang="es"><head><title>Error</title><style>body{font-family: sans-serif; text-align: center; padding-top: 50px; color: #333;} h1{color: #dc3545;}</style></head>
+            <body><h1>Error de autenticación</h1><p>Contraseña incorrecta. Verifica tus credenciales.</p></body></html>
+            """
+            return HTMLResponse(content=error_html, status_code=401)
 
-            # Verificar que la cuenta esté activa
-            if not user.is_active:
-                error_html = """
-                <!DOCTYPE html><html lang="es"><head><title>Error</title><style>body{font-family: sans-serif; text-align: center; padding-top: 50px; color: #333;} h1{color: #dc3545;}</style></head>
-                <body><h1>Cuenta desactivada</h1><p>Tu cuenta ha sido desactivada. Contacta al administrador.</p></body></html>
-                """
-                return HTMLResponse(content=error_html, status_code=401)
+        # Verificar que la cuenta esté activa
+        if not user_is_active:
+            error_html = """
+            <!DOCTYPE html><html lang="es"><head><title>Error</title><style>body{font-family: sans-serif; text-align: center; padding-top: 50px; color: #333;} h1{color: #dc3545;}</style></head>
+            <body><h1>Cuenta desactivada</h1><p>Tu cuenta ha sido desactivada. Contacta al administrador.</p></body></html>
+            """
+            return HTMLResponse(content=error_html, status_code=401)
 
-            # Vincular usuario con la sesión de Telegram
-            await db_session.execute(
-                update(UserSession)
-                .where(UserSession.id == user_session.id)
-                .values(user_id=user.id)
-            )
-            await db_session.commit()
+        # Vincular usuario con la sesión de Telegram
+        await link_login_session(uow, session_id, user_id)
+        auth_cache.invalidate(telegram_chat_id)
 
-            # Éxito - mostrar mensaje de confirmación
-            success_html = """
-            <!DOCTYPE html><html lang="es"><head><title>Éxito</title><style>body{font-family: sans-serif; text-align: center; padding-top: 50px; color: #333;} h1{color: #28a745;}</style></head>
-            <body><h1>¡Inicio de sesión exitoso!</h1><p>Tu cuenta ha sido vinculada a tu chat de Telegram.</p><p>Ya puedes cerrar esta ventana y volver a la conversación con acceso a funciones premium.</p></body></html>
-            """
-            return HTMLResponse(content=success_html)
+        # Éxito - mostrar mensaje de confirmación
+        success_html = """
+        <!DOCTYPE html><html lang="es"><head><title>Éxito</title><style>body{font-family: sans-serif; text-align: center; padding-top: 50px; color: #333;} h1{color: #28a745;}</style></head>
+        <body><h1>¡Inicio de sesión exitoso!</h1><p>Tu cuenta ha sido vinculada a tu chat de Telegram.</p><p>Ya puedes cerrar esta ventana y volver a la conversación con acceso a funciones premium.</p></body></html>
+        """
+        return HTMLResponse(content=success_html)
 
     except Exception as e:
         print(f"Login error: {e}")
@@ -0,0 +1,91 @@
+from datetime import datetime
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect, Body
+from sqlalchemy import select, update
+from sqlalchemy.orm import selectinload
+
+from app.api.routes.admin import require_admin_token
+from app.api.websocket.connection import dashboard_manager
+from app.config import settings
+from app.database.connection import async_session, engine
+from app.database.unit_of_work import UnitOfWork, get_unit_of_work
+from app.models.order import Order
+from app.services.dashboard_broker import PostgresBroker, listen_dsn
+from app.services.delivery_time import service_day_bounds
+from app.services.sales_rollups import sales_rollups
+from app.services.order_feed import CLOSED_STATUSES, ORDER_STATUSES, compact_order_model
+
+router = APIRouter()
+
+# El WebSocket va sin el prefijo de la API: el dashboard se conecta a /ws/orders
+ws_router = APIRouter()
+
+async def load_dashboard_state():
+    """Carga en memoria los pedidos abiertos de hoy para los snapshots del dashboard."""
+    try:
+        service_tz = ZoneInfo(settings.SERVICE_TIMEZONE)
+        day_start, _ = service_day_bounds(datetime.now(service_tz).date(), service_tz)
+        async with async_session() as db_session:
+            result = await db_session.execute(
+                select(Order)
+                .options(selectinload(Order.items))
+                .where(
+                    Order.created_at >= day_start,
+                    Order.status.notin_(CLOSED_STATUSES)
+                )
+                .order_by(Order.created_at)
+            )
+            dashboard_manager.load(compact_order_model(order, service_tz) for order in result.scalars().all())
+    except Exception as e:
+        print(f"Error loading dashboard state: {e}")
+
+# Con varios workers de uvicorn los eventos se reparten con LISTEN/NOTIFY
+dashboard_broker = None
+if settings.DASHBOARD_BROKER == "postgres":
+    dashboard_broker = PostgresBroker(
+        engine,
+        dsn=listen_dsn(settings.DATABASE_URL),
+        channel=settings.DASHBOARD_NOTIFY_CHANNEL,
+        deliver=dashboard_manager.deliver,
+        on_reload=load_dashboard_state,
+        batch_window=settings.DASHBOARD_NOTIFY_BATCH_SECONDS,
+        reconnect_delay=settings.DASHBOARD_LISTEN_RECONNECT_SECONDS
+    )
+    dashboard_manager.broker = dashboard_broker
+
+@ws_router.websocket("/ws/orders")
+async def orders_websocket(websocket: WebSocket, epoch: Optional[str] = None, since: Optional[int] = None):
+    """
+    Pedidos en tiempo real. Al conectar se envía un snapshot de los pedidos
+    abiertos de hoy (o, con ?epoch=...&since=N, solo los deltas posteriores a N)
+    y después cada cambio numerado con `seq`.
+    """
+    await dashboard_manager.subscribe(websocket, epoch=epoch, since=since)
+    try:
+        while True:
+            # El dashboard no envía nada; leer detecta la desconexión
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        dashboard_manager.disconnect(websocket)
+
+@router.patch("/orders/{order_id}/status", dependencies=[Depends(require_admin_token)])
+async def update_order_status(order_id: int, status: str = Body(..., embed=True), uow: UnitOfWork = Depends(get_unit_of_work)):
+    """Cambia el estado de un pedido y lo notifica a los dashboards."""
+    if status not in ORDER_STATUSES:
+        raise HTTPException(status_code=422, detail=f"Invalid status, expected one of {', '.join(ORDER_STATUSES)}")
+
+    result = await uow.session.execute(
+        update(Order).where(Order.id == order_id).values(status=status).returning(Order.id)
+    )
+    if result.scalar_one_or_none() is None:
+        raise HTTPException(status_code=404, detail="Order not found")
+    await uow.commit()
+    # Una cancelación cambia los agregados de ventas (ver analytics_schema.sql)
+    sales_rollups.invalidate()
+
+    await dashboard_manager.broadcast_status(order_id, status)
+    return {"order_id": order_id, "status": status}
@@ -0,0 +1,44 @@
+from fastapi import APIRouter
+
+from app.api.routes.webhook import update_dispatcher, update_deduplicator, order_intake, outbox_dispatcher, printer_service
+from app.api.websocket.connection import dashboard_manager
+from app.database.connection import engine, query_timer
+from app.database.hot_queries import hot_queries
+from app.database.instrumentation import pool_stats
+from app.services.auth_cache import auth_cache
+from app.services.llm_cache import llm_response_cache
+from app.services.llm_governor import llm_governor
+from app.services.menu_catalog import menu_catalog
+from app.services.sales_rollups import sales_rollups
+from app.services.session_janitor import session_janitor
+
+router = APIRouter()
+
+@router.get("/metrics")
+async def get_metrics():
+    """Expone el estado en tiempo de ejecución de los componentes internos."""
+    outbox = outbox_dispatcher.stats()
+    try:
+        outbox["backlog"] = await outbox_dispatcher.backlog()
+    except Exception as e:
+        outbox["backlog_error"] = str(e)
+
+    return {
+        "webhook_queue": update_dispatcher.stats(),
+        "webhook_dedup": update_deduplicator.stats(),
+        "auth_cache": auth_cache.stats(),
+        "llm_cache": llm_response_cache.stats(),
+        "llm_governor": llm_governor.stats(),
+        "order_intake": order_intake.stats(),
+        "menu_catalog": menu_catalog.stats(),
+        "outbox": outbox,
+        "printer": printer_service.stats(),
+        "dashboard": dashboard_manager.stats(),
+        "sales_rollups": sales_rollups.stats(),
+        "session_janitor": session_janitor.stats(),
+        "database": {
+            "pool": pool_stats(engine.pool),
+            "queries": query_timer.stats(),
+            "prepared": hot_queries.stats() if hot_queries is not None else None,
+        },
+    }
@@ -0,0 +1,117 @@
+from datetime import date, datetime
+from typing import Any, Dict, Optional
+from zoneinfo import ZoneInfo
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.orm import selectinload
+
+from app.api.routes.admin import require_admin_token
+from app.config import settings
+from app.database.unit_of_work import UnitOfWork, get_unit_of_work
+from app.models.order import Order
+from app.services.delivery_time import service_day_bounds
+from app.services.order_feed import ORDER_STATUSES
+from app.services.pagination import InvalidCursorError, decode_cursor, encode_cursor
+
+router = APIRouter(dependencies=[Depends(require_admin_token)])
+
+MAX_PAGE_SIZE = 200
+
+def orders_query():
+    """Pedidos con items y pago: tres consultas en total, sin cargas perezosas por pedido."""
+    return select(Order).options(selectinload(Order.items), selectinload(Order.payment))
+
+@router.get("/orders")
+async def list_orders(
+    status: Optional[str] = None,
+    delivery_slot: Optional[datetime] = Query(None, description="Inicio de la franja de entrega (ISO 8601)"),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    uow: UnitOfWork = Depends(get_unit_of_work)
+):
+    """
+    Pedidos del más reciente al más antiguo, paginados por (created_at, id).
+    `next_cursor` se pasa como `cursor` para pedir la página siguiente; el coste
+    de cada página no depende de cuántas se hayan recorrido antes.
+    """
+    if status is not None and status not in ORDER_STATUSES:
+        raise HTTPException(status_code=422, detail=f"Invalid status, expected one of {', '.join(ORDER_STATUSES)}")
+
+    query = orders_query().order_by(Order.created_at.desc(), Order.id.desc()).limit(limit + 1)
+    if status is not None:
+        query = query.where(Order.status == status)
+    if delivery_slot is not None:
+        if delivery_slot.tzinfo is None:
+            delivery_slot = delivery_slot.replace(tzinfo=ZoneInfo(settings.SERVICE_TIMEZONE))
+        query = query.where(Order.delivery_slot == delivery_slot)
+    if cursor:
+        try:
+            created_at, order_id = decode_cursor(cursor)
+        except InvalidCursorError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        # Comparación de filas: usa el índice (created_at, id) sin OFFSET
+        query = query.where(tuple_(Order.created_at, Order.id) < tuple_(created_at, order_id))
+
+    result = await uow.session.execute(query)
+    orders = list(result.scalars().all())
+    next_cursor = None
+    if len(orders) > limit:
+        orders = orders[:limit]
+        next_cursor = encode_cursor(orders[-1].created_at, orders[-1].id)
+
+    return {"orders": [order.to_dict() for order in orders], "next_cursor": next_cursor}
+
+@router.get("/orders/slots")
+async def slot_board(day: Optional[date] = None, uow: UnitOfWork = Depends(get_unit_of_work)):
+    """
+    Pedidos de un día de servicio (hoy por defecto) agrupados por franja de
+    entrega, con el número de pedidos por estado en cada franja. Los pedidos
+    salen de un rango sobre el índice de franja_entrega, ya ordenados.
+    """
+    service_tz = ZoneInfo(settings.SERVICE_TIMEZONE)
+    day = day or datetime.now(service_tz).date()
+    day_start, day_end = service_day_bounds(day, service_tz)
+
+    result = await uow.session.execute(
+        orders_query()
+        .where(Order.delivery_slot >= day_start, Order.delivery_slot < day_end)
+        .order_by(Order.delivery_slot, Order.created_at, Order.id)
+    )
+    slots: Dict[datetime, Dict[str, Any]] = {}
+    for order in result.scalars().all():
+        starts_at = order.delivery_slot.astimezone(service_tz)
+        slot = slots.get(starts_at)
+        if slot is None:
+            slot = slots[starts_at] = {
+                "slot": starts_at.strftime("%H:%M"),
+                "starts_at": starts_at.isoformat(),
+                "total": 0,
+                "counts": {},
+                "orders": [],
+            }
+        slot["total"] += 1
+        slot["counts"][order.status] = slot["counts"].get(order.status, 0) + 1
+        slot["orders"].append(order.to_dict())
+
+    # Pedidos del día cuya hora de entrega no se pudo interpretar
+    unscheduled = await uow.session.execute(
+        select(func.count()).select_from(Order).where(
+            Order.created_at >= day_start, Order.created_at < day_end, Order.delivery_slot.is_(None)
+        )
+    )
+    return {
+        "day": day.isoformat(),
+        "timezone": settings.SERVICE_TIMEZONE,
+        "slot_minutes": settings.DELIVERY_SLOT_MINUTES,
+        "slots": list(slots.values()),
+        "unscheduled": unscheduled.scalar_one(),
+    }
+
+@router.get("/orders/{order_id}")
+async def get_order(order_id: int, uow: UnitOfWork = Depends(get_unit_of_work)):
+    result = await uow.session.execute(orders_query().where(Order.id == order_id))
+    order = result.scalar_one_or_none()
+    if order is None:
+        raise HTTPException(status_code=404, detail="Order not found")
+    return order.to_dict()
@@ -1,132 +1,222 @@
 from fastapi import APIRouter, HTTPException, Body
 from typing import Dict, Any
 from telegram import Bot
+import asyncio
 import re
 
 from app.services.ai_agent import AIOrderAgent
+from app.services.update_queue import UpdateDispatcher
+from app.services.update_dedup import UpdateDeduplicator
+from app.services.auth_cache import ChatAuth, MISSING, auth_cache
+from app.services.intent import Intent, classify_intent
+from app.services.telegram_stream import stream_reply
+from app.services.menu_catalog import menu_catalog
+from app.services.order_parser import OrderParser
+from app.services.order_intake import OrderIntake
+from app.services.order_processor import OrderProcessor, OrderValidationError
+from app.services.printer import PrinterService
+from app.services.outbox import OutboxDispatcher, PRINT_TICKET, BROADCAST_ORDER
+from app.services.sales_rollups import sales_rollups
+from app.api.websocket.connection import dashboard_manager
 from app.config import settings
-from app.database.connection import get_session
+from app.database.unit_of_work import UnitOfWork, unit_of_work
+from app.database.hot_queries import hot_queries
 from app.models.user import User, MagicLink, UserSession
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy import update
 import secrets
 from datetime import datetime, timedelta
 
 # Instancia global del agente de IA
 ai_agent_instance = AIOrderAgent()
 
-def detect_login_intent(message: str) -> bool:
-    """Detect if user wants to login"""
-    login_keywords = [
-        'iniciar sesión', 'iniciar sesion', 'login', 'log in', 'autenticar', 'autenticarme',
-        'ingresar', 'entrar', 'acceder', 'registrarme', 'registrar',
-        'quiero iniciar', 'necesito iniciar', 'deseo iniciar',
-        'session', 'sesion', 'loguear', 'loguearme', 'acceder',
-        'enviame el enlace', 'dame el link', 'link de login', 'enlace de login'
-    ]
+# Intérprete local de pedidos contra el catálogo en memoria; el LLM queda como respaldo
+order_intake = OrderIntake(
+    OrderParser(menu_catalog.index, min_item_score=settings.ORDER_PARSER_MIN_ITEM_SCORE),
+    ai_agent_instance,
+    min_confidence=settings.ORDER_PARSER_MIN_CONFIDENCE
+)
+
+printer_service = PrinterService(catalog=menu_catalog.index)
+
+# Entrega en segundo plano de los efectos de cada pedido registrados en el outbox
+outbox_dispatcher = OutboxDispatcher(
+    {
+        PRINT_TICKET: printer_service.print_ticket,
+        BROADCAST_ORDER: dashboard_manager.broadcast_order,
+    },
+    poll_interval=settings.OUTBOX_POLL_SECONDS,
+    batch_size=settings.OUTBOX_BATCH_SIZE,
+    max_attempts=settings.OUTBOX_MAX_ATTEMPTS,
+    retry_base_seconds=settings.OUTBOX_RETRY_BASE_SECONDS,
+    lease_seconds=settings.OUTBOX_LEASE_SECONDS,
+    retention_hours=settings.OUTBOX_RETENTION_HOURS,
+    purge_interval=settings.OUTBOX_PURGE_INTERVAL_SECONDS
+)
+
+async def get_chat_auth(uow: UnitOfWork, telegram_chat_id: int) -> ChatAuth | None:
+    """Get the user linked to a Telegram chat ID, served from the auth cache when possible"""
+    memo_key = ("chat_auth", telegram_chat_id)
+    if memo_key in uow.memo:
+        return uow.memo[memo_key]
+
+    cached = auth_cache.get(telegram_chat_id)
+    if cached is not MISSING:
+        uow.memo[memo_key] = cached
+        return cached
 
-    message_lower = message.lower()
-
-    for keyword in login_keywords:
-        if keyword in message_lower:
-            return True
-
-    return False
-
-async def is_user_authenticated(telegram_chat_id: int) -> bool:
-    """Check if a user is authenticated based on their Telegram chat ID"""
     try:
-        async for db_session in get_session():
-            result = await db_session.execute(
-                select(UserSession).where(
+        if hot_queries is not None:
+            row = await hot_queries.chat_auth(uow.session, telegram_chat_id)
+        else:
+            # Sesión activa y rol del usuario en una sola consulta
+            result = await uow.session.execute(
+                select(UserSession.user_id, User.role, UserSession.expires_at)
+                .join(User, User.id == UserSession.user_id)
+                .where(
                     UserSession.telegram_chat_id == telegram_chat_id,
                     UserSession.is_active == True,
                     UserSession.user_id.isnot(None),
                     UserSession.expires_at > datetime.utcnow()
                 )
+                .order_by(UserSession.expires_at.desc())
+                .limit(1)
             )
-            session = result.scalars().first()
-            return session is not None
-        return False
+            row = result.first()
+        # (user_id, role, expires_at) tanto en un Record de asyncpg como en un Row de SQLAlchemy
+        chat_auth = ChatAuth(user_id=row[0], role=row[1], expires_at=row[2]) if row else None
+        auth_cache.set(telegram_chat_id, chat_auth)
+        uow.memo[memo_key] = chat_auth
+        return chat_auth
     except Exception as e:
         print(f"Error checking authentication: {e}")
-        return False
+        return None
 
-async def get_user_role_by_telegram_id(telegram_chat_id: int) -> str | None:
+async def is_user_authenticated(uow: UnitOfWork, telegram_chat_id: int) -> bool:
+    """Check if a user is authenticated based on their Telegram chat ID"""
+    return await get_chat_auth(uow, telegram_chat_id) is not None
+
+async def get_user_role_by_telegram_id(uow: UnitOfWork, telegram_chat_id: int) -> str | None:
     """Get user role by Telegram chat ID"""
-    try:
-        async for db_session in get_session():
-            # First get the user_id from the active session
-            session_result = await db_session.execute(
-                select(UserSession.user_id).where(
-                    UserSession.telegram_chat_id == telegram_chat_id,
-                    UserSession.is_active == True,
-                    UserSession.user_id.isnot(None),
-                    UserSession.expires_at > datetime.utcnow()
-                )
-            )
-            user_id = session_result.scalar()
+    chat_auth = await get_chat_auth(uow, telegram_chat_id)
+    return chat_auth.role if chat_auth else None
 
-            if user_id:
-                # Then get the user role
-                user_result = await db_session.execute(
-                    select(User.role).where(User.id == user_id)
-                )
-                role = user_result.scalar()
-                return role
+async def logout_user(uow: UnitOfWork, telegram_chat_id: int) -> bool:
+    """Logout user by deactivating their session"""
+    try:
+        await uow.session.execute(
+            update(UserSession).where(
+                UserSession.telegram_chat_id == telegram_chat_id,
+                UserSession.is_active == True
+            ).values(is_active=False)
+        )
+        await uow.commit()
+        auth_cache.invalidate(telegram_chat_id)
+        uow.memo.pop(("chat_auth", telegram_chat_id), None)
+        return True
+    except Exception as e:
+        print(f"Error logging out user: {e}")
+        await uow.rollback()
+        return False
 
-            return None
 
+def get_customer_name(message: Dict[str, Any]) -> str | None:
+    """Nombre del cliente según su perfil de Telegram"""
+    sender = message.get("from", {})
+    name = " ".join(part for part in (sender.get("first_name"), sender.get("last_name")) if part)
+    return name or sender.get("username")
+
+def format_order_confirmation(order: Dict[str, Any]) -> str:
+    """Resumen del pedido registrado para enviarlo al cliente"""
+    lines = [f"✅ Pedido #{order['id']} registrado:", ""]
+    for item in order.get("items", []):
+        lines.append(f"{item.get('v_cantidad')} x {item.get('v_producto_test')}")
+    lines.append("")
+    lines.append(f"Total: ${float(order.get('v_importe_total') or 0):.2f}")
+    if order.get("v_destino"):
+        lines.append(f"Entrega: {order['v_destino']}")
+    if order.get("v_hora_entrega"):
+        lines.append(f"Hora: {order['v_hora_entrega']}")
+    return "\n".join(lines)
+
+async def handle_order_message(uow: UnitOfWork, message_text: str, customer_name: str | None) -> str | None:
+    """Registra el pedido si el mensaje lo es y devuelve la confirmación; None si no es un pedido"""
+    try:
+        tool_calls, source = await order_intake.extract_tool_calls(message_text, customer_name)
     except Exception as e:
-        print(f"Error getting user role: {e}")
+        print(f"Error extracting order: {e}")
         return None
 
-async def logout_user(telegram_chat_id: int) -> bool:
-    """Logout user by deactivating their session"""
-    try:
-        from sqlalchemy import update
+    if not tool_calls:
+        return None
 
-        async for db_session in get_session():
-            await db_session.execute(
-                update(UserSession).where(
-                    UserSession.telegram_chat_id == telegram_chat_id,
-                    UserSession.is_active == True
-                ).values(is_active=False)
-            )
-            await db_session.commit()
-            return True
-        return False
+    try:
+        processor = OrderProcessor(
+            uow.session, printer_service, dashboard_manager,
+            catalog=menu_catalog.index, min_similarity=settings.MENU_MIN_MATCH_SIMILARITY,
+            outbox=outbox_dispatcher, hot_queries=hot_queries,
+            service_timezone=settings.SERVICE_TIMEZONE, slot_minutes=settings.DELIVERY_SLOT_MINUTES
+        )
+        order = await processor.create_order_from_llm(tool_calls)
+        sales_rollups.invalidate()
+        print(f"Order {order['id']} created from {source}")
+        return format_order_confirmation(order)
+    except OrderValidationError as e:
+        print(f"Rejected order from {source}: {e}")
+        if e.unknown_products:
+            return f"❌ No encontramos en el menú: {', '.join(e.unknown_products)}. Revisa tu pedido e inténtalo de nuevo."
+        return f"❌ {e}"
     except Exception as e:
-        print(f"Error logging out user: {e}")
-        return False
+        print(f"Error creating order: {e}")
+        return "❌ No pudimos registrar tu pedido. Por favor, inténtalo de nuevo en unos minutos."
 
 
-# --- Router ---
+_bot: Bot | None = None
 
-router = APIRouter()
+def get_bot() -> Bot:
+    """Devuelve una instancia compartida del bot para reutilizar su cliente HTTP"""
+    global _bot
+    if _bot is None:
+        _bot = Bot(token=settings.TELEGRAM_BOT_TOKEN)
+    return _bot
 
-@router.post("/webhook/telegram", status_code=200)
-async def telegram_webhook(update: Dict[str, Any] = Body(...)):
+async def send_telegram_message(chat_id: int, text: str):
+    """Envía un mensaje por Telegram respetando el timeout configurado"""
+    await asyncio.wait_for(
+        get_bot().send_message(chat_id=chat_id, text=text),
+        timeout=settings.WEBHOOK_SEND_TIMEOUT
+    )
+
+
+async def process_telegram_update(update: Dict[str, Any]):
     """
-    Endpoint para recibir actualizaciones de un webhook de Telegram y responder con IA.
+    Procesa una actualización de Telegram y responde con IA.
     Maneja tanto pedidos como solicitudes de login.
     """
-    try:
+    latency = update_dispatcher.latency
+
+    # Una única sesión de base de datos para todo el procesamiento del update
+    async with unit_of_work() as uow:
+        # Segunda barrera contra reintentos: sobrevive a reinicios del proceso
+        update_id = update.get("update_id")
+        if update_id is not None:
+            async with latency.stage("dedup"):
+                if not await update_deduplicator.claim(uow, update_id):
+                    return
+
         # Extraer el mensaje de texto y chat_id del payload de Telegram
         message = update.get("message", {})
         message_text = message.get("text")
         chat_id = message.get("chat", {}).get("id")
 
         if not message_text or not chat_id:
-            return {"status": "ok", "message": "No text message or chat_id found"}
-
-        # Verificar si es una solicitud de login
-        is_login_request = detect_login_intent(message_text)
+            return
 
-        # Verificar comandos especiales de autenticación
-        message_lower = message_text.lower()
+        # Clasificar el mensaje: login, consulta de estado, logout o pedido normal
+        intent = classify_intent(message_text)
 
-        if is_login_request:
+        if intent is Intent.LOGIN:
             # Es una solicitud de login - crear token de sesión y enviar enlace
             try:
                 # Generar token de sesión único
@@ -140,50 +230,115 @@ async def telegram_webhook(update: Dict[str, Any] = Body(...)):
                     expires_at=expires_at
                 )
 
-                async for db_session in get_session():
-                    db_session.add(user_session)
-                    await db_session.commit()
+                async with latency.stage("db"):
+                    uow.session.add(user_session)
+                    await uow.commit()
 
-                    # Crear enlace de login con token
-                    login_url = f"{settings.FRONTEND_URL}/login?token={session_token}"
-                    response_text = f"¡Perfecto! Para iniciar sesión, haz clic en este enlace:\n\n{login_url}\n\nIngresa tu usuario y contraseña para acceder a funciones adicionales. El enlace es válido por 1 hora."
+                # Crear enlace de login con token
+                login_url = f"{settings.FRONTEND_URL}/login?token={session_token}"
+                response_text = f"¡Perfecto! Para iniciar sesión, haz clic en este enlace:\n\n{login_url}\n\nIngresa tu usuario y contraseña para acceder a funciones adicionales. El enlace es válido por 1 hora."
 
             except Exception as db_error:
                 print(f"Database error creating session: {db_error}")
+                await uow.rollback()
                 response_text = "Hubo un problema al procesar tu solicitud de inicio de sesión. Por favor, intenta de nuevo."
 
-        elif any(keyword in message_lower for keyword in ['estoy logueado', 'estoy autenticado', 'estoy login', 'status login', 'mi estado']):
+        elif intent is Intent.STATUS:
             # Verificar estado de autenticación
-            if await is_user_authenticated(chat_id):
-                user_role = await get_user_role_by_telegram_id(chat_id)
-                response_text = f"✅ ¡Sí! Estás autenticado como **{user_role}**.\n\nPuedes acceder a funciones premium como generar contenido para redes sociales."
+            async with latency.stage("db"):
+                chat_auth = await get_chat_auth(uow, chat_id)
+            if chat_auth:
+                response_text = f"✅ ¡Sí! Estás autenticado como **{chat_auth.role}**.\n\nPuedes acceder a funciones premium como generar contenido para redes sociales."
             else:
                 response_text = "❌ No estás autenticado actualmente.\n\nEscribe 'quiero iniciar sesión' para acceder a funciones premium."
 
-        elif any(keyword in message_lower for keyword in ['cerrar sesion', 'logout', 'cerrar sesión', 'desconectar', 'salir']):
+        elif intent is Intent.LOGOUT:
             # Cerrar sesión
-            if await logout_user(chat_id):
+            async with latency.stage("db"):
+                logged_out = await logout_user(uow, chat_id)
+            if logged_out:
                 response_text = "✅ Sesión cerrada exitosamente.\n\nYa no tienes acceso a funciones premium. Puedes volver a iniciar sesión cuando lo necesites."
             else:
                 response_text = "❌ Hubo un problema al cerrar la sesión. Inténtalo de nuevo."
 
         else:
-            # Es un pedido normal - procesar con IA
-            ai_response = await ai_agent_instance.generate_response({"message": message_text})
-
-            # If AI agent returns None (detected login), treat as login request
-            if ai_response is None:
-                login_url = f"{settings.FRONTEND_URL}/login"
-                response_text = f"¡Perfecto! Para iniciar sesión, haz clic en este enlace:\n\n{login_url}\n\nIngresa tu usuario y contraseña para acceder a funciones adicionales."
-            else:
-                response_text = ai_response
+            # Posible pedido: intérprete local primero y, si no es concluyente, el LLM
+            async with latency.stage("order"):
+                response_text = await handle_order_message(uow, message_text, get_customer_name(message))
+
+            if response_text is None and settings.TELEGRAM_STREAMING_ENABLED:
+                # Mensaje normal con streaming: la respuesta se envía y edita mientras se genera
+                async with latency.stage("ai"):
+                    await stream_reply(
+                        get_bot(),
+                        chat_id,
+                        ai_agent_instance.stream_response({"message": message_text, "intent": intent}),
+                        edit_interval=settings.TELEGRAM_STREAM_EDIT_INTERVAL,
+                        min_first_chars=settings.TELEGRAM_STREAM_MIN_FIRST_CHARS,
+                        send_timeout=settings.WEBHOOK_SEND_TIMEOUT
+                    )
+                return
+
+            if response_text is None:
+                # Mensaje normal - responder con IA
+                try:
+                    async with latency.stage("ai"):
+                        ai_response = await asyncio.wait_for(
+                            ai_agent_instance.generate_response({"message": message_text, "intent": intent}),
+                            timeout=settings.WEBHOOK_AI_TIMEOUT
+                        )
+                except asyncio.TimeoutError:
+                    print(f"AI response timed out for chat {chat_id}")
+                    ai_response = f"Entendido: {message_text}"
+
+                # If AI agent returns None (detected login), treat as login request
+                if ai_response is None:
+                    login_url = f"{settings.FRONTEND_URL}/login"
+                    response_text = f"¡Perfecto! Para iniciar sesión, haz clic en este enlace:\n\n{login_url}\n\nIngresa tu usuario y contraseña para acceder a funciones adicionales."
+                else:
+                    response_text = ai_response
 
         # Enviar respuesta al usuario vía Telegram
-        bot = Bot(token=settings.TELEGRAM_BOT_TOKEN)
-        await bot.send_message(chat_id=chat_id, text=response_text)
+        async with latency.stage("send"):
+            await send_telegram_message(chat_id, response_text)
 
-        return {"status": "success", "response": response_text}
 
-    except Exception as e:
-        print(f"Error in webhook: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
\ No newline at end of file
+# Updates ya vistos, para ignorar los reintentos de Telegram
+update_deduplicator = UpdateDeduplicator(
+    capacity=settings.WEBHOOK_DEDUP_CAPACITY,
+    retention_hours=settings.WEBHOOK_DEDUP_RETENTION_HOURS
+)
+
+# Cola de updates: el endpoint solo encola y los workers procesan en segundo plano
+update_dispatcher = UpdateDispatcher(
+    process_telegram_update,
+    workers=settings.WEBHOOK_WORKERS,
+    maxsize=settings.WEBHOOK_QUEUE_MAXSIZE,
+    latency_window=settings.WEBHOOK_LATENCY_WINDOW
+)
+
+
+# --- Router ---
+
+router = APIRouter()
+
+@router.post("/webhook/telegram", status_code=200)
+async def telegram_webhook(update: Dict[str, Any] = Body(...)):
+    """
+    Endpoint para recibir actualizaciones de un webhook de Telegram.
+    Encola el update y responde de inmediato; el procesamiento (IA, base de datos
+    y respuesta por Telegram) lo hacen los workers de `update_dispatcher`.
+    """
+    update_id = update.get("update_id")
+    if update_id is not None and not update_deduplicator.remember(update_id):
+        # Reintento de un update ya recibido: se confirma sin volver a procesarlo
+        return {"status": "duplicate"}
+
+    if not update_dispatcher.enqueue(update):
+        # Cola llena: Telegram reintentará la entrega más tarde
+        if update_id is not None:
+            update_deduplicator.forget(update_id)
+        print(f"Webhook queue full, rejecting update {update.get('update_id')}")
+        raise HTTPException(status_code=503, detail="Update queue is full")
+
+    return {"status": "queued"}
@@ -1,32 +1,179 @@
+import asyncio
+import json
+import logging
+from typing import Dict, List, Optional
+from zoneinfo import ZoneInfo
+
 from fastapi import WebSocket
-from typing import List
-from app.models.order import Order
+
+from app.config import settings
+from app.services.order_feed import OrderFeed, created_event, status_event
+
+logger = logging.getLogger(__name__)
+
+# Aviso que recibe un cliente al que se le descartaron mensajes: debe recargar el estado
+RESYNC_MESSAGE = json.dumps({"type": "resync"})
+
+
+class ClientConnection:
+    """
+    Un dashboard conectado: cola de salida acotada y una tarea que escribe en el
+    socket, de modo que un cliente lento solo se retrasa a sí mismo.
+    """
+
+    def __init__(self, websocket: WebSocket, queue_size: int):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.writer: Optional[asyncio.Task] = None
+        self.lagging = False
+        self.sent = 0
+
+    def offer(self, payload: str) -> bool:
+        """
+        Encola un mensaje ya serializado. Si la cola está llena se descarta lo
+        pendiente y se pide al cliente que se resincronice; si vuelve a llenarse
+        antes de ponerse al día, devuelve False y el cliente debe expulsarse.
+        """
+        try:
+            self.queue.put_nowait(payload)
+            return True
+        except asyncio.QueueFull:
+            pass
+
+        if self.lagging:
+            return False
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(RESYNC_MESSAGE)
+        self.lagging = True
+        return True
+
 
 class DashboardManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
+    def __init__(self, queue_size: int = 100, send_timeout: float = 5.0, resume_buffer: int = 1000):
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        # Pedidos abiertos del día de servicio y deltas numerados para reanudar conexiones
+        self.feed = OrderFeed(resume_buffer, ZoneInfo(settings.SERVICE_TIMEZONE))
+        # Reparto entre workers (PostgresBroker); None = solo los sockets de este proceso
+        self.broker = None
+        self.clients: Dict[WebSocket, ClientConnection] = {}
+        self.broadcasts = 0
+        self.downgraded = 0
+        self.evicted = 0
+
+    @property
+    def active_connections(self) -> List[WebSocket]:
+        return list(self.clients)
 
     async def connect(self, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        self.register(websocket)
+
+    async def subscribe(self, websocket: WebSocket, epoch: Optional[str] = None, since: Optional[int] = None) -> bool:
+        """
+        Acepta un dashboard y le envía lo que le falta: los deltas posteriores a
+        `since` si siguen en el buffer, o un snapshot de los pedidos abiertos.
+        Devuelve True si se reanudó desde `since`.
+        """
+        await websocket.accept()
+        # Sin awaits entre calcular lo pendiente y registrar el cliente: no se pierde ningún delta
+        missed = self.feed.since(epoch, since)
+        if missed is not None and len(missed) >= self.queue_size:
+            missed = None
+        client = self.register(websocket)
+        for payload in missed if missed is not None else [self.feed.snapshot()]:
+            client.offer(payload)
+        return missed is not None
+
+    def register(self, websocket: WebSocket) -> ClientConnection:
+        """Da de alta un socket ya aceptado y arranca su tarea de escritura."""
+        client = ClientConnection(websocket, self.queue_size)
+        client.writer = asyncio.create_task(self._write(client))
+        self.clients[websocket] = client
+        return client
 
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        client = self.clients.pop(websocket, None)
+        if client is not None and client.writer is not None and client.writer is not asyncio.current_task():
+            client.writer.cancel()
+
+    async def _write(self, client: ClientConnection):
+        try:
+            while True:
+                payload = await client.queue.get()
+                await asyncio.wait_for(client.websocket.send_text(payload), timeout=self.send_timeout)
+                client.sent += 1
+                if client.lagging and client.queue.empty():
+                    client.lagging = False
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Socket cerrado o cliente que no lee: se libera su hueco y se cierra el
+            # socket para que el dashboard lo note, reconecte y se resincronice
+            logger.info(f"Dropping dashboard client: {e!r}")
+            self.disconnect(client.websocket)
+            await self._close(client.websocket)
+
+    def publish(self, payload: str):
+        """Entrega un mensaje ya serializado a todas las colas sin esperar a ningún socket."""
+        self.broadcasts += 1
+        for websocket, client in list(self.clients.items()):
+            was_lagging = client.lagging
+            if not client.offer(payload):
+                self.evicted += 1
+                logger.warning("Evicting slow dashboard client (send queue overflowed twice)")
+                self.disconnect(websocket)
+                asyncio.create_task(self._close(websocket))
+            elif client.lagging and not was_lagging:
+                self.downgraded += 1
+
+    async def _close(self, websocket: WebSocket):
+        try:
+            await asyncio.wait_for(websocket.close(code=1013), timeout=self.send_timeout)
+        except Exception:
+            pass
+
+    def deliver(self, events: List[dict]):
+        """Aplica eventos al feed y los reparte; cada delta se serializa una sola vez."""
+        for event in events:
+            self.publish(self.feed.apply(event))
+
+    def load(self, orders):
+        """Recarga el estado; los clientes conectados reciben un aviso para pedir un snapshot."""
+        self.feed.load(orders)
+        if self.clients:
+            self.publish(RESYNC_MESSAGE)
+
+    async def _emit(self, event: dict):
+        if self.broker is None:
+            self.deliver([event])
+        else:
+            await self.broker.publish(event)
 
     async def broadcast_order(self, order_data: dict):
-        disconnected = []
+        await self._emit(created_event(order_data))
 
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(order_data)
-            except:
-                disconnected.append(connection)
+    async def broadcast_status(self, order_id: int, status: str):
+        await self._emit(status_event(order_id, status))
 
-        # Limpiar conexiones cerradas
-        for conn in disconnected:
-            self.active_connections.remove(conn)
+    def stats(self) -> dict:
+        return {
+            "clients": len(self.clients),
+            "lagging": sum(1 for client in self.clients.values() if client.lagging),
+            "queue_size": self.queue_size,
+            "broadcasts": self.broadcasts,
+            "downgraded": self.downgraded,
+            "evicted": self.evicted,
+            "feed": self.feed.stats(),
+            "broker": self.broker.stats() if self.broker is not None else {"backend": "local"},
+        }
 
-dashboard_manager = DashboardManager()
+dashboard_manager = DashboardManager(
+    queue_size=settings.WS_CLIENT_QUEUE_SIZE,
+    send_timeout=settings.WS_SEND_TIMEOUT,
+    resume_buffer=settings.WS_RESUME_BUFFER_SIZE
+)
 
 def get_dashboard_manager() -> DashboardManager:
     return dashboard_manager
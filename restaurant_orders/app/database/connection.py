@@ -1,14 +1,35 @@
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.config import settings
+from app.database.instrumentation import InstrumentedPool, QueryTimer
+
+def statement_timeout_args(database_url: str, timeout_ms: int) -> dict:
+    """connect_args para fijar statement_timeout en cada conexión nueva del pool."""
+    if not timeout_ms:
+        return {}
+    if "+asyncpg" in database_url:
+        return {"server_settings": {"statement_timeout": str(timeout_ms)}}
+    return {"options": f"-c statement_timeout={timeout_ms}"}
 
 # Create async engine
 engine = create_async_engine(
     settings.DATABASE_URL,
-    echo=True,
-    future=True
+    echo=settings.DB_ECHO,
+    future=True,
+    poolclass=InstrumentedPool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    connect_args=statement_timeout_args(settings.DATABASE_URL, settings.DB_STATEMENT_TIMEOUT_MS)
 )
 
+# Tiempo por sentencia y log de consultas lentas
+query_timer = QueryTimer(slow_ms=settings.DB_SLOW_QUERY_MS)
+query_timer.attach(engine)
+
 # Create async session factory
 async_session = sessionmaker(
     engine,
@@ -18,10 +39,31 @@ async_session = sessionmaker(
 
 Base = declarative_base()
 
+# Triggers que mantienen los agregados de ventas (database/analytics_schema.sql).
+# create_all no los crea: los instala setup_db.py
+REQUIRED_TRIGGERS = (
+    "trg_rollup_orders_insert",
+    "trg_rollup_order_items_insert",
+    "trg_rollup_payments_insert",
+    "trg_rollup_order_cancellation",
+)
+
 async def init_db():
     async with engine.begin() as conn:
         # Aquí podrías agregar await conn.run_sync(Base.metadata.drop_all) en desarrollo
         await conn.run_sync(Base.metadata.create_all)
+        result = await conn.execute(
+            text("SELECT tgname FROM pg_trigger WHERE NOT tgisinternal AND tgname = ANY(:names)"),
+            {"names": list(REQUIRED_TRIGGERS)}
+        )
+        installed = set(result.scalars().all())
+    # Sin ellos los pedidos se registran pero las analíticas se quedan a cero sin avisar
+    missing = [name for name in REQUIRED_TRIGGERS if name not in installed]
+    if missing:
+        raise RuntimeError(
+            f"Missing database triggers {', '.join(missing)}: run setup_db.py "
+            "(database/analytics_schema.sql) before starting the app"
+        )
 
 async def get_session():
     async with async_session() as session:
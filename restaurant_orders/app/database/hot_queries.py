@@ -0,0 +1,146 @@
+import itertools
+from contextlib import asynccontextmanager, nullcontext
+from typing import Callable, Optional, Sequence
+
+from app.config import settings
+from app.database.connection import engine, query_timer
+from app.database.instrumentation import QueryTimer
+
+# Identifica cada caché de statements para darles nombres que no se repitan
+_cache_ids = itertools.count(1)
+
+# Consultas del camino caliente en SQL nativo de asyncpg ($1, $2...)
+STATEMENTS = {
+    # Usuario vinculado a un chat de Telegram (cada mensaje recibido)
+    "chat_auth": """
+        SELECT s.user_id, u.role, s.expires_at
+        FROM user_sessions s
+        JOIN users u ON u.id = s.user_id
+        WHERE s.telegram_chat_id = $1
+          AND s.is_active
+          AND s.user_id IS NOT NULL
+          AND s.expires_at > now()
+        ORDER BY s.expires_at DESC
+        LIMIT 1
+    """,
+    # Sesión vigente del enlace de login y usuario del formulario
+    "login_session": """
+        SELECT s.id AS session_id, s.telegram_chat_id,
+               u.id AS user_id, u.password_hash, u.is_active AS user_is_active
+        FROM user_sessions s
+        LEFT JOIN users u ON u.username = $2
+        WHERE s.token = $1
+          AND s.is_active
+          AND s.expires_at > now()
+    """,
+    "link_session": "UPDATE user_sessions SET user_id = $2 WHERE id = $1",
+    "insert_order": "SELECT insert_pedido_completo($1::jsonb)",
+    "insert_outbox": """
+        INSERT INTO order_outbox (event_type, payload)
+        SELECT event_type, $2::jsonb FROM unnest($1::text[]) AS event_type
+    """,
+}
+
+
+class HotQueries:
+    """
+    Acceso directo con asyncpg para las consultas más frecuentes.
+
+    Trabaja sobre la conexión de la sesión de la unidad de trabajo, así que un
+    update sigue usando una sola conexión del pool y las escrituras entran en
+    su transacción, pero se salta la compilación de SQLAlchemy y el procesado
+    de resultados: cada sentencia se prepara con nombre la primera vez que se
+    usa en una conexión y el statement preparado se guarda en el `info` de esa
+    conexión del pool, así que las siguientes ejecuciones solo envían los
+    parámetros. Los tiempos se anotan en el `QueryTimer` del engine.
+    """
+
+    def __init__(self, timer: Optional[QueryTimer] = None):
+        self.timer = timer
+        self.prepares = 0
+        self.executions = 0
+
+    @asynccontextmanager
+    async def connection(self, db_session, transactional: bool = False):
+        """
+        (conexión asyncpg, función que devuelve el statement preparado por
+        nombre) de la conexión de `db_session`. Con `transactional` se abre antes
+        la transacción de la sesión, que confirma o deshace quien la llama.
+        """
+        import asyncpg
+
+        conn = await db_session.connection()
+        raw = await conn.get_raw_connection()
+        driver = raw.driver_connection
+        if transactional:
+            adapted = raw.dbapi_connection
+            if adapted._transaction is None:
+                # El adaptador de SQLAlchemy abre la transacción con la primera sentencia
+                # que pasa por él; aquí no pasa ninguna, así que se abre explícitamente
+                await adapted._start_transaction()
+
+        cache = raw.info.get("hot_statements")
+        if cache is None or cache[0] is not driver:
+            # Conexión nueva (o reemplazada tras invalidarse): sus statements no existen aún
+            cache = raw.info["hot_statements"] = (driver, {}, next(_cache_ids))
+        _, statements, cache_id = cache
+
+        async def statement(name: str):
+            prepared = statements.get(name)
+            if prepared is None:
+                # Nombre único por caché: no choca con statements de una caché anterior de la misma conexión
+                prepared = await driver.prepare(STATEMENTS[name], name=f"hq_{name}_{cache_id}")
+                statements[name] = prepared
+                self.prepares += 1
+            self.executions += 1
+            return prepared
+
+        try:
+            yield driver, statement
+        except asyncpg.exceptions.InvalidCachedStatementError:
+            # Statement invalidado por un cambio de esquema: se vuelve a preparar en el siguiente uso
+            raw.info.pop("hot_statements", None)
+            raise
+
+    def _measure(self, name: str):
+        return self.timer.measure(STATEMENTS[name]) if self.timer is not None else nullcontext()
+
+    async def _run(self, db_session, name: str, method: str, *args, transactional: bool = False):
+        async with self.connection(db_session, transactional) as (conn, statement):
+            prepared = await statement(name)
+            with self._measure(name):
+                return await getattr(prepared, method)(*args)
+
+    async def chat_auth(self, db_session, telegram_chat_id: int):
+        return await self._run(db_session, "chat_auth", "fetchrow", telegram_chat_id)
+
+    async def login_session(self, db_session, token: str, username: str):
+        return await self._run(db_session, "login_session", "fetchrow", token, username)
+
+    async def link_session(self, db_session, session_id: int, user_id: int):
+        await self._run(db_session, "link_session", "fetch", session_id, user_id, transactional=True)
+
+    async def insert_order(self, db_session, order_json: str, outbox_events: Sequence[str] = (),
+                           outbox_payload: Optional[Callable[[int], str]] = None) -> Optional[int]:
+        """
+        Inserta el pedido con `insert_pedido_completo` y sus eventos del outbox
+        (el payload depende del id asignado) en la transacción de `db_session`.
+        """
+        async with self.connection(db_session, transactional=True) as (conn, statement):
+            insert = await statement("insert_order")
+            with self._measure("insert_order"):
+                order_id = await insert.fetchval(order_json)
+            if order_id and outbox_events:
+                outbox = await statement("insert_outbox")
+                with self._measure("insert_outbox"):
+                    await outbox.fetch(list(outbox_events), outbox_payload(order_id))
+            return order_id
+
+    def stats(self) -> dict:
+        return {"prepares": self.prepares, "executions": self.executions}
+
+
+# Solo con el driver asyncpg; con otro driver se usan las consultas de SQLAlchemy
+hot_queries: Optional[HotQueries] = (
+    HotQueries(query_timer) if settings.DB_FAST_PATH_ENABLED and engine.dialect.driver == "asyncpg" else None
+)
@@ -0,0 +1,186 @@
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Sequence
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+logger = logging.getLogger(__name__)
+
+# Límites (ms) de los buckets del histograma de espera por una conexión
+WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# Clave en el `info` de una conexión recién abierta con lo que tardó en conectar
+_CONNECT_SECONDS = "_instrumented_connect_seconds"
+
+
+class WaitHistogram:
+    """Histograma acumulado de tiempos de espera, con buckets fijos en ms."""
+
+    def __init__(self, buckets_ms: Sequence[float] = WAIT_BUCKETS_MS):
+        self.buckets_ms = tuple(buckets_ms)
+        self.counts = [0] * (len(self.buckets_ms) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, seconds: float):
+        ms = seconds * 1000
+        for index, limit in enumerate(self.buckets_ms):
+            if ms <= limit:
+                break
+        else:
+            index = len(self.buckets_ms)
+        self.counts[index] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def snapshot(self) -> dict:
+        buckets = {f"le_{limit}ms": count for limit, count in zip(self.buckets_ms, self.counts)}
+        buckets["inf"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "buckets": buckets,
+        }
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """
+    Pool asyncio que mide cuánto espera cada checkout por una conexión libre y,
+    aparte, cuánto se tarda en abrir las conexiones nuevas: un pool que crece
+    no debe confundirse con uno saturado.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait = WaitHistogram()
+        self.connect_time = WaitHistogram()
+        self.timeouts = 0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except PoolTimeoutError:
+            self.timeouts += 1
+            self.wait.observe(time.perf_counter() - start)
+            raise
+        # El tiempo de conexión (si hubo que abrir una) ya está en `connect_time`
+        connect_seconds = record.info.pop(_CONNECT_SECONDS, 0.0)
+        self.wait.observe(time.perf_counter() - start - connect_seconds)
+        return record
+
+    def _create_connection(self):
+        start = time.perf_counter()
+        try:
+            record = super()._create_connection()
+        finally:
+            elapsed = time.perf_counter() - start
+            self.connect_time.observe(elapsed)
+        record.info[_CONNECT_SECONDS] = elapsed
+        return record
+
+
+def pool_stats(pool) -> dict:
+    stats = {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": pool.overflow(),
+    }
+    if isinstance(pool, InstrumentedPool):
+        stats["timeouts"] = pool.timeouts
+        stats["checkout_wait"] = pool.wait.snapshot()
+        stats["connect_time"] = pool.connect_time.snapshot()
+    return stats
+
+
+class QueryTimer:
+    """
+    Tiempo de cada sentencia mediante los eventos before/after_cursor_execute,
+    más las que se envían directamente por asyncpg (ver `measure`).
+
+    Agrega por texto de sentencia (con parámetros ligados, así que el número de
+    sentencias distintas está acotado) y registra en el log las que superan
+    `slow_ms`, guardando las más recientes para /metrics.
+    """
+
+    def __init__(self, slow_ms: float = 200.0, max_statements: int = 500, recent_slow: int = 50):
+        self.slow_ms = slow_ms
+        self.max_statements = max_statements
+        self.statements: Dict[str, Dict[str, float]] = {}
+        self.slow: Deque[dict] = deque(maxlen=recent_slow)
+        self.queries = 0
+        self.slow_queries = 0
+
+    def attach(self, engine):
+        sync_engine = getattr(engine, "sync_engine", engine)
+        event.listen(sync_engine, "before_cursor_execute", self._before)
+        event.listen(sync_engine, "after_cursor_execute", self._after)
+        event.listen(sync_engine, "handle_error", self._error)
+
+    def _before(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    def _after(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("query_start")
+        if not starts:
+            return
+        self.observe(statement, time.perf_counter() - starts.pop())
+
+    def _error(self, context):
+        starts = context.connection.info.get("query_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+    @contextmanager
+    def measure(self, statement: str):
+        """Mide una sentencia que no pasa por SQLAlchemy (p. ej. un statement preparado de asyncpg)."""
+        start = time.perf_counter()
+        yield
+        self.observe(statement, time.perf_counter() - start)
+
+    def observe(self, statement: str, seconds: float):
+        ms = seconds * 1000
+        self.queries += 1
+        key = " ".join(statement.split())[:200]
+        stats = self.statements.get(key)
+        if stats is None:
+            if len(self.statements) >= self.max_statements:
+                key = "(other)"
+                stats = self.statements.get(key)
+            if stats is None:
+                stats = self.statements[key] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0}
+        stats["count"] += 1
+        stats["total_ms"] += ms
+        stats["max_ms"] = max(stats["max_ms"], ms)
+
+        if self.slow_ms and ms >= self.slow_ms:
+            self.slow_queries += 1
+            self.slow.append({"statement": key, "ms": round(ms, 2), "at": time.time()})
+            logger.warning(f"Slow query ({ms:.1f} ms): {key}")
+
+    def stats(self, top: int = 10) -> dict:
+        slowest = sorted(self.statements.items(), key=lambda item: item[1]["total_ms"], reverse=True)[:top]
+        return {
+            "queries": self.queries,
+            "slow_queries": self.slow_queries,
+            "slow_threshold_ms": self.slow_ms,
+            "top_by_total_time": [
+                {
+                    "statement": statement,
+                    "count": stats["count"],
+                    "total_ms": round(stats["total_ms"], 2),
+                    "avg_ms": round(stats["total_ms"] / stats["count"], 3),
+                    "max_ms": round(stats["max_ms"], 2),
+                }
+                for statement, stats in slowest
+            ],
+            "recent_slow": list(self.slow),
+        }
@@ -0,0 +1,82 @@
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.connection import async_session
+
+
+class UnitOfWork:
+    """
+    Sesión de base de datos compartida por todo el procesamiento de un update
+    de Telegram o de una petición HTTP.
+
+    La sesión se crea de forma perezosa y solo toma una conexión del pool al
+    ejecutar la primera consulta. Al salir del `async with` se confirma lo
+    pendiente, o se deshace si hubo una excepción. `memo` guarda resultados ya
+    consultados durante la misma unidad de trabajo (p. ej. la autenticación
+    del chat) para que los helpers no repitan la consulta.
+    """
+
+    def __init__(self, session_factory=async_session):
+        self._session_factory = session_factory
+        self._session: Optional[AsyncSession] = None
+        self.memo: Dict[Any, Any] = {}
+
+    @property
+    def session(self) -> AsyncSession:
+        if self._session is None:
+            self._session = self._session_factory()
+        return self._session
+
+    async def commit(self):
+        if self._session is not None:
+            await self._session.commit()
+
+    async def rollback(self):
+        if self._session is not None:
+            await self._session.rollback()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        self.memo.clear()
+
+    async def __aenter__(self) -> "UnitOfWork":
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                await self.commit()
+            else:
+                await self.rollback()
+        finally:
+            await self.close()
+
+
+_current_unit_of_work: ContextVar[Optional[UnitOfWork]] = ContextVar("current_unit_of_work", default=None)
+
+
+def get_current_unit_of_work() -> Optional[UnitOfWork]:
+    """Devuelve la unidad de trabajo activa en el contexto actual, si la hay."""
+    return _current_unit_of_work.get()
+
+
+@asynccontextmanager
+async def unit_of_work():
+    """Abre una unidad de trabajo y la publica en el contexto mientras dura."""
+    async with UnitOfWork() as uow:
+        token = _current_unit_of_work.set(uow)
+        try:
+            yield uow
+        finally:
+            _current_unit_of_work.reset(token)
+
+
+async def get_unit_of_work():
+    """Dependencia de FastAPI: una unidad de trabajo por petición."""
+    async with unit_of_work() as uow:
+        yield uow
@@ -5,8 +5,14 @@ from fastapi.responses import FileResponse
 from app.config import settings
 from app.api.routes.webhook import router as webhook_router
 from app.api.routes.auth import router as auth_router
-# dashboard no existe, así que comentado
-# from app.api.routes.dashboard import router as dashboard_router
+from app.api.routes.metrics import router as metrics_router
+from app.api.routes.admin import router as admin_router
+from app.api.routes.orders import router as orders_router
+from app.api.routes.analytics import router as analytics_router
+from app.api.routes.webhook import update_dispatcher, update_deduplicator, outbox_dispatcher, printer_service
+from app.services.menu_catalog import menu_catalog
+from app.services.session_janitor import session_janitor
+from app.api.routes.dashboard import router as dashboard_router, ws_router as dashboard_ws_router, load_dashboard_state, dashboard_broker
 from app.database.connection import init_db
 
 app = FastAPI(
@@ -26,7 +32,12 @@ app.add_middleware(
 # Incluir routers
 app.include_router(webhook_router, prefix=settings.API_V1_STR)
 app.include_router(auth_router, prefix=settings.API_V1_STR)
-# app.include_router(dashboard_router, prefix=settings.API_V1_STR)  # No existe aún
+app.include_router(metrics_router, prefix=settings.API_V1_STR)
+app.include_router(admin_router, prefix=settings.API_V1_STR)
+app.include_router(dashboard_router, prefix=settings.API_V1_STR)
+app.include_router(orders_router, prefix=settings.API_V1_STR)
+app.include_router(analytics_router, prefix=settings.API_V1_STR)
+app.include_router(dashboard_ws_router)
 
 async def setup_telegram_webhook():
     """Configura el webhook de Telegram automáticamente."""
@@ -51,8 +62,27 @@ async def setup_telegram_webhook():
 @app.on_event("startup")
 async def startup_event():
     await init_db()
+    await update_deduplicator.load_recent()
+    await menu_catalog.start()
+    await load_dashboard_state()
+    if dashboard_broker is not None:
+        await dashboard_broker.start()
+    await printer_service.start()
+    await outbox_dispatcher.start()
+    await update_dispatcher.start()
+    await session_janitor.start()
     await setup_telegram_webhook()
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    await session_janitor.stop()
+    await update_dispatcher.stop()
+    await outbox_dispatcher.stop()
+    if dashboard_broker is not None:
+        await dashboard_broker.stop()
+    await printer_service.stop()
+    await menu_catalog.stop()
+
 @app.get("/")
 async def root():
     return {"message": "Restaurant Orders API"}
@@ -1,2 +1,7 @@
 from .order import Order, OrderItem, Payment
 from .user import User, MagicLink, UserSession
+from .telegram import ProcessedUpdate
+from .llm_cache import LLMResponseCacheEntry
+from .product import Product
+from .outbox import OutboxEvent
+from .sales import SalesHourly, SalesProductHourly, SalesPaymentHourly
@@ -1,5 +1,5 @@
 from sqlalchemy import (
-    Column, Integer, String, Float, DateTime, ForeignKey, Text
+    Column, Integer, String, Float, DateTime, ForeignKey, Text, Index
 )
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -13,6 +13,9 @@ class Order(Base):
     id = Column(Integer, primary_key=True, index=True)
     customer_name = Column(String, name="cliente_test")
     delivery_time = Column(String, name="hora_entrega")
+    # Hora de entrega interpretada al registrar el pedido e inicio de su franja
+    delivery_at = Column(DateTime(timezone=True), name="entrega_at", nullable=True)
+    delivery_slot = Column(DateTime(timezone=True), name="franja_entrega", nullable=True)
     destination = Column(String, name="destino")
     total_amount = Column(Float, name="importe_total")
     observations = Column(Text, name="observaciones")
@@ -22,11 +25,22 @@ class Order(Base):
     items = relationship("OrderItem", back_populates="order")
     payment = relationship("Payment", uselist=False, back_populates="order")
 
+    __table_args__ = (
+        # Paginación por (created_at, id), sin filtro y con los filtros del listado
+        Index("idx_orders_created_at_id", "created_at", "id"),
+        Index("idx_orders_status_created_at_id", "status", "created_at", "id"),
+        # Franjas de un día por rango sobre el índice; status incluido para contar sin leer la tabla
+        Index("idx_orders_delivery_slot_created_at_id", "franja_entrega", "created_at", "id",
+              postgresql_include=["status"]),
+    )
+
     def to_dict(self):
         return {
             "id": self.id,
             "customer_name": self.customer_name,
             "delivery_time": self.delivery_time,
+            "delivery_at": self.delivery_at.isoformat() if self.delivery_at else None,
+            "delivery_slot": self.delivery_slot.isoformat() if self.delivery_slot else None,
             "destination": self.destination,
             "total_amount": self.total_amount,
             "observations": self.observations,
@@ -40,7 +54,7 @@ class OrderItem(Base):
     __tablename__ = 'order_items'
 
     id = Column(Integer, primary_key=True, index=True)
-    order_id = Column(Integer, ForeignKey('orders.id'), name="v_pedido_id")
+    order_id = Column(Integer, ForeignKey('orders.id'), name="v_pedido_id", index=True)
     product_name = Column(String, name="v_producto_test")
     quantity = Column(Integer, name="v_cantidad")
     price = Column(Float, name="v_precio")
@@ -62,7 +76,7 @@ class Payment(Base):
     __tablename__ = 'payments'
 
     id = Column(Integer, primary_key=True, index=True)
-    order_id = Column(Integer, ForeignKey('orders.id'), name="v_pedido_id")
+    order_id = Column(Integer, ForeignKey('orders.id'), name="v_pedido_id", index=True)
     method = Column(String, name="v_metodo")
     amount = Column(Float, name="v_importe")
     status = Column(String, name="v_estado")
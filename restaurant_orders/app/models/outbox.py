@@ -0,0 +1,25 @@
+from sqlalchemy import Column, BigInteger, Integer, String, Text, DateTime, Index
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+from app.database.connection import Base
+
+class OutboxEvent(Base):
+    __tablename__ = "order_outbox"
+
+    id = Column(BigInteger, primary_key=True, index=True)
+    event_type = Column(String(50), nullable=False)
+    payload = Column(JSONB, nullable=False)
+    # pending -> done | failed
+    status = Column(String(20), nullable=False, default="pending", server_default="pending")
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    last_error = Column(Text, nullable=True)
+    available_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Solo los eventos pendientes se consultan en cada ronda del dispatcher
+        Index("idx_order_outbox_pending", "available_at", postgresql_where=(status == "pending")),
+        # Purga de los eventos entregados
+        Index("idx_order_outbox_done", "processed_at", postgresql_where=(status == "done")),
+    )
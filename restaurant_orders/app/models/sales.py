@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, String, Numeric, DateTime
+from app.database.connection import Base
+
+# Agregados de ventas por hora; los mantienen triggers en la base de datos
+# (ver database/analytics_schema.sql) en la misma transacción que cada pedido
+
+class SalesHourly(Base):
+    __tablename__ = "sales_hourly"
+
+    hour = Column(DateTime(timezone=True), primary_key=True)
+    orders = Column(Integer, nullable=False, default=0)
+    revenue = Column(Numeric(14, 2), nullable=False, default=0)
+
+class SalesProductHourly(Base):
+    __tablename__ = "sales_product_hourly"
+
+    hour = Column(DateTime(timezone=True), primary_key=True)
+    product = Column(String, primary_key=True)
+    quantity = Column(Integer, nullable=False, default=0)
+    revenue = Column(Numeric(14, 2), nullable=False, default=0)
+
+class SalesPaymentHourly(Base):
+    __tablename__ = "sales_payment_hourly"
+
+    hour = Column(DateTime(timezone=True), primary_key=True)
+    method = Column(String, primary_key=True)
+    payments = Column(Integer, nullable=False, default=0)
+    amount = Column(Numeric(14, 2), nullable=False, default=0)
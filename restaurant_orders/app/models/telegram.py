@@ -0,0 +1,9 @@
+from sqlalchemy import Column, BigInteger, DateTime
+from sqlalchemy.sql import func
+from app.database.connection import Base
+
+class ProcessedUpdate(Base):
+    __tablename__ = "processed_updates"
+
+    update_id = Column(BigInteger, primary_key=True, autoincrement=False)
+    processed_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Index, text
 from sqlalchemy.sql import func
 from app.database.connection import Base
 
@@ -34,4 +34,10 @@ class UserSession(Base):
     user_id = Column(Integer, nullable=True)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    expires_at = Column(DateTime(timezone=True), nullable=False)
\ No newline at end of file
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    __table_args__ = (
+        # Sesión vigente de un chat; solo las activas, no todo el historial
+        Index("idx_user_sessions_chat_active", "telegram_chat_id", text("expires_at DESC"),
+              postgresql_where=text("is_active")),
+    )
@@ -1,13 +1,53 @@
 import logging
+from typing import Optional
 from langchain_openai import ChatOpenAI
 from langchain_core.tools import tool
 from langchain_core.messages import HumanMessage
 from app.config import settings
+from app.services.intent import Intent, classify_intent
+from app.services.llm_cache import llm_response_cache
+from app.services.llm_governor import CircuitOpenError, llm_governor
 
 logger = logging.getLogger(__name__)
 
-# Herramientas disponibles - actualmente solo se usa la detección de login
-# Las herramientas específicas se implementarán cuando se necesiten
+# Prompt de respuestas conversacionales. Si se modifica, subir LLM_PROMPT_VERSION
+# para que la caché no sirva respuestas generadas con el prompt anterior
+RESPONSE_PROMPT = "Responde de manera amigable y útil al siguiente mensaje: '{message}'. Mantén la respuesta concisa."
+
+# Prompt de extracción de pedidos cuando el intérprete local no está seguro
+ORDER_PROMPT = (
+    "Extrae el pedido del siguiente mensaje de un cliente de restaurante. Llama a "
+    "insert_pedido una vez, a insert_detalle_pedido una vez por producto y a insert_pago "
+    "si se indica el método de pago. Si el mensaje no es un pedido, no llames a ninguna "
+    "herramienta. Mensaje: '{message}'"
+)
+
+
+# Herramientas de pedido: solo describen las llamadas para el LLM. Los argumentos
+# los consume OrderProcessor, que valida productos y fija precios con el catálogo.
+@tool
+def insert_pedido(v_cliente_test: Optional[str] = None, v_hora_entrega: Optional[str] = None,
+                  v_destino: Optional[str] = None, v_importe_total: Optional[float] = None,
+                  v_observaciones: Optional[str] = None) -> str:
+    """Registra la cabecera del pedido: cliente, hora de entrega (tal como la escribe el cliente), dirección de entrega, importe total y observaciones."""
+    return "ok"
+
+
+@tool
+def insert_detalle_pedido(v_producto_test: str, v_cantidad: int = 1, v_precio: Optional[float] = None,
+                          v_notas: Optional[str] = None) -> str:
+    """Registra un producto del pedido con su cantidad, precio unitario si se conoce y notas (p. ej. "sin cebolla")."""
+    return "ok"
+
+
+@tool
+def insert_pago(v_metodo: str, v_importe: Optional[float] = None, v_estado: str = "pendiente") -> str:
+    """Registra el pago del pedido: método (efectivo, tarjeta, yape...), importe y estado."""
+    return "ok"
+
+
+ORDER_TOOLS = [insert_pedido, insert_detalle_pedido, insert_pago]
+
 
 class AIOrderAgent:
     def __init__(self):
@@ -21,6 +61,7 @@ class AIOrderAgent:
             raise ValueError("La variable de entorno MODEL_KEY no está configurada.")
 
         model_name = settings.MODEL
+        self.model_name = model_name
 
         # Inicializar el modelo con OpenRouter (compatible con OpenAI)
         self.llm = ChatOpenAI(
@@ -30,8 +71,15 @@ class AIOrderAgent:
             temperature=0
         )
 
-        # No tools for now - simplified implementation
-        self.llm_with_tools = self.llm
+        # Modelo con las herramientas insert_* para extraer pedidos
+        self.llm_with_tools = self.llm.bind_tools(ORDER_TOOLS)
+
+        # Caché de respuestas para los mensajes repetidos ("hola", "gracias", ...)
+        self.response_cache = llm_response_cache
+
+        # Todas las llamadas al LLM pasan por el governor (concurrencia, plazos,
+        # agrupación de prompts idénticos y circuit breaker)
+        self.governor = llm_governor
 
     async def process_message(self, message: str):
         """
@@ -41,10 +89,13 @@ class AIOrderAgent:
         logger.info(f"Processing message: {message}")
         try:
             # Crear el mensaje humano
-            human_message = HumanMessage(content=message)
+            human_message = HumanMessage(content=ORDER_PROMPT.format(message=message))
 
             # Invocar el modelo con herramientas
-            response = await self.llm_with_tools.ainvoke([human_message])
+            response = await self.governor.call(
+                lambda: self.llm_with_tools.ainvoke([human_message]),
+                key=("tools", message)
+            )
             logger.debug(f"AI response tool_calls: {response.tool_calls}")
 
             # Devolver las llamadas a herramientas
@@ -61,29 +112,79 @@ class AIOrderAgent:
         message = message_data.get("message", "")
         logger.info(f"Generating AI response for message: {message}")
 
-        # Check if message contains login keywords - don't respond with AI
-        login_keywords = [
-            'iniciar sesión', 'iniciar sesion', 'login', 'log in', 'autenticar', 'autenticarme',
-            'ingresar', 'entrar', 'acceder', 'registrarme', 'registrar',
-            'quiero iniciar', 'necesito iniciar', 'deseo iniciar',
-            'session', 'sesion', 'loguear', 'loguearme', 'acceder',
-            'enviame el enlace', 'dame el link', 'link de login', 'enlace de login'
-        ]
-
-        message_lower = message.lower()
-        for keyword in login_keywords:
-            if keyword in message_lower:
-                logger.info("Login keyword detected, not generating AI response")
-                return None  # Return None to indicate login should be handled by webhook
+        # Check if message is a login request - don't respond with AI.
+        # El webhook ya clasificó el mensaje; solo se reclasifica si no viene la intención
+        intent = message_data["intent"] if "intent" in message_data else classify_intent(message)
+        if intent is Intent.LOGIN:
+            logger.info("Login keyword detected, not generating AI response")
+            return None  # Return None to indicate login should be handled by webhook
+
+        cache_key = self.response_cache.key_for(message, self.model_name, settings.LLM_PROMPT_VERSION)
+        if cache_key:
+            cached_response = await self.response_cache.get(cache_key)
+            if cached_response is not None:
+                logger.debug("Serving AI response from cache")
+                return cached_response
 
         try:
-            prompt = f"Responde de manera amigable y útil al siguiente mensaje: '{message}'. Mantén la respuesta concisa."
+            prompt = RESPONSE_PROMPT.format(message=message)
             human_message = HumanMessage(content=prompt)
-            response = await self.llm.ainvoke([human_message])
+            response = await self.governor.call(
+                lambda: self.llm.ainvoke([human_message]),
+                key=("chat", prompt)
+            )
             ai_response = response.content.strip()
             logger.debug(f"Generated AI response: {ai_response}")
+            if cache_key and ai_response:
+                await self.response_cache.set(cache_key, message, ai_response, self.model_name, settings.LLM_PROMPT_VERSION)
             return ai_response
+        except CircuitOpenError:
+            # Proveedor caído: respuesta inmediata sin esperar al LLM
+            logger.warning("LLM circuit open, serving fallback response")
+            return f"Entendido: {message}"
         except Exception as e:
             logger.error(f"Error generating AI response: {str(e)}")
             # Fallback
             return f"Entendido: {message}"
+
+    async def stream_response(self, message_data: dict):
+        """
+        Igual que generate_response, pero entrega la respuesta como un stream de
+        fragmentos de texto a medida que el LLM los genera. Los mensajes de login
+        no deben llegar aquí: el webhook los atiende antes.
+        """
+        message = message_data.get("message", "")
+        logger.info(f"Streaming AI response for message: {message}")
+
+        cache_key = self.response_cache.key_for(message, self.model_name, settings.LLM_PROMPT_VERSION)
+        if cache_key:
+            cached_response = await self.response_cache.get(cache_key)
+            if cached_response is not None:
+                logger.debug("Serving AI response from cache")
+                yield cached_response
+                return
+
+        prompt = RESPONSE_PROMPT.format(message=message)
+        human_message = HumanMessage(content=prompt)
+        parts = []
+        completed = False
+        try:
+            async for chunk in self.governor.stream(lambda: self.llm.astream([human_message])):
+                if chunk.content:
+                    parts.append(chunk.content)
+                    yield chunk.content
+            completed = True
+        except CircuitOpenError:
+            logger.warning("LLM circuit open, serving fallback response")
+        except Exception as e:
+            logger.error(f"Error streaming AI response: {str(e)}")
+
+        if not parts:
+            # Fallback: nada llegó del LLM
+            yield f"Entendido: {message}"
+            return
+
+        ai_response = "".join(parts).strip()
+        # Un stream cortado a medias no se cachea: se serviría truncado durante todo el TTL
+        if completed and cache_key and ai_response:
+            await self.response_cache.set(cache_key, message, ai_response, self.model_name, settings.LLM_PROMPT_VERSION)
@@ -0,0 +1,86 @@
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+from app.config import settings
+
+
+@dataclass(frozen=True)
+class ChatAuth:
+    """Usuario vinculado a un chat de Telegram mediante una sesión activa."""
+    user_id: int
+    role: str
+    expires_at: datetime
+
+    def is_expired(self) -> bool:
+        expires_at = self.expires_at
+        if expires_at.tzinfo is None:
+            expires_at = expires_at.replace(tzinfo=timezone.utc)
+        return expires_at <= datetime.now(timezone.utc)
+
+
+# Marcador para distinguir "no está en caché" de "está en caché como no autenticado"
+MISSING: Any = object()
+
+
+class AuthCache:
+    """
+    Caché TTL + LRU de chat_id -> ChatAuth (o None si el chat no está autenticado).
+
+    Las entradas positivas nunca sobreviven a la expiración de la sesión; las
+    negativas usan un TTL más corto porque un login hecho en otro proceso no
+    puede invalidarlas.
+
+    `invalidate` solo limpia la caché del proceso que atiende el login o el
+    /logout. Con varios workers de uvicorn, un chat que cierra sesión sigue
+    autenticado en los demás hasta que caduca su entrada, así que el TTL
+    positivo es también el retraso máximo de un /logout entre procesos.
+    """
+
+    def __init__(self, ttl_seconds: float = 15, negative_ttl_seconds: float = 10, capacity: int = 5000):
+        self.ttl = ttl_seconds
+        self.negative_ttl = negative_ttl_seconds
+        self.capacity = capacity
+        self._entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, chat_id: int) -> Optional[ChatAuth]:
+        """Devuelve la entrada cacheada o MISSING si no hay una vigente."""
+        entry = self._entries.get(chat_id)
+        if entry is not None:
+            value, valid_until = entry
+            if valid_until > time.monotonic() and not (value is not None and value.is_expired()):
+                self._entries.move_to_end(chat_id)
+                self.hits += 1
+                return value
+            del self._entries[chat_id]
+        self.misses += 1
+        return MISSING
+
+    def set(self, chat_id: int, value: Optional[ChatAuth]):
+        ttl = self.ttl if value is not None else self.negative_ttl
+        self._entries[chat_id] = (value, time.monotonic() + ttl)
+        self._entries.move_to_end(chat_id)
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, chat_id: int):
+        self._entries.pop(chat_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "capacity": self.capacity,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+auth_cache = AuthCache(
+    ttl_seconds=settings.AUTH_CACHE_TTL_SECONDS,
+    negative_ttl_seconds=settings.AUTH_CACHE_NEGATIVE_TTL_SECONDS,
+    capacity=settings.AUTH_CACHE_MAX_ENTRIES
+)
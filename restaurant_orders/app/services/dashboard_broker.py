@@ -0,0 +1,228 @@
+import asyncio
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# Postgres rechaza payloads de NOTIFY de 8000 bytes o más
+MAX_NOTIFY_PAYLOAD = 7900
+
+# Evento que pide a todos los workers recargar el estado desde la base de datos
+RELOAD_EVENT = {"type": "reload"}
+
+NOTIFY_SQL = text("SELECT pg_notify(:channel, payload) FROM unnest(CAST(:payloads AS text[])) AS payload")
+
+
+def pack_events(events: List[Dict[str, Any]], limit: int = MAX_NOTIFY_PAYLOAD) -> List[str]:
+    """
+    Agrupa eventos en el menor número de payloads JSON (listas de eventos) que
+    caben en un NOTIFY, conservando el orden. Un evento que no cabe por sí solo
+    se sustituye por RELOAD_EVENT: quienes lo reciban recargan desde la base.
+    """
+    payloads = []
+    batch: List[str] = []
+    size = 2
+    for event in events:
+        encoded = json.dumps(event, default=str)
+        if len(encoded.encode("utf-8")) + 2 > limit:
+            encoded = json.dumps(RELOAD_EVENT)
+        encoded_size = len(encoded.encode("utf-8")) + 1
+        if batch and size + encoded_size > limit:
+            payloads.append("[" + ",".join(batch) + "]")
+            batch, size = [], 2
+        batch.append(encoded)
+        size += encoded_size
+    if batch:
+        payloads.append("[" + ",".join(batch) + "]")
+    return payloads
+
+
+def listen_dsn(database_url: str) -> str:
+    """DSN para asyncpg a partir de una URL de SQLAlchemy (postgresql+asyncpg://...)."""
+    scheme, sep, rest = database_url.partition("://")
+    return f"{scheme.split('+')[0]}{sep}{rest}"
+
+
+class PostgresBroker:
+    """
+    Reparto de eventos del dashboard entre workers con LISTEN/NOTIFY.
+
+    Cada worker publica sus eventos con NOTIFY y mantiene una única conexión
+    LISTEN desde la que los aplica a su feed y los reenvía a sus sockets, también
+    los suyos propios: todos los workers ven los eventos en el mismo orden (el de
+    commit). Los eventos publicados en la misma ventana de `batch_window`
+    segundos salen en un solo NOTIFY, y las notificaciones que llegan en ráfaga
+    se aplican por lotes.
+
+    El seq de cada worker es local y va con su propio epoch, así que un cliente
+    que reconecta a otro worker recibe un snapshot. Si se pierde la conexión
+    LISTEN se recarga el estado con `on_reload` al volver a conectar.
+    """
+
+    def __init__(self, engine, dsn: str, channel: str,
+                 deliver: Callable[[List[Dict[str, Any]]], None],
+                 on_reload: Callable[[], Awaitable[None]],
+                 batch_window: float = 0.005, max_batch: int = 200,
+                 reconnect_delay: float = 2.0, keepalive: float = 30.0):
+        self.engine = engine
+        self.dsn = dsn
+        self.channel = channel
+        self.deliver = deliver
+        self.on_reload = on_reload
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.reconnect_delay = reconnect_delay
+        self.keepalive = keepalive
+
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._flusher: Optional[asyncio.Task] = None
+        self._notifications: asyncio.Queue = asyncio.Queue()
+        self._listener: Optional[asyncio.Task] = None
+        self._relay: Optional[asyncio.Task] = None
+        self.connected = False
+
+        self.published = 0
+        self.notifies = 0
+        self.received = 0
+        self.relay_batches = 0
+        self.reloads = 0
+        self.reconnects = 0
+        self.last_lag_ms = 0.0
+
+    # --- Publicación ---
+
+    async def publish(self, event: Dict[str, Any]):
+        """Publica un evento; vuelve cuando su NOTIFY se ha confirmado (o lanza el error)."""
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((event, future))
+        if len(self._pending) == 1:
+            # Primer evento de la ventana: programa el envío del lote
+            self._flusher = asyncio.create_task(self._flush_later())
+        await future
+
+    async def _flush_later(self):
+        await asyncio.sleep(self.batch_window)
+        pending, self._pending = self._pending, []
+        events = [{**event, "ts": time.time()} for event, _ in pending]
+        try:
+            payloads = pack_events(events)
+            # Un solo round-trip y una transacción: los NOTIFY salen juntos al hacer commit
+            async with self.engine.begin() as conn:
+                await conn.execute(NOTIFY_SQL, {"channel": self.channel, "payloads": payloads})
+            self.published += len(events)
+            self.notifies += len(payloads)
+        except Exception as e:
+            logger.error(f"Error publishing dashboard events: {e}")
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for _, future in pending:
+            if not future.done():
+                future.set_result(None)
+
+    # --- Escucha ---
+
+    async def start(self):
+        if self._listener is None:
+            self._relay = asyncio.create_task(self._relay_loop())
+            self._listener = asyncio.create_task(self._listen_loop())
+
+    async def stop(self):
+        for task in (self._listener, self._relay, self._flusher):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._listener = self._relay = self._flusher = None
+
+    def _on_notification(self, connection, pid, channel, payload):
+        self._notifications.put_nowait(payload)
+
+    async def _listen_loop(self):
+        import asyncpg
+
+        first = True
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(self.dsn)
+                lost = asyncio.Event()
+                connection.add_termination_listener(lambda _: lost.set())
+                await connection.add_listener(self.channel, self._on_notification)
+                self.connected = True
+                if not first:
+                    self.reconnects += 1
+                first = False
+                # Lo publicado mientras no escuchábamos se ha perdido: se recarga
+                # el estado ahora que ningún evento posterior puede escaparse
+                self._notifications.put_nowait(json.dumps([RELOAD_EVENT]))
+                while not lost.is_set():
+                    try:
+                        await asyncio.wait_for(lost.wait(), timeout=self.keepalive)
+                    except asyncio.TimeoutError:
+                        # Detecta conexiones muertas que no avisan del cierre
+                        await asyncio.wait_for(connection.execute("SELECT 1"), timeout=self.keepalive)
+                logger.warning("Dashboard LISTEN connection lost")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Dashboard LISTEN connection failed: {e}")
+            finally:
+                self.connected = False
+                if connection is not None and not connection.is_closed():
+                    try:
+                        await connection.close(timeout=self.keepalive)
+                    except Exception:
+                        pass
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def _relay_loop(self):
+        while True:
+            payloads = [await self._notifications.get()]
+            while len(payloads) < self.max_batch and not self._notifications.empty():
+                payloads.append(self._notifications.get_nowait())
+            try:
+                await self._relay_batch(payloads)
+            except Exception as e:
+                logger.error(f"Error relaying dashboard events: {e}")
+
+    async def _relay_batch(self, payloads: List[str]):
+        events = []
+        for payload in payloads:
+            try:
+                events.extend(json.loads(payload))
+            except ValueError:
+                logger.warning(f"Ignoring malformed dashboard notification: {payload[:80]!r}")
+        self.received += len(events)
+        self.relay_batches += 1
+
+        if any(event.get("type") == RELOAD_EVENT["type"] for event in events):
+            # El estado recargado ya incluye todo lo que venía en el lote
+            self.reloads += 1
+            await self.on_reload()
+            return
+
+        if events and events[-1].get("ts"):
+            self.last_lag_ms = round((time.time() - events[-1]["ts"]) * 1000, 2)
+        self.deliver([{k: v for k, v in event.items() if k != "ts"} for event in events])
+
+    def stats(self) -> dict:
+        return {
+            "backend": "postgres",
+            "channel": self.channel,
+            "connected": self.connected,
+            "published": self.published,
+            "notifies": self.notifies,
+            "received": self.received,
+            "relay_batches": self.relay_batches,
+            "reloads": self.reloads,
+            "reconnects": self.reconnects,
+            "last_lag_ms": self.last_lag_ms,
+        }
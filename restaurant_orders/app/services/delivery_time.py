@@ -0,0 +1,111 @@
+import re
+from datetime import date, datetime, time, timedelta, tzinfo
+from typing import Optional, Tuple
+
+from app.services.intent import normalize_text
+
+# "12:30", "12.30", "12h30", "12 30 pm", "1pm", "a las 2", "13 hrs", "11 y 45", "2 y cuarto"
+_CLOCK = re.compile(
+    r"\b(?P<hour>[01]?\d|2[0-3])"
+    r"(?:\s*(?:[:.h]|\s)\s*(?P<minute>[0-5]\d)|\s+y\s+(?P<fraction>cuarto|media|[0-5]?\d)\b)?"
+    r"\s*(?:hrs?|horas?)?\s*(?P<meridiem>am|pm|a\.?\s?m\.?|p\.?\s?m\.?)?(?!\d)"
+)
+_FRACTIONS = {"cuarto": 15, "media": 30}
+_ASAP = ("ahora", "lo antes posible", "cuanto antes", "inmediato", "asap")
+# Solo cuentan como "cuanto antes" si son todo el mensaje ("a las 9 ya sabes" no lo es)
+_ASAP_ALONE = ("ya",)
+_NAMED = {"mediodia": time(12, 0), "medio dia": time(12, 0), "medianoche": time(0, 0)}
+_PERIOD = re.compile(r"\b(?:de|por) la (?P<period>manana|madrugada|tarde|noche)\b")
+# "mañana" como día, no "de/por la mañana"
+_TOMORROW = re.compile(r"(?<!de la )(?<!por la )\bmanana\b")
+
+
+def _to_24h(hour: int, meridiem: str, period: Optional[str]) -> int:
+    if meridiem == "pm" or period == "tarde":
+        return hour + 12 if hour < 12 else hour
+    if period == "noche":
+        # "12 de la noche" es medianoche; "1 de la noche", la 1 de la madrugada
+        if hour == 12:
+            return 0
+        return hour + 12 if hour >= 6 else hour
+    if meridiem == "am" or period == "madrugada":
+        return 0 if hour == 12 else hour
+    return hour
+
+
+def parse_delivery_time(text: Optional[str], now: datetime) -> Optional[datetime]:
+    """
+    Hora de entrega pedida (texto libre) como datetime en la zona de `now`, o
+    None si no se reconoce.
+
+    "mañana" lleva la entrega al día siguiente. Con am/pm o "de la mañana /
+    tarde / noche / madrugada" una hora que ya pasó hoy es la de mañana; sin
+    ellos, una hora de 1 a 11 que ya pasó se interpreta como de la tarde ("a
+    las 2" a las 11:00 son las 14:00).
+    """
+    if not text:
+        return None
+    normalized = normalize_text(text)
+    words = " ".join(re.findall(r"\w+", normalized))
+    if words in _ASAP or words in _ASAP_ALONE:
+        return now
+
+    day = now.date()
+    tomorrow = _TOMORROW.search(normalized) is not None
+    if tomorrow:
+        day += timedelta(days=1)
+
+    for name, named_time in _NAMED.items():
+        if name in normalized:
+            moment = datetime.combine(day, named_time, tzinfo=now.tzinfo)
+            if named_time == time(0, 0) and not tomorrow:
+                # La medianoche de hoy ya pasó: es la de esta noche
+                moment += timedelta(days=1)
+            return moment
+
+    match = _CLOCK.search(normalized)
+    if match is None:
+        if not tomorrow and any(re.search(rf"\b{phrase}\b", normalized) for phrase in _ASAP):
+            return now
+        return None
+    hour = int(match.group("hour"))
+    fraction = match.group("fraction")
+    if fraction is not None:
+        minute = _FRACTIONS.get(fraction) or int(fraction)
+    else:
+        minute = int(match.group("minute") or 0)
+    meridiem = (match.group("meridiem") or "").replace(".", "").replace(" ", "")
+    period_match = _PERIOD.search(normalized)
+    period = period_match.group("period") if period_match else None
+
+    explicit = bool(meridiem or period)
+    hour = _to_24h(hour, meridiem, period)
+    moment = datetime.combine(day, time(hour, minute), tzinfo=now.tzinfo)
+    if moment < now and not tomorrow:
+        if explicit:
+            moment += timedelta(days=1)
+        elif 1 <= hour < 12:
+            moment += timedelta(hours=12)
+    return moment
+
+
+def slot_start(moment: datetime, slot_minutes: int) -> datetime:
+    """Inicio de la franja de `slot_minutes` que contiene `moment` (en su misma zona)."""
+    minutes = (moment.hour * 60 + moment.minute) // slot_minutes * slot_minutes
+    return moment.replace(hour=minutes // 60, minute=minutes % 60, second=0, microsecond=0)
+
+
+def schedule_delivery(text: Optional[str], tz: tzinfo, slot_minutes: int,
+                      now: Optional[datetime] = None) -> Tuple[Optional[datetime], Optional[datetime]]:
+    """(momento de entrega, inicio de su franja) en la zona del servicio, o (None, None)."""
+    now = (now or datetime.now(tz)).astimezone(tz)
+    delivery_at = parse_delivery_time(text, now)
+    if delivery_at is None:
+        return None, None
+    return delivery_at, slot_start(delivery_at, slot_minutes)
+
+
+def service_day_bounds(day: date, tz: tzinfo) -> Tuple[datetime, datetime]:
+    """[inicio, fin) de un día de servicio en la zona del restaurante."""
+    start = datetime.combine(day, time.min, tzinfo=tz)
+    return start, datetime.combine(day + timedelta(days=1), time.min, tzinfo=tz)
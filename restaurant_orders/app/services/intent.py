@@ -0,0 +1,102 @@
+import re
+import unicodedata
+from enum import Enum
+from typing import Dict, Optional
+
+
+class Intent(str, Enum):
+    LOGIN = "login"
+    STATUS = "status"
+    LOGOUT = "logout"
+
+
+INTENT_KEYWORDS: Dict[Intent, tuple] = {
+    Intent.LOGIN: (
+        'iniciar sesión', 'login', 'log in', 'autenticar', 'autenticarme',
+        'ingresar', 'entrar', 'acceder', 'registrarme', 'registrar',
+        'quiero iniciar', 'necesito iniciar', 'deseo iniciar',
+        'session', 'sesion', 'loguear', 'loguearme',
+        'enviame el enlace', 'dame el link', 'link de login', 'enlace de login',
+    ),
+    Intent.STATUS: (
+        'estoy logueado', 'estoy autenticado', 'estoy login', 'status login', 'mi estado',
+    ),
+    Intent.LOGOUT: (
+        'cerrar sesión', 'logout', 'desconectar', 'salir',
+    ),
+}
+
+
+def normalize_text(text: str) -> str:
+    """Pasa a minúsculas y elimina tildes ("Sesión" -> "sesion")."""
+    text = text.casefold()
+    if text.isascii():
+        return text
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+# Variantes acentuadas que se aceptan para cada letra de las palabras clave
+_ACCENT_VARIANTS = {
+    'a': 'áàâä', 'e': 'éèêë', 'i': 'íìîï', 'o': 'óòôö', 'u': 'úùûü', 'n': 'ñ',
+}
+
+
+def _char_pattern(ch: str) -> str:
+    variants = _ACCENT_VARIANTS.get(ch)
+    return f"[{ch}{variants}]" if variants else re.escape(ch)
+
+
+def _trie_pattern(node: dict) -> str:
+    # Prefijos comunes factorizados ("iniciar", "ingresar" -> "in(?:iciar|gresar)"),
+    # así el motor de regex descarta cada posición tras comparar pocos caracteres.
+    # La alternativa vacía va al final para preferir siempre la coincidencia más
+    # larga ("cerrar sesion" frente a "sesion", "loguearme" frente a "loguear")
+    branches = [_char_pattern(ch) + _trie_pattern(child) for ch, child in sorted(node.items()) if ch]
+    if not branches:
+        return ""
+    if len(branches) == 1 and "" not in node:
+        return branches[0]
+    return "(?:" + "|".join(branches) + ("|" if "" in node else "") + ")"
+
+
+def _build_matcher(keywords: Dict[Intent, tuple]):
+    keyword_intents: Dict[str, Intent] = {}
+    trie: dict = {}
+    for intent, words in keywords.items():
+        for word in words:
+            word = normalize_text(word)
+            keyword_intents.setdefault(word, intent)
+            node = trie
+            for ch in word:
+                node = node.setdefault(ch, {})
+            node[""] = {}
+
+    # Las palabras clave solo pueden empezar al inicio de una palabra del mensaje
+    pattern = re.compile(r"(?<!\w)" + _trie_pattern(trie))
+    return pattern, keyword_intents
+
+
+# Todas las palabras clave compiladas en una única expresión regular (un trie
+# con las tildes ya contempladas): cada mensaje se pasa a minúsculas una vez y
+# se recorre en una sola pasada
+_PATTERN, _KEYWORD_INTENTS = _build_matcher(INTENT_KEYWORDS)
+
+
+def classify_intent(message: str) -> Optional[Intent]:
+    """
+    Devuelve la intención del mensaje o None si no contiene ninguna palabra clave.
+
+    Se usa la palabra clave que empieza más a la izquierda (y, a igual posición,
+    la más larga), por lo que "cerrar sesión" es LOGOUT aunque contenga "sesion".
+    """
+    if not message:
+        return None
+    text = message.casefold()
+    if not text.isascii():
+        # Tildes como caracteres combinados ("o" + U+0301) -> forma compuesta
+        text = unicodedata.normalize("NFC", text)
+    match = _PATTERN.search(text)
+    if match is None:
+        return None
+    return _KEYWORD_INTENTS[normalize_text(match.group(0))]
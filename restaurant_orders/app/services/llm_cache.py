@@ -0,0 +1,157 @@
+import hashlib
+import logging
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.config import settings
+from app.database.connection import async_session
+from app.database.unit_of_work import get_current_unit_of_work
+from app.models.llm_cache import LLMResponseCacheEntry
+from app.services.intent import normalize_text
+
+logger = logging.getLogger(__name__)
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def normalize_message(message: str) -> str:
+    """Forma canónica de un mensaje: "¡Hola!!  " y "hola" comparten clave."""
+    return " ".join(_PUNCTUATION.sub(" ", normalize_text(message)).split())
+
+
+class ResponseCache:
+    """
+    Caché de respuestas del LLM con expulsión por tamaño (LRU) y por TTL.
+
+    La clave combina el mensaje normalizado, el modelo y la versión del prompt,
+    de modo que cambiar cualquiera de los dos invalida las respuestas previas.
+    Opcionalmente las respuestas se guardan en `llm_response_cache` para que
+    sobrevivan a los reinicios.
+    """
+
+    def __init__(self, max_entries: int = 2000, ttl_seconds: float = 21600,
+                 max_message_length: int = 80, persist: bool = False, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.max_message_length = max_message_length
+        self.persist = persist
+        self.enabled = enabled
+        self._entries: OrderedDict = OrderedDict()
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def key_for(self, message: str, model: str, prompt_version: str) -> Optional[str]:
+        """Devuelve la clave del mensaje, o None si no merece cachearse."""
+        if not self.enabled:
+            return None
+        normalized = normalize_message(message)
+        # Los mensajes largos (pedidos completos, preguntas concretas) no se repiten
+        if not normalized or len(normalized) > self.max_message_length:
+            return None
+        return hashlib.sha256(f"{model}\x00{prompt_version}\x00{normalized}".encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            response, valid_until = entry
+            if valid_until > time.monotonic():
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return response
+            del self._entries[key]
+
+        if self.persist:
+            response = await self._load(key)
+            if response is not None:
+                self._remember(key, response)
+                self.db_hits += 1
+                return response
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, message: str, response: str, model: str, prompt_version: str):
+        self._remember(key, response)
+        self.stores += 1
+        if self.persist:
+            await self._store(key, message, response, model, prompt_version)
+
+    def _remember(self, key: str, response: str):
+        self._entries[key] = (response, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _load(self, key: str) -> Optional[str]:
+        try:
+            uow = get_current_unit_of_work()
+            if uow is not None:
+                return await self._select(uow.session, key)
+            async with async_session() as db_session:
+                return await self._select(db_session, key)
+        except Exception as e:
+            logger.error(f"Error loading cached LLM response: {e}")
+            return None
+
+    async def _select(self, db_session, key: str) -> Optional[str]:
+        result = await db_session.execute(
+            select(LLMResponseCacheEntry.response).where(
+                LLMResponseCacheEntry.cache_key == key,
+                LLMResponseCacheEntry.expires_at > datetime.utcnow()
+            )
+        )
+        return result.scalar()
+
+    async def _store(self, key: str, message: str, response: str, model: str, prompt_version: str):
+        expires_at = datetime.utcnow() + timedelta(seconds=self.ttl)
+        statement = insert(LLMResponseCacheEntry).values(
+            cache_key=key,
+            model=model,
+            prompt_version=prompt_version,
+            normalized_message=normalize_message(message),
+            response=response,
+            expires_at=expires_at
+        ).on_conflict_do_update(
+            index_elements=[LLMResponseCacheEntry.cache_key],
+            set_={"response": response, "expires_at": expires_at}
+        )
+        try:
+            # Sesión propia: no debe interferir con la transacción del update
+            async with async_session() as db_session:
+                await db_session.execute(statement)
+                await db_session.commit()
+        except Exception as e:
+            logger.error(f"Error storing cached LLM response: {e}")
+
+    def stats(self) -> dict:
+        hits = self.memory_hits + self.db_hits
+        lookups = hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "persist": self.persist,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "hit_ratio": round(hits / lookups, 3) if lookups else 0.0,
+            "llm_calls_saved": hits,
+        }
+
+
+llm_response_cache = ResponseCache(
+    max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.LLM_CACHE_TTL_SECONDS,
+    max_message_length=settings.LLM_CACHE_MAX_MESSAGE_LENGTH,
+    persist=settings.LLM_CACHE_PERSIST,
+    enabled=settings.LLM_CACHE_ENABLED
+)
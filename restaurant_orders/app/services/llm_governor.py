@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import time
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """El proveedor del LLM está marcado como no disponible."""
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker clásico: tras `failure_threshold` fallos consecutivos se abre
+    y rechaza llamadas durante `reset_timeout` segundos; después deja pasar una
+    única llamada de prueba (half-open) que decide si vuelve a cerrarse.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = self.HALF_OPEN
+        # Half-open: solo una llamada de prueba a la vez
+        if self._probe_in_flight:
+            return False
+        self._probe_in_flight = True
+        return True
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+        if self.state != self.CLOSED:
+            logger.info("LLM circuit closed")
+        self.state = self.CLOSED
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.times_opened += 1
+                logger.warning(f"LLM circuit opened after {self.consecutive_failures} consecutive failures")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def release_probe(self):
+        """Libera la llamada de prueba si terminó sin veredicto (p. ej. cancelada)."""
+        self._probe_in_flight = False
+
+
+class LLMGovernor:
+    """
+    Controla todas las llamadas al LLM:
+
+    - limita las llamadas simultáneas con un semáforo,
+    - aplica un plazo por llamada (incluida la espera por el semáforo),
+    - agrupa prompts idénticos concurrentes en una sola llamada,
+    - corta las llamadas en seco mientras el circuit breaker está abierto.
+    """
+
+    def __init__(self, max_concurrency: int = 8, timeout: float = 20.0,
+                 failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.in_flight_calls = 0
+        self.calls = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.failures = 0
+
+    async def call(self, factory: Callable[[], Awaitable[Any]], key: Optional[Hashable] = None) -> Any:
+        """
+        Ejecuta `factory()` bajo las reglas del governor. Si `key` coincide con una
+        llamada en curso, se espera el resultado de esa llamada en lugar de repetirla.
+        """
+        if key is not None and key in self._inflight:
+            self.coalesced += 1
+            return await asyncio.shield(self._inflight[key])
+
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise CircuitOpenError("LLM provider circuit is open")
+
+        task = asyncio.ensure_future(self._execute(factory))
+        if key is not None:
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Marcar la excepción como recuperada aunque todos los que esperaban se cancelen
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return await asyncio.shield(task)
+
+    async def _acquire_slot(self):
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            # Saturación local, no un fallo del proveedor
+            self.timeouts += 1
+            self.breaker.release_probe()
+            raise
+        self.in_flight_calls += 1
+        self.calls += 1
+
+    def _release_slot(self):
+        self.in_flight_calls -= 1
+        self._semaphore.release()
+
+    async def _execute(self, factory: Callable[[], Awaitable[Any]]) -> Any:
+        deadline = time.monotonic() + self.timeout
+        await self._acquire_slot()
+        try:
+            result = await asyncio.wait_for(factory(), timeout=max(0.0, deadline - time.monotonic()))
+        except asyncio.CancelledError:
+            self.breaker.release_probe()
+            raise
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self.breaker.record_failure()
+            raise
+        except Exception:
+            self.failures += 1
+            self.breaker.record_failure()
+            raise
+        finally:
+            self._release_slot()
+
+        self.breaker.record_success()
+        return result
+
+    async def stream(self, factory: Callable[[], AsyncIterator[Any]]) -> AsyncIterator[Any]:
+        """
+        Variante para respuestas en streaming: ocupa un hueco del semáforo mientras
+        dura el stream y aplica el plazo a la espera de cada fragmento. Los streams
+        no se agrupan entre sí.
+        """
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise CircuitOpenError("LLM provider circuit is open")
+
+        await self._acquire_slot()
+        try:
+            iterator = factory().__aiter__()
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(iterator.__anext__(), timeout=self.timeout)
+                except StopAsyncIteration:
+                    break
+                yield chunk
+        except (asyncio.CancelledError, GeneratorExit):
+            self.breaker.release_probe()
+            raise
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            self.breaker.record_failure()
+            raise
+        except Exception:
+            self.failures += 1
+            self.breaker.record_failure()
+            raise
+        finally:
+            self._release_slot()
+
+        self.breaker.record_success()
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight_calls,
+            "timeout_seconds": self.timeout,
+            "circuit_state": self.breaker.state,
+            "circuit_times_opened": self.breaker.times_opened,
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "rejected_open_circuit": self.rejected,
+            "timeouts": self.timeouts,
+            "failures": self.failures,
+        }
+
+
+llm_governor = LLMGovernor(
+    max_concurrency=settings.LLM_MAX_CONCURRENCY,
+    timeout=settings.LLM_TIMEOUT_SECONDS,
+    failure_threshold=settings.LLM_CIRCUIT_FAILURE_THRESHOLD,
+    reset_timeout=settings.LLM_CIRCUIT_RESET_SECONDS
+)
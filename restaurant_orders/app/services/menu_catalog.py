@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import func, select
+
+from app.config import settings
+from app.database.connection import async_session
+from app.models.product import Product
+from app.services.menu_index import MenuIndex, MenuItem
+
+logger = logging.getLogger(__name__)
+
+
+def to_menu_item(product: Product) -> MenuItem:
+    return MenuItem(
+        name=product.name,
+        price=float(product.price),
+        category=product.category,
+        aliases=tuple(product.aliases or ()),
+        id=product.id
+    )
+
+
+class MenuCatalog:
+    """
+    Catálogo de productos en memoria, cargado desde la tabla `products`.
+
+    Se carga completo al arrancar y después se refresca de forma incremental:
+    solo se leen las filas con `updated_at` posterior a la última vista. Las
+    bajas se hacen con `is_active = FALSE`; si alguien borra filas a mano, la
+    diferencia en el número de productos activos fuerza una recarga completa.
+    """
+
+    def __init__(self, refresh_seconds: float = 60.0):
+        self.refresh_seconds = refresh_seconds
+        self.index = MenuIndex()
+        self._watermark: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+        self.loaded_at: Optional[float] = None
+        self.full_loads = 0
+        self.refreshes = 0
+        self.rows_applied = 0
+
+    async def load(self):
+        """Carga completa del catálogo."""
+        async with async_session() as db_session:
+            result = await db_session.execute(select(Product).where(Product.is_active == True))
+            products = result.scalars().all()
+
+        index = MenuIndex(to_menu_item(product) for product in products)
+        # Se sustituye el contenido del índice en sitio: el parser guarda una referencia
+        for item in self.index.items():
+            self.index.remove(item.identity)
+        for item in index.items():
+            self.index.add(item)
+
+        self._watermark = max((p.updated_at for p in products if p.updated_at), default=None)
+        self.loaded_at = time.monotonic()
+        self.full_loads += 1
+        logger.info(f"Menu catalog loaded with {len(self.index)} products")
+
+    async def refresh(self):
+        """Aplica los cambios hechos en `products` desde el último refresco."""
+        if self._watermark is None:
+            await self.load()
+            return
+
+        async with async_session() as db_session:
+            # ">=" para no perder filas con la misma marca de tiempo; aplicarlas otra vez es inocuo
+            result = await db_session.execute(
+                select(Product).where(Product.updated_at >= self._watermark).order_by(Product.updated_at)
+            )
+            changed = result.scalars().all()
+            active = (await db_session.execute(
+                select(func.count()).select_from(Product).where(Product.is_active == True)
+            )).scalar_one()
+
+        for product in changed:
+            if product.is_active:
+                self.index.add(to_menu_item(product))
+            else:
+                self.index.remove(product.id)
+            self._watermark = max(self._watermark, product.updated_at)
+        self.rows_applied += len(changed)
+        self.refreshes += 1
+
+        if active != len(self.index):
+            logger.warning(f"Menu catalog out of sync ({len(self.index)} cached, {active} active), reloading")
+            await self.load()
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error refreshing menu catalog: {e}")
+
+    async def start(self):
+        try:
+            await self.load()
+        except Exception as e:
+            logger.error(f"Error loading menu catalog: {e}")
+        if self.refresh_seconds > 0 and self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "products": len(self.index),
+            "full_loads": self.full_loads,
+            "refreshes": self.refreshes,
+            "rows_applied": self.rows_applied,
+            "watermark": self._watermark.isoformat() if self._watermark else None,
+            "age_seconds": round(time.monotonic() - self.loaded_at, 1) if self.loaded_at else None,
+        }
+
+
+menu_catalog = MenuCatalog(refresh_seconds=settings.MENU_REFRESH_SECONDS)
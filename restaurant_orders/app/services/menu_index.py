@@ -0,0 +1,238 @@
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from app.services.intent import normalize_text
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+# Palabras que no distinguen un producto de otro
+STOPWORDS = frozenset({
+    "de", "del", "la", "las", "el", "los", "con", "al", "a", "en", "y", "para", "por",
+})
+
+
+def stem(token: str) -> str:
+    """Raíz mínima para igualar singular y plural ("pizzas" ~ "pizza", "limones" ~ "limon")."""
+    if len(token) > 3 and token.endswith("s"):
+        token = token[:-1]
+    if len(token) > 3 and token.endswith("e"):
+        token = token[:-1]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokens normalizados (sin tildes ni mayúsculas) de un texto."""
+    return _TOKEN.findall(normalize_text(text))
+
+
+def trigrams(text: str) -> Set[str]:
+    """Trigramas al estilo pg_trgm: cada palabra con dos espacios delante y uno detrás."""
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TrigramIndex:
+    """Índice invertido trigrama -> cadenas, con similitud de Jaccard sobre trigramas."""
+
+    def __init__(self):
+        self._grams: Dict[str, Set[str]] = {}
+        self._by_gram: Dict[str, Set[str]] = {}
+
+    def add(self, text: str):
+        if text in self._grams:
+            return
+        grams = trigrams(text)
+        self._grams[text] = grams
+        for gram in grams:
+            self._by_gram.setdefault(gram, set()).add(text)
+
+    def remove(self, text: str):
+        for gram in self._grams.pop(text, ()):
+            texts = self._by_gram.get(gram)
+            if texts is not None:
+                texts.discard(text)
+                if not texts:
+                    del self._by_gram[gram]
+
+    def search(self, text: str, threshold: float = 0.4) -> Tuple[Optional[str], float]:
+        """Devuelve la cadena más parecida con similitud >= threshold."""
+        grams = trigrams(text)
+        if not grams:
+            return None, 0.0
+        shared: Dict[str, int] = {}
+        for gram in grams:
+            for candidate in self._by_gram.get(gram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+        best, best_score = None, 0.0
+        for candidate, common in shared.items():
+            score = common / (len(grams) + len(self._grams[candidate]) - common)
+            if score > best_score:
+                best, best_score = candidate, score
+        if best_score < threshold:
+            return None, best_score
+        return best, best_score
+
+
+@dataclass(frozen=True)
+class MenuItem:
+    name: str
+    price: float
+    category: Optional[str] = None
+    aliases: Tuple[str, ...] = field(default_factory=tuple)
+    id: Optional[int] = None
+
+    @property
+    def identity(self) -> Hashable:
+        return self.id if self.id is not None else self.name
+
+
+class MenuIndex:
+    """
+    Índice en memoria de los productos del menú.
+
+    - exacto: nombre tal cual está en el catálogo,
+    - normalizado: nombre y alias sin tildes, mayúsculas ni signos,
+    - trigramas: nombres parecidos ("pizza peperoni grande") y erratas por palabra,
+    - raíces: índice invertido raíz -> claves para casar frases libres de un
+      pedido puntuando solo los productos que comparten alguna palabra.
+
+    Admite altas y bajas individuales para refrescarse de forma incremental.
+    """
+
+    def __init__(self, items: Iterable[MenuItem] = ()):
+        self._items: Dict[Hashable, MenuItem] = {}
+        self._by_name: Dict[str, MenuItem] = {}
+        self._exact: Dict[str, MenuItem] = {}
+        self._key_stems: Dict[str, Tuple[str, ...]] = {}
+        self._by_stem: Dict[str, Set[str]] = {}
+        self._key_trigrams = TrigramIndex()
+        self._stem_trigrams = TrigramIndex()
+        for item in items:
+            self.add(item)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def _keys(self, item: MenuItem) -> List[str]:
+        keys = []
+        for label in (item.name, *item.aliases):
+            key = " ".join(tokenize(label))
+            if key and key not in keys:
+                keys.append(key)
+        return keys
+
+    def add(self, item: MenuItem):
+        """Añade (o reemplaza) un producto."""
+        self.remove(item.identity)
+        self._items[item.identity] = item
+        self._by_name[item.name] = item
+        for key in self._keys(item):
+            self._exact[key] = item
+            self._key_trigrams.add(key)
+            stems = tuple(stem(token) for token in key.split() if token not in STOPWORDS)
+            self._key_stems[key] = stems
+            for token_stem in stems:
+                self._by_stem.setdefault(token_stem, set()).add(key)
+                self._stem_trigrams.add(token_stem)
+
+    def remove(self, identity: Hashable):
+        """Retira un producto por id (o por nombre si no tiene id)."""
+        item = self._items.pop(identity, None)
+        if item is None:
+            return
+        if self._by_name.get(item.name) is item:
+            del self._by_name[item.name]
+        for key in self._keys(item):
+            # Un alias puede haber sido reasignado a otro producto
+            if self._exact.get(key) is not item:
+                continue
+            del self._exact[key]
+            self._key_trigrams.remove(key)
+            for token_stem in self._key_stems.pop(key, ()):
+                keys = self._by_stem.get(token_stem)
+                if keys is None:
+                    continue
+                keys.discard(key)
+                if not keys:
+                    del self._by_stem[token_stem]
+                    self._stem_trigrams.remove(token_stem)
+
+    def items(self) -> List[MenuItem]:
+        return list(self._items.values())
+
+    def get(self, identity: Hashable) -> Optional[MenuItem]:
+        return self._items.get(identity)
+
+    def lookup(self, text: str) -> Optional[MenuItem]:
+        """Búsqueda exacta sobre el nombre o, si no, sobre el nombre/alias normalizado."""
+        item = self._by_name.get(text)
+        if item is not None:
+            return item
+        return self._exact.get(" ".join(tokenize(text)))
+
+    def resolve(self, text: str, min_similarity: float = 0.6) -> Tuple[Optional[MenuItem], float]:
+        """
+        Producto correspondiente a un nombre libre (p. ej. el que devuelve el LLM):
+        exacto, normalizado y por último por similitud de trigramas.
+        """
+        item = self.lookup(text)
+        if item is not None:
+            return item, 1.0
+        key, score = self._key_trigrams.search(" ".join(tokenize(text)), threshold=min_similarity)
+        if key is None:
+            return None, score
+        return self._exact[key], score
+
+    def _resolve_stem(self, token_stem: str) -> Optional[str]:
+        if token_stem in self._by_stem:
+            return token_stem
+        # Tolerancia a erratas ("peperoni", "cesr") en palabras no triviales
+        if len(token_stem) >= 4:
+            similar, _ = self._stem_trigrams.search(token_stem, threshold=0.5)
+            return similar
+        return None
+
+    def match_tokens(self, tokens: List[str]) -> Tuple[Optional[MenuItem], float]:
+        """
+        Devuelve el producto que mejor casa con los tokens y una puntuación 0..1.
+
+        La puntuación combina cobertura (qué parte del nombre del producto aparece
+        en la frase) y precisión (qué parte de la frase explica el producto).
+        """
+        stems = []
+        for token in tokens:
+            if token in STOPWORDS:
+                continue
+            resolved = self._resolve_stem(stem(token))
+            stems.append(resolved or stem(token))
+        if not stems:
+            return None, 0.0
+
+        candidates: Set[str] = set()
+        for token_stem in stems:
+            candidates.update(self._by_stem.get(token_stem, ()))
+
+        phrase = set(stems)
+        best_item, best_score, best_size = None, 0.0, 0
+        for key in candidates:
+            key_stems = set(self._key_stems[key])
+            if not key_stems:
+                continue
+            matched = len(key_stems & phrase)
+            coverage = matched / len(key_stems)
+            precision = matched / len(phrase)
+            score = coverage * (0.7 + 0.3 * precision)
+            # A igual puntuación, el nombre más específico
+            if score > best_score or (score == best_score and len(key_stems) > best_size):
+                best_item, best_score, best_size = self._exact[key], score, len(key_stems)
+        return best_item, best_score
+
+    def match(self, text: str) -> Tuple[Optional[MenuItem], float]:
+        exact = self.lookup(text)
+        if exact is not None:
+            return exact, 1.0
+        return self.match_tokens(tokenize(text))
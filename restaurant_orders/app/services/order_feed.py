@@ -0,0 +1,169 @@
+import json
+import secrets
+from collections import deque
+from datetime import date, datetime, timezone, tzinfo
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+ORDER_STATUSES = ("pending", "preparing", "ready", "dispatched", "delivered", "cancelled")
+CLOSED_STATUSES = frozenset({"delivered", "cancelled"})
+
+
+def compact_order(order: Dict[str, Any]) -> Dict[str, Any]:
+    """Forma compacta de un pedido para el dashboard a partir de los argumentos insert_*."""
+    return {
+        "id": order.get("id"),
+        "customer": order.get("v_cliente_test"),
+        "destination": order.get("v_destino"),
+        "delivery_time": order.get("v_hora_entrega"),
+        "delivery_slot": order.get("v_franja_entrega"),
+        "total": order.get("v_importe_total"),
+        "status": order.get("status", "pending"),
+        "created_at": order.get("created_at"),
+        "notes": order.get("v_observaciones"),
+        "items": [[item.get("v_cantidad"), item.get("v_producto_test"), item.get("v_notas")]
+                  for item in order.get("items", [])],
+    }
+
+
+def compact_order_model(order, tz: Optional[tzinfo] = None) -> Dict[str, Any]:
+    """Forma compacta de un `Order` cargado con sus items; la franja se expresa en `tz`."""
+    slot = order.delivery_slot
+    if slot is not None and tz is not None:
+        slot = slot.astimezone(tz)
+    return {
+        "id": order.id,
+        "customer": order.customer_name,
+        "destination": order.destination,
+        "delivery_time": order.delivery_time,
+        "delivery_slot": slot.isoformat() if slot else None,
+        "total": order.total_amount,
+        "status": order.status,
+        "created_at": order.created_at.isoformat() if order.created_at else None,
+        "notes": order.observations,
+        "items": [[item.quantity, item.product_name, item.notes] for item in order.items],
+    }
+
+
+def created_event(order: Dict[str, Any]) -> Dict[str, Any]:
+    return {"type": "order_created", "order": compact_order(order)}
+
+
+def status_event(order_id: Any, status: str) -> Dict[str, Any]:
+    return {"type": "order_status", "order_id": order_id, "status": status}
+
+
+def _created_on(order: Dict[str, Any], tz: Optional[tzinfo]) -> Optional[date]:
+    """Día de creación en `tz` (hora local si es None); sin zona, `created_at` está en UTC."""
+    created_at = order.get("created_at")
+    if not created_at:
+        return None
+    try:
+        created = datetime.fromisoformat(str(created_at))
+    except ValueError:
+        return None
+    if created.tzinfo is None:
+        created = created.replace(tzinfo=timezone.utc)
+    return created.astimezone(tz).date()
+
+
+class OrderFeed:
+    """
+    Estado en memoria de los pedidos abiertos del día y secuencia de cambios.
+
+    Cada cambio recibe un número de secuencia monótono y se guarda, ya
+    serializado, en un buffer circular. Un cliente que se reconecta envía
+    (epoch, último seq) y recibe solo lo que se perdió; si el hueco ya no está en
+    el buffer o el proceso se reinició (otro epoch), recibe un snapshot.
+
+    El día de servicio y el de creación de cada pedido se calculan en `tz`.
+    """
+
+    def __init__(self, ring_size: int = 1000, tz: Optional[tzinfo] = None):
+        self.epoch = secrets.token_hex(4)
+        self.seq = 0
+        self._ring: Deque[Tuple[int, str]] = deque(maxlen=ring_size)
+        self._open: Dict[Any, Dict[str, Any]] = {}
+        self._day: Optional[date] = None
+        self.tz = tz
+
+    def load(self, orders: Iterable[Dict[str, Any]], today: Optional[date] = None):
+        """
+        Estado inicial (pedidos abiertos del día), p. ej. al arrancar o tras
+        perder eventos. Empieza un epoch nuevo: los deltas anteriores ya no
+        sirven para reanudar.
+        """
+        self._day = today or self._today()
+        self._open = {order["id"]: order for order in orders if order.get("status") not in CLOSED_STATUSES}
+        self.epoch = secrets.token_hex(4)
+        self._ring.clear()
+
+    def _today(self) -> date:
+        return datetime.now(self.tz).date()
+
+    def _roll_day(self):
+        today = self._today()
+        if self._day != today:
+            self._day = today
+            self._open = {order_id: order for order_id, order in self._open.items()
+                          if _created_on(order, self.tz) in (None, today)}
+
+    def _record(self, event: Dict[str, Any]) -> str:
+        self.seq += 1
+        payload = json.dumps({**event, "seq": self.seq, "epoch": self.epoch}, default=str)
+        self._ring.append((self.seq, payload))
+        return payload
+
+    def apply(self, event: Dict[str, Any]) -> str:
+        """
+        Aplica un evento ({"type": "order_created", "order": {...}} u
+        {"type": "order_status", "order_id": ..., "status": ...}) y devuelve el
+        delta serializado con su seq.
+        """
+        self._roll_day()
+        if event["type"] == "order_created":
+            order = event["order"]
+            if order.get("status") not in CLOSED_STATUSES:
+                self._open[order["id"]] = order
+        elif event["type"] == "order_status":
+            order = self._open.get(event["order_id"])
+            if event["status"] in CLOSED_STATUSES:
+                self._open.pop(event["order_id"], None)
+            elif order is not None:
+                order["status"] = event["status"]
+        else:
+            raise ValueError(f"Unknown order event type: {event['type']!r}")
+        return self._record(event)
+
+    def order_created(self, order: Dict[str, Any]) -> str:
+        """Registra un pedido nuevo (argumentos insert_* más id) y devuelve el delta serializado."""
+        return self.apply(created_event(order))
+
+    def status_changed(self, order_id: Any, status: str) -> str:
+        return self.apply(status_event(order_id, status))
+
+    def snapshot(self) -> str:
+        self._roll_day()
+        return json.dumps({
+            "type": "snapshot",
+            "epoch": self.epoch,
+            "seq": self.seq,
+            "orders": list(self._open.values()),
+        }, default=str)
+
+    def since(self, epoch: Optional[str], seq: Optional[int]) -> Optional[List[str]]:
+        """Deltas posteriores a `seq`, o None si no se puede reanudar desde ahí."""
+        if epoch != self.epoch or seq is None or seq > self.seq:
+            return None
+        if seq == self.seq:
+            return []
+        if not self._ring or self._ring[0][0] > seq + 1:
+            return None
+        return [payload for event_seq, payload in self._ring if event_seq > seq]
+
+    def stats(self) -> dict:
+        return {
+            "epoch": self.epoch,
+            "seq": self.seq,
+            "open_orders": len(self._open),
+            "buffered_events": len(self._ring),
+        }
@@ -0,0 +1,64 @@
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.order_parser import OrderParser
+
+logger = logging.getLogger(__name__)
+
+
+def as_function_calls(tool_calls: List[Any]) -> List[Dict[str, Any]]:
+    """
+    Normaliza llamadas a herramientas al formato {"function_call": {"name", "args"}}
+    que consume `OrderProcessor`. LangChain devuelve {"name", "args", "id"}.
+    """
+    calls = []
+    for call in tool_calls or []:
+        if isinstance(call, dict) and "function_call" in call:
+            calls.append(call)
+        elif isinstance(call, dict) and "name" in call:
+            calls.append({"function_call": {"name": call["name"], "args": call.get("args", {})}})
+    return calls
+
+
+class OrderIntake:
+    """
+    Decide cómo obtener las llamadas insert_* de un mensaje de pedido: primero el
+    intérprete local, y solo si su confianza es baja (pero el mensaje parece un
+    pedido) se consulta al LLM con `AIOrderAgent.process_message`.
+    """
+
+    def __init__(self, parser: OrderParser, agent, min_confidence: float = 0.85):
+        self.parser = parser
+        self.agent = agent
+        self.min_confidence = min_confidence
+        self.parsed_locally = 0
+        self.llm_fallbacks = 0
+        self.not_orders = 0
+
+    async def extract_tool_calls(self, message: str, customer_name: Optional[str] = None) -> Tuple[Optional[List[Dict[str, Any]]], Optional[str]]:
+        """Devuelve (llamadas, origen) con origen "parser" o "llm", o (None, None) si no es un pedido."""
+        parsed = self.parser.parse(message)
+        if parsed.items and parsed.confidence >= self.min_confidence:
+            self.parsed_locally += 1
+            logger.info(f"Order parsed locally with confidence {parsed.confidence:.2f}")
+            return parsed.to_tool_calls(customer_name), "parser"
+
+        if parsed.looks_like_order:
+            self.llm_fallbacks += 1
+            logger.info(f"Low parser confidence ({parsed.confidence:.2f}), falling back to LLM")
+            calls = as_function_calls(await self.agent.process_message(message))
+            if any(call["function_call"].get("name") == "insert_pedido" for call in calls):
+                return calls, "llm"
+        elif parsed.rejected:
+            logger.info(f"Message mentions menu items but is not an order ({parsed.rejected})")
+
+        self.not_orders += 1
+        return None, None
+
+    def stats(self) -> dict:
+        return {
+            "parsed_locally": self.parsed_locally,
+            "llm_fallbacks": self.llm_fallbacks,
+            "not_orders": self.not_orders,
+            "menu_items": len(self.parser.menu_index),
+        }
@@ -0,0 +1,263 @@
+import datetime
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.services.intent import normalize_text
+from app.services.menu_index import MenuIndex, MenuItem, tokenize
+
+NUMBER_WORDS = {
+    "un": 1, "uno": 1, "una": 1, "dos": 2, "tres": 3, "cuatro": 4, "cinco": 5,
+    "seis": 6, "siete": 7, "ocho": 8, "nueve": 9, "diez": 10, "once": 11,
+    "doce": 12, "docena": 12,
+}
+
+# Palabras de relleno que no forman parte del nombre de un producto
+FILLER_WORDS = frozenset({
+    "hola", "buenas", "buenos", "dias", "tardes", "noches", "quiero", "quisiera",
+    "queria", "me", "gustaria", "pedir", "pido", "mandame", "mandeme", "enviame",
+    "por", "favor", "porfa", "porfavor", "gracias", "tambien", "ademas", "mas",
+    "cada", "total", "pagare", "pagaremos", "pago", "pagar", "tarjeta", "credito",
+    "debito", "efectivo", "yape", "plin", "transferencia", "soles", "nada",
+    "recoger", "recojo", "llevar", "paso",
+})
+
+PAYMENT_METHODS = {
+    "efectivo": "efectivo", "tarjeta": "tarjeta", "yape": "yape",
+    "plin": "plin", "transferencia": "transferencia",
+}
+
+_QUANTITY = r"(?:\d{1,2}|un|uno|una|dos|tres|cuatro|cinco|seis|siete|ocho|nueve|diez|once|doce|media docena|docena)"
+
+# Un punto termina la dirección salvo que cierre una abreviatura ("Av. Larco 123")
+_END_OF_SENTENCE = r"(?<!\bav)(?<!\bjr)(?<!\bca)(?<!\bnro)(?<!\burb)(?<!\bmz)(?<!\blt)(?<!\bdpto)(?<!\bpje)\.(?:\s|$)"
+
+_DESTINATION = re.compile(
+    r"(?:delivery|entrega|env[ií]o|enviar(?:lo)?|llevar(?:lo)?|direcci[oó]n)(?:\s+es)?\s*(?:a|en|:)\s*"
+    r"(?:(?:la|el)\s+)?"
+    rf"(?P<destination>.+?)(?=\s*(?:[,;\n]|{_END_OF_SENTENCE}|$|\s+(?:a|para)\s+las?\s+\d))",
+    re.IGNORECASE,
+)
+_PICKUP = re.compile(r"\b(?:recojo|recoger|para llevar|paso a recoger)\b", re.IGNORECASE)
+# Frase completa de la hora ("mañana a las 8 y media de la noche"): se guarda tal
+# cual y la interpreta delivery_time.schedule_delivery al registrar el pedido
+_TIME = re.compile(
+    r"(?:(?<!la )\bma[nñ]ana\s+(?:(?:de|por)\s+la\s+(?:ma[nñ]ana|tarde|noche)\s+)?)?"
+    r"(?:(?:\b(?:a|para)\s+las?\s+)\d{1,2}(?:\s*[:.h]\s*\d{2}|\s+y\s+(?:cuarto|media|\d{2})\b)?|\b\d{1,2}:\d{2}\b)"
+    r"(?:\s*(?:am|pm|a\.m\.|p\.m\.)(?!\w))?"
+    r"(?:\s+(?:de|por)\s+la\s+(?:ma[nñ]ana|madrugada|tarde|noche)\b)?"
+    r"|(?:(?<!la )\bma[nñ]ana\s+(?:al\s+|a\s+(?:la\s+)?)?)?\b(?:mediod[ií]a|medianoche)\b",
+    re.IGNORECASE,
+)
+_PRICE = re.compile(
+    r"(?:\b(?:a|de|por)\s+)?(?:\$|s/\.?)\s*\d+(?:[.,]\d{1,2})?(?:\s+cada\s+un[oa])?",
+    re.IGNORECASE,
+)
+_SEGMENT_SPLIT = re.compile(
+    rf"[,;\n]|\.(?:\s|$)|\s\+\s|\s+y\s+(?={_QUANTITY}\b)",
+    re.IGNORECASE,
+)
+# Verbos con los que un producto sin cantidad ("quiero limonada") se pide de verdad
+_ORDER_VERB = re.compile(
+    r"\b(?:quiero|quisiera|queria|queremos|quisieramos|deseo|deseamos|pido|pedir|"
+    r"mandame|mandeme|manden|mandenme|enviame|envieme|envienme|traeme|traigame|traiganme|"
+    r"dame|deme|denme|ponme|pongame|me\s+(?:das|da|traes|trae|mandas|manda|envias|envia|pones|pone))\b"
+)
+# Mensajes que nombran productos sin pedirlos: no se registran ni se consulta al LLM
+_NOT_AN_ORDER = (
+    ("question", re.compile(r"[?¿]")),
+    ("negation", re.compile(r"\b(?:no|nunca|tampoco|cancel\w*|anul\w*)\b")),
+    ("past", re.compile(r"\b(?:ayer|anoche|pedi|pediste|pidio|pidieron|habia|compre|trajeron|llego|llegaron)\b")),
+)
+# Un producto sin cantidad ni verbo de pedido ("limonada", "gracias por la limonada")
+# queda por debajo de ORDER_PARSER_MIN_CONFIDENCE y lo confirma el LLM
+DEFAULT_QUANTITY_FACTOR = 0.8
+
+_NOTE_START = re.compile(r"\b(?:sin|extra|bien)\b", re.IGNORECASE)
+_REFERENCE = re.compile(rf"^\s*{_QUANTITY}\s+de\s+(?:las|los)\b", re.IGNORECASE)
+
+
+@dataclass
+class ParsedItem:
+    item: MenuItem
+    quantity: int
+    score: float
+    notes: Optional[str] = None
+
+    @property
+    def subtotal(self) -> float:
+        return self.item.price * self.quantity
+
+
+@dataclass
+class ParsedOrder:
+    items: List[ParsedItem] = field(default_factory=list)
+    destination: Optional[str] = None
+    delivery_time: Optional[str] = None
+    payment_method: Optional[str] = None
+    observations: List[str] = field(default_factory=list)
+    unmatched: List[str] = field(default_factory=list)
+    confidence: float = 0.0
+    # "question", "negation" o "past" si el mensaje menciona productos sin pedirlos
+    rejected: Optional[str] = None
+
+    @property
+    def looks_like_order(self) -> bool:
+        """Hay indicios de pedido aunque no se haya podido interpretar con seguridad."""
+        return bool(self.items or self.unmatched)
+
+    @property
+    def total(self) -> float:
+        return round(sum(parsed.subtotal for parsed in self.items), 2)
+
+    def to_tool_calls(self, customer_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Traduce el pedido a la misma estructura de llamadas a funciones que genera
+        el LLM y que consume `OrderProcessor.create_order_from_llm`.
+        """
+        observations = "; ".join(self.observations) or None
+        calls = [{
+            "function_call": {
+                "name": "insert_pedido",
+                "args": {
+                    "v_cliente_test": customer_name,
+                    "v_hora_entrega": self.delivery_time,
+                    "v_destino": self.destination,
+                    "v_importe_total": self.total,
+                    "v_observaciones": observations,
+                },
+            }
+        }]
+        for parsed in self.items:
+            calls.append({
+                "function_call": {
+                    "name": "insert_detalle_pedido",
+                    "args": {
+                        "v_producto_test": parsed.item.name,
+                        "v_cantidad": parsed.quantity,
+                        "v_precio": parsed.item.price,
+                        "v_notas": parsed.notes,
+                    },
+                }
+            })
+        calls.append({
+            "function_call": {
+                "name": "insert_pago",
+                "args": {
+                    "v_metodo": self.payment_method,
+                    "v_importe": self.total,
+                    "v_estado": "pendiente",
+                    "v_fecha_hora": datetime.datetime.utcnow(),
+                },
+            }
+        })
+        return calls
+
+
+def _parse_quantity(tokens: List[str]) -> Tuple[Optional[int], List[str]]:
+    """Busca la cantidad y devuelve (cantidad, tokens que la siguen)."""
+    for i, token in enumerate(tokens):
+        if token == "media" and i + 1 < len(tokens) and tokens[i + 1] == "docena":
+            return 6, tokens[i + 2:]
+        if token.isdigit() and 0 < int(token) < 100:
+            return int(token), tokens[i + 1:]
+        if token in NUMBER_WORDS:
+            return NUMBER_WORDS[token], tokens[i + 1:]
+        if token.startswith("x") and token[1:].isdigit():
+            return int(token[1:]), tokens[:i] + tokens[i + 1:]
+    return None, tokens
+
+
+class OrderParser:
+    """
+    Intérprete local de pedidos sencillos ("2 pizzas pepperoni grandes, 1 ensalada
+    césar, delivery a Av. Larco 123 a las 12:30") contra el índice del menú.
+
+    Si todos los productos se reconocen con seguridad y llevan cantidad (o el
+    mensaje usa un verbo de pedido), el pedido se registra sin pasar por el
+    LLM; si no, `confidence` queda baja y el llamador recurre a
+    `AIOrderAgent.process_message`. Las preguntas, negaciones y referencias a
+    pedidos pasados se marcan en `rejected` y no cuentan como pedido. La hora
+    de entrega se guarda como la escribió el cliente.
+    """
+
+    def __init__(self, menu_index: MenuIndex, min_item_score: float = 0.75):
+        self.menu_index = menu_index
+        self.min_item_score = min_item_score
+
+    def parse(self, message: str) -> ParsedOrder:
+        order = ParsedOrder()
+        if not message or not len(self.menu_index):
+            return order
+
+        text = message
+
+        # La hora va primero: "mañana a mediodía" no debe quedar dentro de la dirección
+        delivery_time = _TIME.search(text)
+        if delivery_time:
+            order.delivery_time = " ".join(delivery_time.group(0).split())
+            text = text[:delivery_time.start()] + "," + text[delivery_time.end():]
+
+        destination = _DESTINATION.search(text)
+        if destination:
+            order.destination = destination.group("destination").strip()
+            text = text[:destination.start()] + "," + text[destination.end():]
+        elif _PICKUP.search(text):
+            order.destination = "recojo en local"
+
+        normalized = normalize_text(text)
+        for reason, pattern in _NOT_AN_ORDER:
+            if pattern.search(normalized):
+                return ParsedOrder(rejected=reason)
+        ordering = _ORDER_VERB.search(normalized) is not None
+
+        for token in tokenize(text):
+            if token in PAYMENT_METHODS:
+                order.payment_method = PAYMENT_METHODS[token]
+                break
+
+        text = _PRICE.sub(" ", text)
+
+        scores = []
+        for segment in _SEGMENT_SPLIT.split(text):
+            if not segment or not segment.strip():
+                continue
+
+            # "una de las pizzas sin aceitunas": nota sobre un producto ya pedido
+            if _REFERENCE.match(segment):
+                order.observations.append(segment.strip())
+                continue
+
+            notes = None
+            note_start = _NOTE_START.search(segment)
+            if note_start:
+                notes = segment[note_start.start():].strip()
+                segment = segment[:note_start.start()]
+
+            quantity, tokens = _parse_quantity(tokenize(segment))
+            content = [token for token in tokens if token not in FILLER_WORDS]
+            if not content:
+                if notes and order.items:
+                    order.items[-1].notes = notes
+                continue
+
+            item, score = self.menu_index.match_tokens(content)
+            if item is None or score < self.min_item_score:
+                # Solo cuenta como producto no reconocido si se pidió una cantidad
+                if quantity is not None:
+                    order.unmatched.append(segment.strip())
+                continue
+
+            # Sin cantidad explícita se asume 1; sin verbo de pedido, con menos seguridad
+            if quantity is None:
+                quantity = 1
+                if not ordering:
+                    score *= DEFAULT_QUANTITY_FACTOR
+            order.items.append(ParsedItem(item=item, quantity=quantity, score=score, notes=notes))
+            scores.append(score)
+
+        if order.items:
+            order.confidence = min(scores)
+            if order.unmatched:
+                order.confidence = min(order.confidence, 0.4)
+        return order
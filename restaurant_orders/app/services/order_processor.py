@@ -2,96 +2,179 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import text
 from app.services.printer import PrinterService
 from app.api.websocket.connection import DashboardManager
-from typing import List, Dict, Any
+from app.services.menu_index import MenuIndex
+from app.services.outbox import ORDER_EVENTS, OutboxDispatcher, add_order_events, order_event_payload
+from app.services.delivery_time import schedule_delivery
+from typing import List, Dict, Any, Optional, Tuple
+from zoneinfo import ZoneInfo
 import datetime
+import json
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Inserta pedido, items y pago en una sola llamada (ver database/database_functions.sql)
+INSERT_ORDER_SQL = text("SELECT insert_pedido_completo(CAST(:v_pedido AS JSONB))")
+
+
+def group_tool_calls(tool_calls: List[Dict[str, Any]]) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """
+    Agrupa las llamadas en una sola pasada: (args de insert_pedido, args de cada
+    insert_detalle_pedido, args de insert_pago). Como antes, cuenta la primera
+    llamada de pedido y de pago.
+    """
+    pedido, pago = None, None
+    items = []
+    for part in tool_calls:
+        call = part.get('function_call', {})
+        name = call.get('name')
+        if name == "insert_detalle_pedido":
+            items.append(dict(call.get('args') or {}))
+        elif name == "insert_pedido" and pedido is None:
+            pedido = dict(call.get('args') or {})
+        elif name == "insert_pago" and pago is None:
+            pago = dict(call.get('args') or {})
+    return pedido, items, pago
+
+
+def build_order_payload(pedido: Dict[str, Any], items: List[Dict[str, Any]], pago: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Documento JSON que recibe `insert_pedido_completo`."""
+    return {
+        "v_cliente_test": pedido.get("v_cliente_test"),
+        "v_hora_entrega": pedido.get("v_hora_entrega"),
+        "v_entrega_at": pedido.get("v_entrega_at"),
+        "v_franja_entrega": pedido.get("v_franja_entrega"),
+        "v_destino": pedido.get("v_destino"),
+        "v_importe_total": pedido.get("v_importe_total"),
+        "v_observaciones": pedido.get("v_observaciones"),
+        "items": [
+            {
+                "v_producto_test": item.get("v_producto_test"),
+                "v_cantidad": item.get("v_cantidad"),
+                "v_precio": item.get("v_precio"),
+                "v_notas": item.get("v_notas"),
+            }
+            for item in items
+        ],
+        "pago": {
+            "v_metodo": pago.get("v_metodo"),
+            "v_importe": pago.get("v_importe"),
+            "v_estado": pago.get("v_estado"),
+            "v_fecha_hora": pago.get("v_fecha_hora"),
+        } if pago is not None else None,
+    }
+
+
+class OrderValidationError(Exception):
+    """El pedido contiene productos que no existen en el catálogo o cantidades inválidas."""
+
+    def __init__(self, message: str, unknown_products: Optional[List[str]] = None):
+        super().__init__(message)
+        self.unknown_products = unknown_products or []
+
+
+class CatalogUnavailableError(OrderValidationError):
+    """No hay catálogo cargado (p. ej. falló la carga del menú) contra el que validar el pedido."""
+
+
 class OrderProcessor:
-    def __init__(self, db_session: AsyncSession, printer_service: PrinterService, ws_manager: DashboardManager):
+    def __init__(self, db_session: AsyncSession, printer_service: PrinterService, ws_manager: DashboardManager,
+                 catalog: Optional[MenuIndex] = None, min_similarity: float = 0.6,
+                 outbox: Optional[OutboxDispatcher] = None, hot_queries=None,
+                 service_timezone: str = "America/Lima", slot_minutes: int = 30):
         self.db_session = db_session
+        self.service_tz = ZoneInfo(service_timezone)
+        self.slot_minutes = slot_minutes
+        # Alta del pedido (y su outbox) con statements preparados de asyncpg; None = por la sesión
+        self.hot_queries = hot_queries
         self.printer = printer_service
         self.ws_manager = ws_manager
+        self.outbox = outbox
+        self.catalog = catalog
+        self.min_similarity = min_similarity
+
+    def validate_and_price(self, tool_calls: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Comprueba los productos contra el catálogo en memoria y fija los precios y
+        totales con los del catálogo, sin consultar la base de datos. Así un
+        producto o un precio inventado por el LLM se rechaza antes de abrir la
+        transacción. Devuelve una copia de las llamadas con los argumentos corregidos.
+        """
+        validated = []
+        unknown = []
+        total = 0.0
+        for part in tool_calls:
+            call = part.get('function_call', {})
+            if call.get('name') != "insert_detalle_pedido":
+                validated.append({**part, "function_call": dict(call)})
+                continue
+
+            args = dict(call.get('args') or {})
+            product_name = args.get("v_producto_test") or ""
+            item, _ = self.catalog.resolve(product_name, min_similarity=self.min_similarity)
+            if item is None:
+                unknown.append(product_name)
+                continue
+
+            try:
+                quantity = int(args.get("v_cantidad") or 1)
+            except (TypeError, ValueError):
+                raise OrderValidationError(f"Cantidad inválida para {item.name}: {args.get('v_cantidad')!r}")
+            if quantity <= 0:
+                raise OrderValidationError(f"Cantidad inválida para {item.name}: {quantity}")
+
+            args.update({"v_producto_test": item.name, "v_cantidad": quantity, "v_precio": item.price})
+            total += item.price * quantity
+            validated.append({"function_call": {"name": call['name'], "args": args}})
+
+        if unknown:
+            raise OrderValidationError(f"Productos no encontrados en el menú: {', '.join(unknown)}", unknown)
+
+        total = round(total, 2)
+        for part in validated:
+            call = part['function_call']
+            if call.get('name') == "insert_pedido":
+                call['args'] = {**(call.get('args') or {}), "v_importe_total": total}
+            elif call.get('name') == "insert_pago":
+                call['args'] = {**(call.get('args') or {}), "v_importe": total}
+        return validated
 
     async def create_order_from_llm(self, tool_calls: List[Dict[str, Any]]):
         logger.info(f"Processing tool_calls: {tool_calls}")
-        pedido_id = None
-        full_order_details = {}
+        if self.catalog is not None:
+            if not len(self.catalog):
+                # Sin catálogo no se pueden comprobar productos ni precios: no se aceptan los del parser/LLM
+                logger.error("Menu catalog is empty, rejecting order")
+                raise CatalogUnavailableError("El menú no está disponible en este momento. Inténtalo de nuevo en unos minutos.")
+            tool_calls = self.validate_and_price(tool_calls)
+
+        pedido, items, pago = group_tool_calls(tool_calls)
+        if pedido is None:
+            raise Exception("No se encontró la función 'insert_pedido' en la respuesta del LLM.")
+
+        # Hora de entrega y franja normalizadas al registrar el pedido (el texto original se conserva)
+        delivery_at, delivery_slot = schedule_delivery(pedido.get("v_hora_entrega"), self.service_tz, self.slot_minutes)
+        pedido["v_entrega_at"] = delivery_at.isoformat() if delivery_at else None
+        pedido["v_franja_entrega"] = delivery_slot.isoformat() if delivery_slot else None
+
+        full_order_details = dict(pedido) # Guardar args para después
+        full_order_details['items'] = items
+
+        full_order_details['created_at'] = datetime.datetime.utcnow().isoformat()
+        full_order_details['status'] = 'pending'
+        order_json = json.dumps(build_order_payload(pedido, items, pago), default=str)
 
         try:
-            # Iniciar una transacción
-            async with self.db_session.begin():
-                # 1. Buscar y ejecutar insert_pedido para obtener el ID
-                logger.debug(f"Looking for insert_pedido in {len(tool_calls)} tool calls")
-                for part in tool_calls:
-                    if part.get('function_call', {}).get('name') == "insert_pedido":
-                        args = part['function_call']['args']
-                        full_order_details.update(dict(args)) # Guardar args para después
-                        
-                        sql = text("SELECT insert_pedido(:v_cliente_test, :v_hora_entrega, :v_destino, :v_importe_total, :v_observaciones)")
-                        result = await self.db_session.execute(
-                            sql,
-                            {
-                                "v_cliente_test": args.get("v_cliente_test"),
-                                "v_hora_entrega": args.get("v_hora_entrega"),
-                                "v_destino": args.get("v_destino"),
-                                "v_importe_total": args.get("v_importe_total"),
-                                "v_observaciones": args.get("v_observaciones")
-                            }
-                        )
-                        pedido_id = result.scalar_one_or_none()
-                        if not pedido_id:
-                            raise Exception("La función insert_pedido no devolvió un ID.")
-                        
-                        full_order_details['id'] = pedido_id
-                        full_order_details['created_at'] = datetime.datetime.utcnow().isoformat()
-                        full_order_details['status'] = 'pending'
-                        break
-                
-                if not pedido_id:
-                    raise Exception("No se encontró la función 'insert_pedido' en la respuesta del LLM.")
-
-                # 2. Ejecutar insert_detalle_pedido para cada item
-                items = []
-                for part in tool_calls:
-                    if part.get('function_call', {}).get('name') == "insert_detalle_pedido":
-                        args = part['function_call']['args']
-                        items.append(dict(args)) # Guardar para el ticket
-                        
-                        sql = text("SELECT insert_detalle_pedido(:v_pedido_id, :v_producto_test, :v_cantidad, :v_precio, :v_notas)")
-                        await self.db_session.execute(
-                            sql,
-                            {
-                                "v_pedido_id": pedido_id,
-                                "v_producto_test": args.get("v_producto_test"),
-                                "v_cantidad": args.get("v_cantidad"),
-                                "v_precio": args.get("v_precio"),
-                                "v_notas": args.get("v_notas")
-                            }
-                        )
-                full_order_details['items'] = items
-
-                # 3. Ejecutar insert_pago
-                for part in tool_calls:
-                    if part.get('function_call', {}).get('name') == "insert_pago":
-                        args = part['function_call']['args']
-                        sql = text("SELECT insert_pago(:v_pedido_id, :v_metodo, :v_importe, :v_estado, :v_fecha_hora)")
-                        await self.db_session.execute(
-                            sql,
-                            {
-                                "v_pedido_id": pedido_id,
-                                "v_metodo": args.get("v_metodo"),
-                                "v_importe": args.get("v_importe"),
-                                "v_estado": args.get("v_estado"),
-                                "v_fecha_hora": args.get("v_fecha_hora")
-                            }
-                        )
-                        break
-            
-            # La transacción se confirma aquí automáticamente con 'async with'
+            pedido_id = await self._insert(order_json, full_order_details)
+            if not pedido_id:
+                raise Exception("La función insert_pedido_completo no devolvió un ID.")
+            full_order_details['id'] = pedido_id
+
+            if self.outbox is not None:
+                self.outbox.notify()
+                return full_order_details
             
-            # 4. Imprimir ticket y notificar al dashboard
+            # Sin outbox: imprimir ticket y notificar al dashboard en línea
             # Usamos el diccionario que hemos construido
             await self.printer.print_ticket(full_order_details)
             await self.ws_manager.broadcast_order(full_order_details)
@@ -99,7 +182,32 @@ class OrderProcessor:
             return full_order_details
 
         except Exception as e:
-            # El rollback es automático si 'async with' falla
+            # El rollback ya se hizo en _insert si falló la transacción
             print(f"Error processing order: {str(e)}")
             raise
 
+    async def _insert(self, order_json: str, full_order_details: Dict[str, Any]) -> Optional[int]:
+        """
+        Pedido, items, pago y eventos del outbox en la transacción de la sesión
+        (la de la unidad de trabajo), que se confirma aquí.
+        """
+        try:
+            if self.hot_queries is not None:
+                pedido_id = await self.hot_queries.insert_order(
+                    self.db_session, order_json,
+                    outbox_events=ORDER_EVENTS if self.outbox is not None else (),
+                    outbox_payload=lambda order_id: order_event_payload({**full_order_details, 'id': order_id})
+                )
+            else:
+                # Pedido, items y pago en un solo viaje a la base de datos
+                result = await self.db_session.execute(INSERT_ORDER_SQL, {"v_pedido": order_json})
+                pedido_id = result.scalar_one_or_none()
+
+                if pedido_id and self.outbox is not None:
+                    # Impresión y dashboard se confirman junto con el pedido y se entregan después
+                    add_order_events(self.db_session, {**full_order_details, 'id': pedido_id})
+            await self.db_session.commit()
+        except Exception:
+            await self.db_session.rollback()
+            raise
+        return pedido_id
@@ -0,0 +1,255 @@
+import asyncio
+import json
+import logging
+import time
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.connection import async_session
+from app.models.outbox import OutboxEvent
+
+logger = logging.getLogger(__name__)
+
+PRINT_TICKET = "print_ticket"
+BROADCAST_ORDER = "broadcast_order"
+
+# Efectos que se registran para cada pedido nuevo
+ORDER_EVENTS = (PRINT_TICKET, BROADCAST_ORDER)
+
+EventHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+def order_event_payload(order: Dict[str, Any]) -> str:
+    """Payload JSON de los eventos de un pedido (fechas, Decimal... como texto)."""
+    return json.dumps(order, default=str)
+
+
+def add_order_events(db_session: AsyncSession, order: Dict[str, Any]):
+    """
+    Registra en la sesión los eventos de un pedido nuevo. Deben añadirse dentro
+    de la misma transacción que el pedido para que se confirmen (o no) con él.
+    """
+    payload = json.loads(order_event_payload(order))
+    db_session.add_all([OutboxEvent(event_type=event_type, payload=payload) for event_type in ORDER_EVENTS])
+
+
+class OutboxDispatcher:
+    """
+    Entrega en segundo plano los eventos de `order_outbox`.
+
+    Cada ronda reclama un lote de eventos pendientes con FOR UPDATE SKIP LOCKED
+    (varios procesos pueden compartir la tabla) y los aplaza `lease_seconds`, de
+    modo que si el proceso muere a mitad de la entrega otro los recupera. Los
+    eventos del lote se entregan concurrentemente; los fallidos se reintentan con
+    espera exponencial hasta `max_attempts` y después quedan como `failed`.
+
+    Cada `purge_interval` segundos se borran, por lotes, los eventos `done`
+    procesados hace más de `retention_hours` (0 = no se borran). Los `failed` se
+    conservan para revisarlos.
+    """
+
+    def __init__(self, handlers: Dict[str, EventHandler], poll_interval: float = 2.0, batch_size: int = 20,
+                 max_attempts: int = 8, retry_base_seconds: float = 2.0, lease_seconds: float = 60.0,
+                 retention_hours: float = 72.0, purge_interval: float = 3600.0, purge_batch_size: int = 1000):
+        self.handlers = handlers
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.lease_seconds = lease_seconds
+        self.retention = timedelta(hours=retention_hours) if retention_hours > 0 else None
+        self.purge_interval = purge_interval
+        self.purge_batch_size = purge_batch_size
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._next_purge_at = 0.0
+        self.delivered = 0
+        self.retried = 0
+        self.failed = 0
+        self.purged = 0
+
+    def notify(self):
+        """Despierta al dispatcher tras confirmar un pedido, sin esperar al siguiente sondeo."""
+        self._wakeup.set()
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                # Mientras haya lotes completos se sigue sin esperar
+                while await self.dispatch_once() >= self.batch_size:
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error dispatching outbox events: {e}")
+
+            if self.retention is not None and time.monotonic() >= self._next_purge_at:
+                self._next_purge_at = time.monotonic() + self.purge_interval
+                try:
+                    await self.purge_done()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"Error purging delivered outbox events: {e}")
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def claim_statement(self):
+        """
+        UPDATE que reclama el siguiente lote: los pendientes ya disponibles, en
+        orden, saltando los que otro proceso tiene bloqueados, y los aplaza
+        `lease_seconds` mientras se entregan.
+        """
+        pending = (
+            select(OutboxEvent.id)
+            .where(OutboxEvent.status == "pending", OutboxEvent.available_at <= func.now())
+            .order_by(OutboxEvent.available_at, OutboxEvent.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        return (
+            update(OutboxEvent)
+            .where(OutboxEvent.id.in_(pending))
+            .values(
+                attempts=OutboxEvent.attempts + 1,
+                available_at=func.now() + timedelta(seconds=self.lease_seconds)
+            )
+            .returning(OutboxEvent.id, OutboxEvent.event_type, OutboxEvent.payload, OutboxEvent.attempts)
+            .execution_options(synchronize_session=False)
+        )
+
+    def retry_delay(self, attempts: int) -> float:
+        """Espera antes del siguiente intento: exponencial desde retry_base_seconds, hasta 5 minutos."""
+        return min(self.retry_base_seconds * 2 ** (attempts - 1), 300.0)
+
+    def failure_values(self, event, error: str) -> Dict[str, Any]:
+        """Columnas a actualizar tras un intento fallido: reintento aplazado o `failed` definitivo."""
+        if event.attempts >= self.max_attempts:
+            return {"status": "failed", "last_error": error, "processed_at": func.now()}
+        return {"last_error": error, "available_at": func.now() + timedelta(seconds=self.retry_delay(event.attempts))}
+
+    async def _claim(self) -> List[Any]:
+        async with async_session() as db_session:
+            result = await db_session.execute(self.claim_statement())
+            events = result.all()
+            await db_session.commit()
+        return events
+
+    async def _deliver(self, event) -> Optional[str]:
+        handler = self.handlers.get(event.event_type)
+        if handler is None:
+            return f"No handler for event type {event.event_type}"
+        try:
+            await handler(event.payload)
+            return None
+        except Exception as e:
+            return str(e) or e.__class__.__name__
+
+    async def _record(self, done: List[int], failures: List[Tuple[Any, str]]):
+        """Guarda el resultado de un lote: entregados como `done`, fallidos según failure_values."""
+        async with async_session() as db_session:
+            if done:
+                await db_session.execute(
+                    update(OutboxEvent)
+                    .where(OutboxEvent.id.in_(done))
+                    .values(status="done", processed_at=func.now(), last_error=None)
+                    .execution_options(synchronize_session=False)
+                )
+            for event, error in failures:
+                await db_session.execute(
+                    update(OutboxEvent)
+                    .where(OutboxEvent.id == event.id)
+                    .values(**self.failure_values(event, error))
+                    .execution_options(synchronize_session=False)
+                )
+            await db_session.commit()
+
+    async def dispatch_once(self) -> int:
+        """Reclama y entrega un lote. Devuelve cuántos eventos se reclamaron."""
+        events = await self._claim()
+        if not events:
+            return 0
+
+        errors = await asyncio.gather(*(self._deliver(event) for event in events))
+
+        done = [event.id for event, error in zip(events, errors) if error is None]
+        failures = [(event, error) for event, error in zip(events, errors) if error is not None]
+        for event, error in failures:
+            logger.warning(f"Outbox event {event.id} ({event.event_type}) failed on attempt {event.attempts}: {error}")
+            if event.attempts >= self.max_attempts:
+                self.failed += 1
+            else:
+                self.retried += 1
+        await self._record(done, failures)
+
+        self.delivered += len(done)
+        return len(events)
+
+    def purge_statement(self):
+        """DELETE de un lote de eventos entregados antes de la retención, saltando los bloqueados."""
+        batch = (
+            select(OutboxEvent.id)
+            .where(OutboxEvent.status == "done", OutboxEvent.processed_at < func.now() - self.retention)
+            .limit(self.purge_batch_size)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        return delete(OutboxEvent).where(OutboxEvent.id.in_(batch)).execution_options(synchronize_session=False)
+
+    async def _purge_batch(self) -> int:
+        async with async_session() as db_session:
+            result = await db_session.execute(self.purge_statement())
+            await db_session.commit()
+        return result.rowcount
+
+    async def purge_done(self) -> int:
+        """Borra los eventos `done` caducados, un lote por transacción. Devuelve cuántos se borraron."""
+        purged = 0
+        while True:
+            count = await self._purge_batch()
+            purged += count
+            if count < self.purge_batch_size:
+                break
+        self.purged += purged
+        if purged:
+            logger.info(f"Purged {purged} delivered outbox events")
+        return purged
+
+    async def backlog(self) -> Dict[str, int]:
+        async with async_session() as db_session:
+            result = await db_session.execute(
+                select(OutboxEvent.status, func.count())
+                .where(OutboxEvent.status != "done")
+                .group_by(OutboxEvent.status)
+            )
+            return {status: count for status, count in result.all()}
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "delivered": self.delivered,
+            "retried": self.retried,
+            "failed": self.failed,
+            "purged": self.purged,
+        }
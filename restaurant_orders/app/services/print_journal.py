@@ -0,0 +1,275 @@
+import asyncio
+import glob
+import logging
+import os
+import re
+import struct
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Registro: magic, longitud del ticket, id del pedido (-1 si no tiene), crc32 del ticket
+_RECORD = struct.Struct(">HIqI")
+_MAGIC = 0x5449  # "TI"
+# Marca de impreso: offset del registro en el journal
+_MARK = struct.Struct(">Q")
+
+_GENERATION = re.compile(r"tickets-(\d+)\.journal$")
+HISTORY_FILE = "history.journal"
+
+
+def _scan(fd: int) -> Tuple[List[Tuple[int, Optional[int], int]], int, int]:
+    """Recorre los registros válidos de un journal: ([(offset, order_id, longitud)], fin válido, tamaño)."""
+    size = os.fstat(fd).st_size
+    records = []
+    offset = 0
+    while offset + _RECORD.size <= size:
+        magic, length, order_id, crc = _RECORD.unpack(os.pread(fd, _RECORD.size, offset))
+        end = offset + _RECORD.size + length
+        if magic != _MAGIC or end > size:
+            break
+        if zlib.crc32(os.pread(fd, length, offset + _RECORD.size)) != crc:
+            break
+        records.append((offset, None if order_id < 0 else order_id, length))
+        offset = end
+    return records, offset, size
+
+
+class PrintJournal:
+    """
+    Journal en disco, solo de añadidos, de los tickets ya renderizados.
+
+    - `tickets-<gen>.journal` guarda cada ticket como un registro con cabecera y
+      crc32; el offset del registro es su identificador.
+    - `printed-<gen>.marks` guarda los offsets de los tickets ya impresos.
+
+    Al abrir se recorren ambos ficheros para reconstruir el índice en memoria
+    (impresos / pendientes y el último ticket de cada pedido); una cola de
+    registro a medio escribir tras un corte se trunca. Los fsync se agrupan:
+    quien espera a `append` comparte el fsync con el resto de tickets que
+    llegaron en la misma ventana de `fsync_interval` segundos.
+
+    Cuando el journal supera `max_bytes` y todo está impreso, se empieza una
+    generación nueva y la anterior queda como `history.journal`, de la que aún
+    se pueden reimprimir tickets.
+    """
+
+    def __init__(self, directory: str, fsync_interval: float = 0.005, max_bytes: int = 16 * 1024 * 1024):
+        self.directory = directory
+        self.fsync_interval = fsync_interval
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._records: Dict[int, Tuple[Optional[int], int]] = {}
+        self._unprinted: "OrderedDict[int, None]" = OrderedDict()
+        self._by_order: Dict[int, int] = {}
+        self._history_by_order: Dict[int, Tuple[int, int]] = {}
+        self._journal = None
+        self._marks = None
+        self._history_fd: Optional[int] = None
+        self._size = 0
+        self._waiters: List[asyncio.Future] = []
+        self._flusher: Optional[asyncio.Task] = None
+        self.appended = 0
+        self.fsyncs = 0
+        self.rotations = 0
+
+    def _path(self, kind: str, generation: int) -> str:
+        name = f"tickets-{generation:06d}.journal" if kind == "journal" else f"printed-{generation:06d}.marks"
+        return os.path.join(self.directory, name)
+
+    # --- Apertura y recuperación ---
+
+    def open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        generations = sorted(
+            int(match.group(1))
+            for match in (_GENERATION.search(path) for path in glob.glob(os.path.join(self.directory, "tickets-*.journal")))
+            if match
+        )
+        with self._lock:
+            # Una rotación interrumpida puede dejar la generación anterior sin archivar
+            for old in generations[:-1]:
+                self._archive(old)
+            self._generation = generations[-1] if generations else 1
+            self._open_generation()
+            self._open_history()
+        logger.info(f"Print journal opened with {len(self._records)} tickets, {len(self._unprinted)} unprinted")
+
+    def _open_generation(self):
+        self._journal = open(self._path("journal", self._generation), "a+b")
+        self._marks = open(self._path("marks", self._generation), "a+b")
+
+        self._records.clear()
+        self._unprinted.clear()
+        self._by_order.clear()
+        records, valid_end, size = _scan(self._journal.fileno())
+        for offset, order_id, length in records:
+            self._index(offset, order_id, length)
+        if valid_end < size:
+            logger.warning(f"Print journal truncated from {size} to {valid_end} bytes (incomplete tail record)")
+            self._journal.truncate(valid_end)
+        self._size = valid_end
+
+        self._marks.seek(0)
+        data = self._marks.read()
+        for i in range(0, len(data) - len(data) % _MARK.size, _MARK.size):
+            (printed,) = _MARK.unpack_from(data, i)
+            self._unprinted.pop(printed, None)
+
+    def _open_history(self):
+        if self._history_fd is not None:
+            os.close(self._history_fd)
+            self._history_fd = None
+        self._history_by_order.clear()
+        path = os.path.join(self.directory, HISTORY_FILE)
+        if not os.path.exists(path):
+            return
+        self._history_fd = os.open(path, os.O_RDONLY)
+        records, _, _ = _scan(self._history_fd)
+        for offset, order_id, length in records:
+            if order_id is not None:
+                self._history_by_order[order_id] = (offset, length)
+
+    def _archive(self, generation: int):
+        journal_path = self._path("journal", generation)
+        os.replace(journal_path, os.path.join(self.directory, HISTORY_FILE))
+        marks_path = self._path("marks", generation)
+        if os.path.exists(marks_path):
+            os.remove(marks_path)
+
+    def _index(self, offset: int, order_id: Optional[int], length: int):
+        self._records[offset] = (order_id, length)
+        self._unprinted[offset] = None
+        if order_id is not None:
+            self._by_order[order_id] = offset
+
+    def close(self):
+        with self._lock:
+            for handle in (self._journal, self._marks):
+                if handle is not None:
+                    handle.flush()
+                    os.fsync(handle.fileno())
+                    handle.close()
+            self._journal = self._marks = None
+            if self._history_fd is not None:
+                os.close(self._history_fd)
+                self._history_fd = None
+
+    # --- Escritura ---
+
+    def write(self, order_id: Optional[int], ticket: bytes) -> int:
+        """Añade un ticket (sin esperar al fsync) y devuelve su offset."""
+        header = _RECORD.pack(_MAGIC, len(ticket), -1 if order_id is None else int(order_id), zlib.crc32(ticket))
+        with self._lock:
+            offset = self._size
+            self._journal.write(header + ticket)
+            self._journal.flush()
+            self._size += len(header) + len(ticket)
+            self._index(offset, order_id, len(ticket))
+        self.appended += 1
+        return offset
+
+    async def append(self, order_id: Optional[int], ticket: bytes) -> int:
+        """Añade un ticket y espera a que sea durable (fsync agrupado)."""
+        offset = self.write(order_id, ticket)
+        await self.sync()
+        return offset
+
+    async def sync(self):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._waiters.append(future)
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.create_task(self._flush_batches())
+        await future
+
+    async def _flush_batches(self):
+        loop = asyncio.get_running_loop()
+        while self._waiters:
+            # Ventana para que otros tickets compartan el mismo fsync
+            await asyncio.sleep(self.fsync_interval)
+            waiters, self._waiters = self._waiters, []
+            try:
+                await loop.run_in_executor(None, self._fsync)
+            except Exception as e:
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_exception(e)
+                continue
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(None)
+
+    def _fsync(self):
+        with self._lock:
+            handles = [self._journal, self._marks]
+        for handle in handles:
+            os.fsync(handle.fileno())
+        self.fsyncs += 1
+
+    def mark_printed(self, offset: int):
+        """Marca un ticket como impreso. Se hace durable con el siguiente fsync; en el peor caso se reimprime."""
+        with self._lock:
+            if offset not in self._unprinted:
+                return
+            self._marks.write(_MARK.pack(offset))
+            self._marks.flush()
+            del self._unprinted[offset]
+            rotate = not self._unprinted and self._size > self.max_bytes
+        if rotate:
+            self.rotate()
+
+    def rotate(self):
+        """Empieza una generación nueva y archiva la actual. Solo si no quedan tickets pendientes."""
+        with self._lock:
+            if self._unprinted:
+                return
+            old = self._generation
+            self._journal.close()
+            self._marks.close()
+            self._generation = old + 1
+            # La generación nueva existe antes de archivar la vieja: ningún corte pierde marcas
+            self._open_generation()
+            self._archive(old)
+            self._open_history()
+        self.rotations += 1
+        logger.info(f"Print journal rotated to generation {self._generation}")
+
+    # --- Lectura ---
+
+    def read(self, offset: int) -> bytes:
+        with self._lock:
+            _, length = self._records[offset]
+            return os.pread(self._journal.fileno(), length, offset + _RECORD.size)
+
+    def unprinted(self) -> List[int]:
+        with self._lock:
+            return list(self._unprinted)
+
+    def ticket_for_order(self, order_id: int) -> Optional[bytes]:
+        """Último ticket de un pedido, del journal actual o del histórico."""
+        offset = self._by_order.get(order_id)
+        if offset is not None:
+            return self.read(offset)
+        with self._lock:
+            entry = self._history_by_order.get(order_id)
+            if entry is None or self._history_fd is None:
+                return None
+            offset, length = entry
+            return os.pread(self._history_fd, length, offset + _RECORD.size)
+
+    def stats(self) -> dict:
+        return {
+            "generation": self._generation,
+            "tickets": len(self._records),
+            "unprinted": len(self._unprinted),
+            "bytes": self._size,
+            "history_tickets": len(self._history_by_order),
+            "appended": self.appended,
+            "fsyncs": self.fsyncs,
+            "rotations": self.rotations,
+        }
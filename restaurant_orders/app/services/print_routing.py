@@ -0,0 +1,73 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from app.services.menu_index import MenuIndex, tokenize
+
+
+@dataclass(frozen=True)
+class StationRule:
+    """
+    Qué imprime una estación: los items cuya categoría del menú o cuyo nombre
+    coincide con sus reglas. `full_ticket` recibe siempre el pedido completo (caja)
+    y `default` recibe los items que no casan con ninguna otra estación.
+    """
+    name: str
+    categories: FrozenSet[str] = field(default_factory=frozenset)
+    keywords: Tuple[Tuple[str, ...], ...] = ()
+    full_ticket: bool = False
+    default: bool = False
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "StationRule":
+        return cls(
+            name=config["name"],
+            categories=frozenset(" ".join(tokenize(category)) for category in config.get("categories", [])),
+            keywords=tuple(tuple(tokenize(keyword)) for keyword in config.get("keywords", []) if tokenize(keyword)),
+            full_ticket=config.get("full_ticket", False),
+            default=config.get("default", False),
+        )
+
+    def matches(self, category: Optional[str], name_tokens: List[str]) -> bool:
+        if category and " ".join(tokenize(category)) in self.categories:
+            return True
+        return any(_contains(name_tokens, keyword) for keyword in self.keywords)
+
+
+def _contains(tokens: List[str], phrase: Tuple[str, ...]) -> bool:
+    size = len(phrase)
+    return any(tuple(tokens[i:i + size]) == phrase for i in range(len(tokens) - size + 1))
+
+
+class StationRouter:
+    """Reparte los items de un pedido entre las estaciones de impresión."""
+
+    def __init__(self, rules: List[StationRule], catalog: Optional[MenuIndex] = None):
+        self.rules = rules
+        self.catalog = catalog
+        self.defaults = [rule for rule in rules if rule.default and not rule.full_ticket] or \
+            [rule for rule in rules if not rule.full_ticket][:1]
+
+    def _category(self, product_name: str) -> Optional[str]:
+        if self.catalog is None:
+            return None
+        item = self.catalog.lookup(product_name)
+        return item.category if item else None
+
+    def route(self, order: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """Devuelve {estación: pedido con solo los items de esa estación}."""
+        items_by_station: Dict[str, List[Dict[str, Any]]] = {}
+        for item in order.get("items", []):
+            product_name = item.get("v_producto_test") or ""
+            category = self._category(product_name)
+            tokens = tokenize(product_name)
+            targets = [rule for rule in self.rules if not rule.full_ticket and rule.matches(category, tokens)]
+            for rule in targets or self.defaults:
+                items_by_station.setdefault(rule.name, []).append(item)
+
+        routed = {}
+        for rule in self.rules:
+            if rule.full_ticket:
+                routed[rule.name] = {**order, "station": rule.name}
+            elif rule.name in items_by_station:
+                routed[rule.name] = {**order, "items": items_by_station[rule.name], "station": rule.name}
+        return routed
@@ -0,0 +1,216 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Un trabajo de impresión recibe la impresora escpos conectada y escribe en ella
+PrintJob = Callable[[Any], Any]
+PrinterConnector = Callable[[], Any]
+
+_STOP = object()
+
+
+class PrintQueueFullError(Exception):
+    """La cola de impresión está llena: la impresora no da abasto o no está disponible."""
+
+
+def printer_connector(backend: str = "usb", vendor_id: int = 0x0456, product_id: int = 0x0808,
+                      file_path: str = "") -> PrinterConnector:
+    """
+    Devuelve una función que abre la impresora según el backend:
+
+    - "usb":   impresora térmica USB (python-escpos `Usb`),
+    - "file":  escribe los bytes ESC/POS en un fichero o dispositivo (`File`),
+    - "dummy": acumula la salida en memoria (`Dummy`), para pruebas y benchmarks.
+    """
+    if backend == "usb":
+        def connect():
+            from escpos.printer import Usb
+            return Usb(vendor_id, product_id)
+    elif backend == "file":
+        def connect():
+            from escpos.printer import File
+            return File(file_path or "/dev/usb/lp0")
+    elif backend == "dummy":
+        def connect():
+            from escpos.printer import Dummy
+            return Dummy()
+    else:
+        raise ValueError(f"Unknown printer backend: {backend}")
+    return connect
+
+
+class _TrackedPrinter:
+    """Envuelve la impresora y cuenta las escrituras intentadas, hayan terminado bien o no."""
+
+    def __init__(self, printer):
+        self._printer = printer
+        self.writes = 0
+
+    def __getattr__(self, name):
+        attr = getattr(self._printer, name)
+        if not callable(attr):
+            return attr
+
+        def call(*args, **kwargs):
+            # Una escritura que falla a medias pudo dejar parte del ticket en el papel
+            self.writes += 1
+            return attr(*args, **kwargs)
+        return call
+
+
+class PrintSpooler:
+    """
+    Cola de impresión con un hilo dedicado que es dueño de la conexión a la
+    impresora, de modo que la E/S bloqueante de python-escpos nunca corre en el
+    event loop.
+
+    La conexión se abre una vez y se reutiliza entre tickets; si un trabajo falla
+    se cierra la conexión. Solo se reconecta y se reintenta (una vez) si el fallo
+    ocurrió al conectar, antes de intentar escribir nada. Si una escritura falla
+    pudo salir parte del ticket, y reintentar imprimiría un ticket a medias
+    seguido de otro completo, así que el error pasa al llamador y el siguiente
+    trabajo abre una conexión nueva. `submit` devuelve
+    un future de asyncio que se resuelve cuando el ticket se ha escrito (o con la
+    excepción si no se pudo).
+    """
+
+    def __init__(self, connect: PrinterConnector, maxsize: int = 100,
+                 reconnect_delay: float = 2.0, name: str = "printer"):
+        self.connect = connect
+        self.maxsize = maxsize
+        self.reconnect_delay = reconnect_delay
+        self.name = name
+        self._queue: queue.Queue = queue.Queue(maxsize)
+        self._thread: Optional[threading.Thread] = None
+        self._printer = None
+        self._next_connect_at = 0.0
+        self.printed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.reconnects = 0
+        self.last_error: Optional[str] = None
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name=f"print-spooler-{self.name}", daemon=True)
+            self._thread.start()
+
+    async def stop(self, timeout: float = 10.0):
+        """Termina los trabajos encolados y cierra la conexión."""
+        thread = self._thread
+        if thread is None:
+            return
+
+        def shutdown():
+            self._queue.put(_STOP, timeout=timeout)
+            thread.join(timeout)
+
+        await asyncio.get_running_loop().run_in_executor(None, shutdown)
+        self._thread = None
+
+    def submit(self, job: PrintJob) -> asyncio.Future:
+        """Encola un trabajo sin bloquear. Lanza PrintQueueFullError si la cola está llena."""
+        self.start()
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        try:
+            self._queue.put_nowait((job, loop, future))
+        except queue.Full:
+            self.rejected += 1
+            raise PrintQueueFullError(f"Print queue '{self.name}' is full ({self.maxsize} jobs)")
+        return future
+
+    async def print(self, job: PrintJob) -> Any:
+        return await self.submit(job)
+
+    # --- Hilo de impresión ---
+
+    def _run(self):
+        while True:
+            entry = self._queue.get()
+            if entry is _STOP:
+                self._disconnect()
+                return
+            job, loop, future = entry
+            try:
+                result = self._execute(job)
+            except Exception as e:
+                self.failed += 1
+                self.last_error = str(e)
+                logger.error(f"Print job failed on '{self.name}': {e}")
+                _notify(loop, future, None, e)
+            else:
+                self.printed += 1
+                _notify(loop, future, result, None)
+
+    def _execute(self, job: PrintJob) -> Any:
+        printer = None
+        try:
+            printer = _TrackedPrinter(self._ensure_connected())
+            return job(printer)
+        except Exception as e:
+            self._disconnect()
+            if printer is not None and printer.writes:
+                # Parte del ticket pudo salir por la impresora: no se repite
+                raise
+            # Impresora desenchufada o reinicio del USB al conectar: reconectar y reintentar una vez
+            logger.warning(f"Printer '{self.name}' error, reconnecting: {e}")
+            self.reconnects += 1
+        try:
+            return job(self._ensure_connected())
+        except Exception:
+            self._disconnect()
+            raise
+
+    def _ensure_connected(self):
+        if self._printer is not None:
+            return self._printer
+        # No martillear el USB si la impresora sigue sin responder
+        wait = self._next_connect_at - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        self._next_connect_at = time.monotonic() + self.reconnect_delay
+        self._printer = self.connect()
+        return self._printer
+
+    def _disconnect(self):
+        printer, self._printer = self._printer, None
+        if printer is not None:
+            try:
+                printer.close()
+            except Exception as e:
+                logger.debug(f"Error closing printer '{self.name}': {e}")
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "maxsize": self.maxsize,
+            "connected": self._printer is not None,
+            "printed": self.printed,
+            "failed": self.failed,
+            "rejected_queue_full": self.rejected,
+            "reconnects": self.reconnects,
+            "last_error": self.last_error,
+        }
+
+
+def _notify(loop: asyncio.AbstractEventLoop, future: asyncio.Future, result: Any, error: Optional[BaseException]):
+    try:
+        loop.call_soon_threadsafe(_resolve, future, result, error)
+    except RuntimeError:
+        # El event loop ya se cerró (apagado del proceso)
+        pass
+
+
+def _resolve(future: asyncio.Future, result: Any, error: Optional[BaseException]):
+    if future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
@@ -1,64 +1,203 @@
-from escpos.printer import Usb
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
 from app.config import settings
-from app.models.order import Order
-from datetime import datetime
+from app.services.menu_index import MenuIndex
+from app.services.print_journal import PrintJournal
+from app.services.print_routing import StationRouter, StationRule
+from app.services.print_spooler import PrintSpooler, PrinterConnector, printer_connector
+from app.services.ticket_template import TicketTemplate, TicketLayout, layout_for_printer
+
+logger = logging.getLogger(__name__)
+
+
+def default_station_config() -> Dict[str, Any]:
+    """Una sola impresora con la configuración PRINTER_* que recibe el pedido completo."""
+    return {"name": settings.PRINTER_NAME, "full_ticket": True}
+
+
+class PrinterStation:
+    """
+    Una impresora (cocina, bar, caja...) con su propio hilo de impresión, su
+    conexión persistente y su journal, de modo que una impresora lenta o
+    desconectada no retrasa a las demás.
+    """
+
+    def __init__(self, name: str, connect: PrinterConnector, layout: TicketLayout,
+                 journal: Optional[PrintJournal] = None):
+        self.name = name
+        # La conexión vive en el hilo del spooler y se reutiliza entre tickets
+        self.spooler = PrintSpooler(
+            connect,
+            maxsize=settings.PRINTER_QUEUE_MAXSIZE,
+            reconnect_delay=settings.PRINTER_RECONNECT_SECONDS,
+            name=name
+        )
+        # Cabecera y pie precompilados; cada ticket es un único buffer ESC/POS
+        self.template = TicketTemplate(layout, title=settings.TICKET_TITLE, footer=settings.TICKET_FOOTER)
+        # Tickets renderizados en disco hasta que la impresora confirma que los imprimió
+        self.journal = journal
+        self._wakeup = asyncio.Event()
+        self._drain_task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "PrinterStation":
+        name = config["name"]
+        connect = printer_connector(
+            config.get("backend", settings.PRINTER_BACKEND),
+            vendor_id=config.get("vendor_id", settings.PRINTER_USB_VENDOR_ID),
+            product_id=config.get("product_id", settings.PRINTER_USB_PRODUCT_ID),
+            file_path=config.get("file_path", settings.PRINTER_FILE_PATH)
+        )
+        layout = layout_for_printer(config.get("printer_name", name), config.get("paper", settings.PRINTER_PAPER))
+        journal = None
+        if settings.PRINT_JOURNAL_ENABLED:
+            journal = PrintJournal(
+                os.path.join(settings.PRINT_JOURNAL_DIR, name),
+                fsync_interval=settings.PRINT_JOURNAL_FSYNC_INTERVAL,
+                max_bytes=settings.PRINT_JOURNAL_MAX_BYTES
+            )
+        return cls(name, connect, layout, journal)
+
+    async def start(self):
+        self.spooler.start()
+        if self.journal is not None and self._drain_task is None:
+            self.journal.open()
+            # Los pendientes de una ejecución anterior se imprimen al arrancar
+            self._drain_task = asyncio.create_task(self._drain())
+
+    async def stop(self):
+        if self._drain_task is not None:
+            self._drain_task.cancel()
+            try:
+                await self._drain_task
+            except asyncio.CancelledError:
+                pass
+            self._drain_task = None
+        await self.spooler.stop()
+        if self.journal is not None:
+            self.journal.close()
+
+    async def print_ticket(self, order_data: dict):
+        """
+        Renderiza el ticket y lo registra en el journal; se imprime en segundo
+        plano en cuanto la impresora esté disponible. Sin journal, se envía al
+        hilo de impresión y se espera a que se escriba.
+        """
+        ticket = self.template.render(order_data)
+        if self.journal is not None and self._drain_task is not None:
+            await self.journal.append(order_data.get('id'), ticket)
+            self._wakeup.set()
+            return
+        await self.spooler.print(lambda printer: printer._raw(ticket))
+
+    async def reprint(self, order_id: int) -> bool:
+        """Reimprime el último ticket de un pedido desde el journal, sin consultar la base de datos."""
+        ticket = self.journal.ticket_for_order(order_id) if self.journal is not None else None
+        if ticket is None:
+            return False
+        await self.spooler.print(lambda printer: printer._raw(ticket))
+        return True
+
+    async def _drain(self):
+        """Imprime en orden los tickets pendientes del journal."""
+        while True:
+            for offset in self.journal.unprinted():
+                ticket = self.journal.read(offset)
+                try:
+                    await self.spooler.print(lambda printer, ticket=ticket: printer._raw(ticket))
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    # Impresora no disponible: se reintenta en la siguiente vuelta
+                    logger.warning(f"Printer '{self.name}' unavailable, {len(self.journal.unprinted())} tickets pending: {e}")
+                    break
+                self.journal.mark_printed(offset)
+
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.PRINT_JOURNAL_RETRY_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def stats(self) -> dict:
+        stats = self.spooler.stats()
+        stats["paper"] = self.template.layout.name
+        if self.journal is not None:
+            stats["journal"] = self.journal.stats()
+        return stats
+
 
 class PrinterService:
-    def __init__(self):
-        # Configuración de la impresora USB
-        # Estos valores pueden variar según tu impresora
-        self.vendor_id = 0x0456
-        self.product_id = 0x0808
-        
-    def _connect_printer(self):
-        try:
-            return Usb(self.vendor_id, self.product_id)
-        except Exception as e:
-            print(f"Error connecting to printer: {str(e)}")
-            raise
+    """
+    Impresión de tickets en una o varias estaciones. Con PRINTER_STATIONS
+    configurado, los items de cada pedido se reparten según las reglas de cada
+    estación (categoría del menú o palabras del nombre) y cada estación imprime
+    su parte en paralelo.
+
+    Con el journal, cada estación encola el ticket en disco y lo reintenta por
+    su cuenta. Sin él (PRINT_JOURNAL_ENABLED=False), si alguna estación falla,
+    el evento del outbox falla y se reintenta; las estaciones que ya imprimieron
+    ese pedido se recuerdan y no lo repiten.
+    """
+
+    def __init__(self, stations: Optional[List[Dict[str, Any]]] = None, catalog: Optional[MenuIndex] = None,
+                 remember_orders: int = 1000):
+        configs = stations if stations is not None else (settings.PRINTER_STATIONS or [default_station_config()])
+        self.stations: Dict[str, PrinterStation] = {}
+        for config in configs:
+            self.stations[config["name"]] = PrinterStation.from_config(config)
+        self.router = StationRouter([StationRule.from_config(config) for config in configs], catalog)
+        # Pedido -> estaciones que ya lo imprimieron, mientras falte alguna
+        self.remember_orders = remember_orders
+        self._partial: OrderedDict = OrderedDict()
+
+    async def start(self):
+        for station in self.stations.values():
+            await station.start()
+
+    async def stop(self):
+        await asyncio.gather(*(station.stop() for station in self.stations.values()))
 
     async def print_ticket(self, order_data: dict):
-        try:
-            printer = self._connect_printer()
-            
-            # Formato del ticket
-            printer.text("================================\n")
-            printer.set(align='center', bold=True, double_height=True)
-            printer.text("RESTAURANT NAME\n")
-            printer.set(align='left', bold=False, double_height=False)
-            printer.text("================================\n")
-            
-            # Información del pedido
-            printer.text(f"Orden #: {order_data.get('id', 'N/A')}\n")
-            printer.text(f"Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M')}\n")
-            printer.text(f"Cliente: {order_data.get('v_cliente_test', 'N/A')}\n")
-            printer.text("--------------------------------\n")
-
-            # Items del pedido
-            printer.text("ITEMS:\n")
-            for item in order_data.get('items', []):
-                printer.text(f"{item.get('v_cantidad', 0)} x {item.get('v_producto_test', 'N/A')}\n")
-                printer.text(f"    ${item.get('v_precio', 0):.2f}\n")
-
-            printer.text("--------------------------------\n")
-
-            # Total
-            printer.set(align='right', bold=True)
-            printer.text(f"TOTAL: ${order_data.get('v_importe_total', 0):.2f}\n")
-            printer.set(align='left', bold=False)
-
-            # Instrucciones especiales
-            if order_data.get('v_observaciones'):
-                printer.text("\nInstrucciones especiales:\n")
-                printer.text(f"{order_data['v_observaciones']}\n")
-            
-            printer.text("================================\n")
-            printer.text("¡Gracias por su preferencia!\n")
-            printer.cut()
-            
-        except Exception as e:
-            print(f"Error printing ticket: {str(e)}")
-            raise
-        finally:
-            if 'printer' in locals():
-                printer.close()
+        """Reparte el pedido entre las estaciones e imprime en todas a la vez."""
+        if len(self.stations) == 1:
+            routed = {name: order_data for name in self.stations}
+        else:
+            routed = self.router.route(order_data)
+
+        order_id = order_data.get('id')
+        done = self._partial.pop(order_id, set()) if order_id is not None else set()
+        pending = {name: station_order for name, station_order in routed.items() if name not in done}
+
+        results = await asyncio.gather(
+            *(self.stations[name].print_ticket(station_order) for name, station_order in pending.items()),
+            return_exceptions=True
+        )
+        errors = []
+        for name, result in zip(pending, results):
+            if isinstance(result, Exception):
+                errors.append((name, result))
+            else:
+                done.add(name)
+        for name, error in errors:
+            print(f"Error printing ticket on {name}: {str(error)}")
+        if errors:
+            if order_id is not None:
+                # En el reintento solo imprimen las estaciones que fallaron
+                self._partial[order_id] = done
+                while len(self._partial) > self.remember_orders:
+                    self._partial.popitem(last=False)
+            raise errors[0][1]
+
+    async def reprint(self, order_id: int, station: Optional[str] = None) -> bool:
+        """Reimprime el pedido en una estación concreta o en todas las que lo imprimieron."""
+        targets = [self.stations[station]] if station else list(self.stations.values())
+        results = await asyncio.gather(*(target.reprint(order_id) for target in targets))
+        return any(results)
+
+    def stats(self) -> dict:
+        return {name: station.stats() for name, station in self.stations.items()}
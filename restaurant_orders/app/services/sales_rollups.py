@@ -0,0 +1,136 @@
+import asyncio
+import time
+from datetime import date, datetime, tzinfo
+from typing import Any, Dict, Iterable, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import select
+
+from app.config import settings
+from app.database.connection import async_session
+from app.models.sales import SalesHourly, SalesPaymentHourly, SalesProductHourly
+from app.services.delivery_time import service_day_bounds
+
+
+def summarize(day: date, tz: tzinfo, hourly: Iterable[Tuple], products: Iterable[Tuple],
+              payments: Iterable[Tuple]) -> Dict[str, Any]:
+    """
+    Resumen de un día a partir de las filas de los agregados por hora:
+    (hour, orders, revenue), (hour, product, quantity, revenue) y
+    (hour, method, payments, amount). El coste depende del número de buckets,
+    no del de pedidos.
+    """
+    hours = []
+    total_orders, total_revenue = 0, 0.0
+    for hour, orders, revenue in sorted(hourly):
+        starts_at = hour.astimezone(tz)
+        hours.append({
+            "hour": starts_at.strftime("%H:%M"),
+            "starts_at": starts_at.isoformat(),
+            "orders": orders,
+            "revenue": round(float(revenue), 2),
+        })
+        total_orders += orders
+        total_revenue += float(revenue)
+
+    by_product: Dict[str, Dict[str, Any]] = {}
+    for _, product, quantity, revenue in products:
+        entry = by_product.setdefault(product, {"product": product, "quantity": 0, "revenue": 0.0})
+        entry["quantity"] += quantity
+        entry["revenue"] += float(revenue)
+
+    by_method: Dict[str, Dict[str, Any]] = {}
+    for _, method, count, amount in payments:
+        entry = by_method.setdefault(method, {"method": method, "payments": 0, "amount": 0.0})
+        entry["payments"] += count
+        entry["amount"] += float(amount)
+
+    for entry in by_product.values():
+        entry["revenue"] = round(entry["revenue"], 2)
+    for entry in by_method.values():
+        entry["amount"] = round(entry["amount"], 2)
+
+    return {
+        "day": day.isoformat(),
+        "orders": total_orders,
+        "revenue": round(total_revenue, 2),
+        "average_ticket": round(total_revenue / total_orders, 2) if total_orders else 0.0,
+        "hourly": hours,
+        # Las cancelaciones restan: un producto o método puede quedar a cero
+        "products": sorted((e for e in by_product.values() if e["quantity"]),
+                           key=lambda e: (-e["revenue"], e["product"])),
+        "payment_methods": sorted((e for e in by_method.values() if e["payments"]),
+                                  key=lambda e: (-e["amount"], e["method"])),
+    }
+
+
+class SalesRollups:
+    """
+    Lectura de los agregados de ventas (sales_*_hourly) con caché en memoria
+    del día en curso.
+
+    Los agregados los mantiene la base de datos en cada commit de un pedido, así
+    que leer un día son unas decenas de filas. El resumen de hoy se guarda
+    `cache_seconds` para que los refrescos de varios dashboards no repitan la
+    consulta; las peticiones concurrentes con la caché vencida esperan a una
+    sola lectura.
+    """
+
+    def __init__(self, service_timezone: str = "America/Lima", cache_seconds: float = 5.0):
+        self.tz = ZoneInfo(service_timezone)
+        self.cache_seconds = cache_seconds
+        self._cached: Optional[Dict[str, Any]] = None
+        self._cached_at = 0.0
+        self._lock = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    async def _read(self, day: date) -> Dict[str, Any]:
+        day_start, day_end = service_day_bounds(day, self.tz)
+        async with async_session() as db_session:
+            hourly = await db_session.execute(
+                select(SalesHourly.hour, SalesHourly.orders, SalesHourly.revenue)
+                .where(SalesHourly.hour >= day_start, SalesHourly.hour < day_end)
+            )
+            products = await db_session.execute(
+                select(SalesProductHourly.hour, SalesProductHourly.product,
+                       SalesProductHourly.quantity, SalesProductHourly.revenue)
+                .where(SalesProductHourly.hour >= day_start, SalesProductHourly.hour < day_end)
+            )
+            payments = await db_session.execute(
+                select(SalesPaymentHourly.hour, SalesPaymentHourly.method,
+                       SalesPaymentHourly.payments, SalesPaymentHourly.amount)
+                .where(SalesPaymentHourly.hour >= day_start, SalesPaymentHourly.hour < day_end)
+            )
+            return summarize(day, self.tz, hourly.all(), products.all(), payments.all())
+
+    async def day_summary(self, day: Optional[date] = None) -> Dict[str, Any]:
+        today = datetime.now(self.tz).date()
+        day = day or today
+        if day != today:
+            return await self._read(day)
+
+        async with self._lock:
+            cached = self._cached
+            if cached is not None and cached["day"] == today.isoformat() \
+                    and time.monotonic() - self._cached_at < self.cache_seconds:
+                self.hits += 1
+                return cached
+            self.misses += 1
+            self._cached = await self._read(today)
+            self._cached_at = time.monotonic()
+            return self._cached
+
+    def invalidate(self):
+        self._cached = None
+
+    def stats(self) -> dict:
+        return {
+            "cache_seconds": self.cache_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "cached_age_seconds": round(time.monotonic() - self._cached_at, 1) if self._cached else None,
+        }
+
+
+sales_rollups = SalesRollups(settings.SERVICE_TIMEZONE, cache_seconds=settings.ANALYTICS_CACHE_SECONDS)
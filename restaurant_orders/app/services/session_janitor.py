@@ -0,0 +1,110 @@
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import delete, func, select
+
+from app.config import settings
+from app.database.connection import async_session
+from app.models.user import MagicLink, UserSession
+
+logger = logging.getLogger(__name__)
+
+
+class SessionJanitor:
+    """
+    Borra en segundo plano las sesiones y magic links caducados.
+
+    Cada login crea una fila en `user_sessions` y otra en `magic_links` que
+    nadie borraba. El borrado va por lotes de `batch_size` filas, cada uno en
+    su propia transacción y elegido con FOR UPDATE SKIP LOCKED, así que los
+    bloqueos duran milisegundos y nunca esperan a una sesión que se esté usando.
+    Las filas se conservan `retention_hours` después de caducar por si hace
+    falta revisar un acceso reciente; las sesiones cerradas con /logout también
+    caducan (a la hora de crearse), así que basta con mirar `expires_at`.
+    """
+
+    def __init__(self, interval_seconds: float = 600.0, retention_hours: float = 24.0,
+                 batch_size: int = 1000, max_batches: int = 50, batch_pause_seconds: float = 0.1):
+        self.interval_seconds = interval_seconds
+        self.retention = timedelta(hours=retention_hours)
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self.batch_pause_seconds = batch_pause_seconds
+        self._task: Optional[asyncio.Task] = None
+        self.rounds = 0
+        self.deleted: Dict[str, int] = {"user_sessions": 0, "magic_links": 0}
+
+    async def _delete_batch(self, model) -> int:
+        batch = (
+            select(model.id)
+            .where(model.expires_at < func.now() - self.retention)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        async with async_session() as db_session:
+            result = await db_session.execute(
+                delete(model).where(model.id.in_(batch)).execution_options(synchronize_session=False)
+            )
+            await db_session.commit()
+        return result.rowcount
+
+    async def purge_once(self) -> Dict[str, int]:
+        """Una ronda de limpieza. Devuelve cuántas filas se borraron por tabla."""
+        deleted = {}
+        for model in (UserSession, MagicLink):
+            table = model.__tablename__
+            deleted[table] = 0
+            for _ in range(self.max_batches):
+                count = await self._delete_batch(model)
+                deleted[table] += count
+                if count < self.batch_size:
+                    break
+                # Deja pasar al resto de la carga entre lote y lote
+                await asyncio.sleep(self.batch_pause_seconds)
+            self.deleted[table] += deleted[table]
+
+        self.rounds += 1
+        if any(deleted.values()):
+            logger.info(f"Session janitor purged {deleted}")
+        return deleted
+
+    async def _run(self):
+        while True:
+            try:
+                await self.purge_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error purging expired sessions: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    async def start(self):
+        if self.interval_seconds > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "rounds": self.rounds,
+            "deleted": dict(self.deleted),
+        }
+
+
+session_janitor = SessionJanitor(
+    interval_seconds=settings.SESSION_JANITOR_INTERVAL_SECONDS,
+    retention_hours=settings.SESSION_JANITOR_RETENTION_HOURS,
+    batch_size=settings.SESSION_JANITOR_BATCH_SIZE,
+    max_batches=settings.SESSION_JANITOR_MAX_BATCHES,
+)
@@ -0,0 +1,79 @@
+import asyncio
+import logging
+import time
+from typing import AsyncIterator
+
+from telegram import Bot
+from telegram.error import BadRequest, TelegramError
+
+logger = logging.getLogger(__name__)
+
+# Límite de caracteres de un mensaje de Telegram
+TELEGRAM_MAX_MESSAGE_LENGTH = 4096
+
+
+async def stream_reply(
+    bot: Bot,
+    chat_id: int,
+    chunks: AsyncIterator[str],
+    edit_interval: float = 1.0,
+    min_first_chars: int = 10,
+    send_timeout: float = 10.0
+) -> str:
+    """
+    Envía una respuesta a medida que llega: el primer mensaje sale en cuanto hay
+    `min_first_chars` caracteres y después se edita como mucho una vez cada
+    `edit_interval` segundos (Telegram limita las ediciones por chat). Si una
+    edición falla se deja de editar y el texto completo se envía al final en un
+    mensaje nuevo. Devuelve el texto completo enviado.
+    """
+    text = ""
+    sent_text = ""
+    message_id = None
+    last_edit = 0.0
+    editable = True
+
+    async def edit(new_text: str) -> bool:
+        try:
+            await asyncio.wait_for(
+                bot.edit_message_text(chat_id=chat_id, message_id=message_id, text=new_text),
+                timeout=send_timeout
+            )
+        except BadRequest as e:
+            if "not modified" in str(e).lower():
+                return True
+            logger.warning(f"Telegram edit failed, sending the reply as a new message: {e}")
+            return False
+        except (TelegramError, asyncio.TimeoutError) as e:
+            logger.warning(f"Telegram edit failed, sending the reply as a new message: {e!r}")
+            return False
+        return True
+
+    async for chunk in chunks:
+        text = (text + chunk)[:TELEGRAM_MAX_MESSAGE_LENGTH]
+        now = time.monotonic()
+
+        if message_id is None:
+            if len(text.strip()) >= min_first_chars:
+                message = await asyncio.wait_for(
+                    bot.send_message(chat_id=chat_id, text=text),
+                    timeout=send_timeout
+                )
+                message_id = message.message_id
+                sent_text = text
+                last_edit = now
+        elif editable and now - last_edit >= edit_interval and text.strip() != sent_text.strip():
+            editable = await edit(text)
+            if editable:
+                sent_text = text
+            last_edit = now
+
+    # Texto final: mensaje nuevo si no llegó a enviarse nada, edición si quedó pendiente
+    if message_id is None:
+        if text.strip():
+            await asyncio.wait_for(bot.send_message(chat_id=chat_id, text=text), timeout=send_timeout)
+    elif text.strip() != sent_text.strip():
+        if not (editable and await edit(text)):
+            await asyncio.wait_for(bot.send_message(chat_id=chat_id, text=text), timeout=send_timeout)
+
+    return text
@@ -0,0 +1,134 @@
+import re
+import textwrap
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+# Comandos ESC/POS usados en los tickets
+ESC = b"\x1b"
+GS = b"\x1d"
+INIT = ESC + b"@"
+ALIGN_LEFT = ESC + b"a\x00"
+ALIGN_CENTER = ESC + b"a\x01"
+ALIGN_RIGHT = ESC + b"a\x02"
+BOLD_ON = ESC + b"E\x01"
+BOLD_OFF = ESC + b"E\x00"
+DOUBLE_HEIGHT = GS + b"!\x01"
+NORMAL_SIZE = GS + b"!\x00"
+FEED_AND_CUT = ESC + b"d\x05" + GS + b"V\x00"
+
+
+def select_codepage(number: int) -> bytes:
+    return ESC + b"t" + bytes([number])
+
+
+@dataclass(frozen=True)
+class TicketLayout:
+    """Ancho de línea (fuente A) y página de códigos de una impresora térmica."""
+    name: str
+    width: int
+    encoding: str = "cp858"
+    codepage: int = 19  # PC858 (Europa occidental con €) en impresoras Epson y compatibles
+
+
+LAYOUTS = {
+    "58mm": TicketLayout("58mm", width=32),
+    "80mm": TicketLayout("80mm", width=48),
+}
+
+
+def layout_for_printer(printer_name: str, paper: str = "") -> TicketLayout:
+    """Layout según el papel configurado o, si no, según el nombre ("POS-58", "POS-80")."""
+    if paper:
+        return LAYOUTS[paper]
+    match = re.search(r"(58|80)", printer_name or "")
+    return LAYOUTS[f"{match.group(1)}mm"] if match else LAYOUTS["58mm"]
+
+
+class TicketTemplate:
+    """
+    Renderiza un pedido a un único buffer ESC/POS listo para enviarse a la
+    impresora en una sola escritura.
+
+    La cabecera y el pie no dependen del pedido y se compilan una vez; por cada
+    ticket solo se codifican las líneas variables.
+    """
+
+    def __init__(self, layout: TicketLayout, title: str = "RESTAURANT NAME",
+                 footer: str = "¡Gracias por su preferencia!"):
+        self.layout = layout
+        self._rule = self._encode("=" * layout.width + "\n")
+        self._thin_rule = self._encode("-" * layout.width + "\n")
+        self._header = b"".join([
+            INIT,
+            select_codepage(layout.codepage),
+            self._rule,
+            ALIGN_CENTER, BOLD_ON, DOUBLE_HEIGHT,
+            self._encode(f"{title}\n"),
+            ALIGN_LEFT, BOLD_OFF, NORMAL_SIZE,
+            self._rule,
+        ])
+        self._footer = b"".join([
+            self._rule,
+            self._encode(f"{footer}\n"),
+            FEED_AND_CUT,
+        ])
+        self._items_header = self._thin_rule + self._encode("ITEMS:\n")
+
+    def _encode(self, text: str) -> bytes:
+        return text.encode(self.layout.encoding, errors="replace")
+
+    def _wrap(self, text: str, indent: str = "") -> str:
+        lines = textwrap.wrap(text, width=self.layout.width, subsequent_indent=indent) or [""]
+        return "\n".join(lines) + "\n"
+
+    def _columns(self, left: str, right: str) -> str:
+        """Texto a la izquierda e importe alineado a la derecha en la misma línea si cabe."""
+        space = self.layout.width - len(right) - 1
+        if len(left) <= space:
+            return f"{left:<{space}} {right}\n"
+        return self._wrap(left, indent="  ") + f"{right:>{self.layout.width}}\n"
+
+    def render(self, order: Dict[str, Any], printed_at: Optional[datetime] = None) -> bytes:
+        printed_at = printed_at or datetime.now()
+        buffer = bytearray(self._header)
+
+        if order.get('station'):
+            buffer += ALIGN_CENTER + BOLD_ON
+            buffer += self._encode(f"** {str(order['station']).upper()} **\n")
+            buffer += ALIGN_LEFT + BOLD_OFF
+
+        body = [
+            f"Orden #: {order.get('id', 'N/A')}\n",
+            f"Fecha: {printed_at.strftime('%Y-%m-%d %H:%M')}\n",
+            self._wrap(f"Cliente: {order.get('v_cliente_test') or 'N/A'}"),
+        ]
+        if order.get('v_destino'):
+            body.append(self._wrap(f"Entrega: {order['v_destino']}"))
+        if order.get('v_hora_entrega'):
+            body.append(f"Hora: {order['v_hora_entrega']}\n")
+        buffer += self._encode("".join(body))
+
+        buffer += self._items_header
+        lines = []
+        for item in order.get('items', []):
+            lines.append(self._columns(
+                f"{item.get('v_cantidad', 0)} x {item.get('v_producto_test', 'N/A')}",
+                f"${float(item.get('v_precio') or 0):.2f}"
+            ))
+            if item.get('v_notas'):
+                lines.append(self._wrap(f"  * {item['v_notas']}", indent="    "))
+        buffer += self._encode("".join(lines))
+        buffer += self._thin_rule
+
+        # Total
+        buffer += ALIGN_RIGHT + BOLD_ON
+        buffer += self._encode(f"TOTAL: ${float(order.get('v_importe_total') or 0):.2f}\n")
+        buffer += ALIGN_LEFT + BOLD_OFF
+
+        # Instrucciones especiales
+        if order.get('v_observaciones'):
+            buffer += self._encode("\nInstrucciones especiales:\n" + self._wrap(str(order['v_observaciones'])))
+
+        buffer += self._footer
+        return bytes(buffer)
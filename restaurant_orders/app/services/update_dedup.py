@@ -0,0 +1,105 @@
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.database.connection import async_session
+from app.database.unit_of_work import UnitOfWork
+from app.models.telegram import ProcessedUpdate
+
+logger = logging.getLogger(__name__)
+
+
+class UpdateDeduplicator:
+    """
+    Descarta updates de Telegram repetidos usando su update_id.
+
+    La primera barrera es un LRU en memoria (una búsqueda en un dict por update);
+    la segunda es la tabla `processed_updates`, que permite reconocer reintentos
+    de Telegram aunque el proceso se haya reiniciado entre medias.
+    """
+
+    def __init__(self, capacity: int = 10000, retention_hours: int = 48, prune_every: int = 1000):
+        self.capacity = capacity
+        self.retention = timedelta(hours=retention_hours)
+        self.prune_every = prune_every
+        self._seen: OrderedDict = OrderedDict()
+        self._claims_since_prune = 0
+        self.duplicates_in_memory = 0
+        self.duplicates_in_db = 0
+
+    def remember(self, update_id: int) -> bool:
+        """Registra el update_id en memoria. Devuelve False si ya se había visto."""
+        if update_id in self._seen:
+            self._seen.move_to_end(update_id)
+            self.duplicates_in_memory += 1
+            return False
+        self._seen[update_id] = None
+        if len(self._seen) > self.capacity:
+            self._seen.popitem(last=False)
+        return True
+
+    def forget(self, update_id: int):
+        """Olvida un update_id que no llegó a encolarse, para aceptar su reintento."""
+        self._seen.pop(update_id, None)
+
+    async def claim(self, uow: UnitOfWork, update_id: int) -> bool:
+        """
+        Reclama el update_id en la base de datos. Devuelve False si otro proceso
+        (o una ejecución anterior) ya lo había procesado.
+        """
+        db_session = uow.session
+        try:
+            result = await db_session.execute(
+                insert(ProcessedUpdate)
+                .values(update_id=update_id)
+                .on_conflict_do_nothing(index_elements=[ProcessedUpdate.update_id])
+                .returning(ProcessedUpdate.update_id)
+            )
+            claimed = result.scalar() is not None
+            await db_session.commit()
+
+            self._claims_since_prune += 1
+            if self._claims_since_prune >= self.prune_every:
+                self._claims_since_prune = 0
+                await self._prune(db_session)
+        except Exception as e:
+            # Si la base de datos falla preferimos procesar antes que perder el update
+            logger.error(f"Error claiming update {update_id}: {e}")
+            await db_session.rollback()
+            return True
+
+        if not claimed:
+            self.duplicates_in_db += 1
+        return claimed
+
+    async def _prune(self, db_session):
+        cutoff = datetime.utcnow() - self.retention
+        await db_session.execute(
+            delete(ProcessedUpdate).where(ProcessedUpdate.processed_at < cutoff)
+        )
+        await db_session.commit()
+
+    async def load_recent(self):
+        """Precarga en memoria los update_id más recientes tras un reinicio."""
+        try:
+            async with async_session() as db_session:
+                result = await db_session.execute(
+                    select(ProcessedUpdate.update_id)
+                    .order_by(ProcessedUpdate.update_id.desc())
+                    .limit(self.capacity)
+                )
+                for update_id in reversed(result.scalars().all()):
+                    self._seen[update_id] = None
+        except Exception as e:
+            logger.error(f"Error loading processed updates: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "tracked_in_memory": len(self._seen),
+            "capacity": self.capacity,
+            "duplicates_in_memory": self.duplicates_in_memory,
+            "duplicates_in_db": self.duplicates_in_db,
+        }
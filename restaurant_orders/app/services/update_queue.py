@@ -0,0 +1,199 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+UpdateHandler = Callable[[Dict[str, Any]], Awaitable[None]]
+
+
+def get_update_chat_id(update: Dict[str, Any]) -> Optional[int]:
+    """Extrae el chat_id de cualquier tipo de update de Telegram que lo tenga."""
+    for key in ("message", "edited_message", "channel_post", "callback_query"):
+        payload = update.get(key)
+        if not payload:
+            continue
+        if key == "callback_query":
+            payload = payload.get("message") or {}
+        chat_id = payload.get("chat", {}).get("id")
+        if chat_id is not None:
+            return chat_id
+    return None
+
+
+class LatencyTracker:
+    """Mantiene estadísticas de latencia por etapa sobre una ventana de muestras recientes."""
+
+    def __init__(self, window: int = 500):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._counts: Dict[str, int] = {}
+        self._max: Dict[str, float] = {}
+
+    def observe(self, stage: str, seconds: float):
+        samples = self._samples.get(stage)
+        if samples is None:
+            samples = self._samples[stage] = deque(maxlen=self.window)
+        samples.append(seconds)
+        self._counts[stage] = self._counts.get(stage, 0) + 1
+        self._max[stage] = max(self._max.get(stage, 0.0), seconds)
+
+    @asynccontextmanager
+    async def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        stats = {}
+        for stage, samples in self._samples.items():
+            ordered = sorted(samples)
+            if not ordered:
+                continue
+            stats[stage] = {
+                "count": self._counts[stage],
+                "avg_ms": round(sum(ordered) / len(ordered) * 1000, 2),
+                "p50_ms": round(ordered[len(ordered) // 2] * 1000, 2),
+                "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 2),
+                "max_ms": round(self._max[stage] * 1000, 2),
+            }
+        return stats
+
+
+class UpdateDispatcher:
+    """
+    Cola acotada de updates de Telegram procesados por un pool de workers asyncio.
+
+    Los updates de chats distintos se procesan en paralelo, pero los de un mismo
+    chat_id se procesan estrictamente en el orden de llegada: si un worker recibe
+    un update de un chat que ya está siendo atendido, lo deja en la cola pendiente
+    de ese chat y el worker que lo atiende lo procesa al terminar. Esos updates
+    aparcados cuentan para el límite de la cola, así que un chat que inunda de
+    mensajes no se salta la contrapresión.
+    """
+
+    def __init__(self, handler: UpdateHandler, workers: int, maxsize: int, latency_window: int = 500):
+        self.handler = handler
+        self.worker_count = workers
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.latency = LatencyTracker(latency_window)
+        self._pending: Dict[int, Deque[tuple]] = {}
+        self._workers: list = []
+        self._busy_workers = 0
+        self.enqueued = 0
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    async def start(self):
+        if self._workers:
+            return
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"telegram-update-worker-{i}")
+            for i in range(self.worker_count)
+        ]
+        logger.info(f"Update dispatcher started with {self.worker_count} workers")
+
+    async def stop(self, timeout: float = 10.0):
+        """Espera a que se vacíe la cola (con límite) y detiene los workers."""
+        if not self._workers:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Update dispatcher stopped with {self.queue.qsize()} updates still queued")
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    @property
+    def parked(self) -> int:
+        """Updates sacados de la cola que esperan a que termine otro de su chat."""
+        # Hay como mucho una cola pendiente por worker: recorrerlas es barato
+        return sum(len(pending) for pending in self._pending.values())
+
+    def enqueue(self, update: Dict[str, Any]) -> bool:
+        """Encola un update sin bloquear. Devuelve False si la cola está llena."""
+        if self.queue.maxsize > 0 and self.queue.qsize() + self.parked >= self.queue.maxsize:
+            self.rejected += 1
+            return False
+        try:
+            self.queue.put_nowait((update, time.perf_counter()))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+        self.enqueued += 1
+        return True
+
+    async def _worker(self, index: int):
+        while True:
+            update, enqueued_at = await self.queue.get()
+            chat_id = get_update_chat_id(update)
+
+            # Otro worker ya atiende este chat: se respeta el orden dejándolo pendiente.
+            # El task_done() lo marca el worker que finalmente lo procese.
+            if chat_id is not None and chat_id in self._pending:
+                self._pending[chat_id].append((update, enqueued_at))
+                continue
+
+            if chat_id is None:
+                try:
+                    await self._run(update, enqueued_at)
+                finally:
+                    self.queue.task_done()
+                continue
+
+            pending = self._pending[chat_id] = deque([(update, enqueued_at)])
+            try:
+                while pending:
+                    queued_update, queued_at = pending.popleft()
+                    try:
+                        await self._run(queued_update, queued_at)
+                    finally:
+                        self.queue.task_done()
+            finally:
+                # Si el worker se cancela, los pendientes se marcan para no bloquear join()
+                for _ in pending:
+                    self.queue.task_done()
+                del self._pending[chat_id]
+
+    async def _run(self, update: Dict[str, Any], enqueued_at: float):
+        self.latency.observe("queue_wait", time.perf_counter() - enqueued_at)
+        self._busy_workers += 1
+        try:
+            async with self.latency.stage("total"):
+                await self.handler(update)
+            self.processed += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.failed += 1
+            logger.error(f"Error processing update {update.get('update_id')}: {e}")
+        finally:
+            self._busy_workers -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "workers": self.worker_count,
+            "busy_workers": self._busy_workers,
+            "queue_depth": self.queue.qsize(),
+            "parked": self.parked,
+            "queue_maxsize": self.queue.maxsize,
+            "chats_in_progress": len(self._pending),
+            "enqueued": self.enqueued,
+            "processed": self.processed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "latency": self.latency.snapshot(),
+        }
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Benchmark: consultas calientes por SQLAlchemy (ORM/text, como antes) frente a
+`HotQueries` (statements preparados de asyncpg cacheados por conexión).
+
+- sesión: usuario y rol vinculados a un chat de Telegram (cada mensaje);
+- pedido: `insert_pedido_completo` más sus dos eventos del outbox, en una
+  transacción que se deshace al final para no dejar datos.
+
+Necesita la base de datos de settings.DATABASE_URL con los esquemas aplicados.
+El chat consultado no necesita existir: se mide el coste de la consulta.
+
+Uso: python benchmarks/bench_hot_queries.py [repeticiones] [telegram_chat_id]
+"""
+
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.connection import engine
+from app.database.hot_queries import HotQueries
+from app.models.user import User, UserSession
+from app.services.order_processor import INSERT_ORDER_SQL, build_order_payload, group_tool_calls
+from app.services.outbox import ORDER_EVENTS, add_order_events, order_event_payload
+
+ITEMS = 5
+
+
+def make_order_json() -> str:
+    calls = [{"function_call": {"name": "insert_pedido", "args": {
+        "v_cliente_test": "benchmark", "v_hora_entrega": "12:30", "v_destino": "Av. Larco 123",
+        "v_importe_total": 10.0 * ITEMS, "v_observaciones": None,
+    }}}]
+    calls += [{"function_call": {"name": "insert_detalle_pedido", "args": {
+        "v_producto_test": f"Producto {i}", "v_cantidad": 1, "v_precio": 10.0, "v_notas": None,
+    }}} for i in range(ITEMS)]
+    return json.dumps(build_order_payload(*group_tool_calls(calls)), default=str)
+
+
+async def orm_session_check(chat_id: int):
+    async with AsyncSession(engine) as session:
+        result = await session.execute(
+            select(UserSession.user_id, User.role, UserSession.expires_at)
+            .join(User, User.id == UserSession.user_id)
+            .where(
+                UserSession.telegram_chat_id == chat_id,
+                UserSession.is_active == True,
+                UserSession.user_id.isnot(None),
+                UserSession.expires_at > datetime.utcnow()
+            )
+            .order_by(UserSession.expires_at.desc())
+            .limit(1)
+        )
+        return result.first()
+
+
+async def orm_insert(order_json: str):
+    async with AsyncSession(engine) as session:
+        transaction = await session.begin()
+        result = await session.execute(INSERT_ORDER_SQL, {"v_pedido": order_json})
+        add_order_events(session, {"id": result.scalar_one(), "v_cliente_test": "benchmark"})
+        await session.flush()
+        await transaction.rollback()
+
+
+async def prepared_session_check(hot: HotQueries, chat_id: int):
+    async with AsyncSession(engine) as session:
+        return await hot.chat_auth(session, chat_id)
+
+
+async def prepared_insert(hot: HotQueries, order_json: str):
+    # HotQueries.insert_order en la transacción de la sesión, que se deshace
+    async with AsyncSession(engine) as session:
+        await hot.insert_order(
+            session, order_json, outbox_events=ORDER_EVENTS,
+            outbox_payload=lambda order_id: order_event_payload({"id": order_id, "v_cliente_test": "benchmark"})
+        )
+        await session.rollback()
+
+
+async def measure(call, repetitions: int) -> float:
+    await call()  # calentamiento: conexión del pool y statements preparados
+    latencies = []
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        await call()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return statistics.median(latencies)
+
+
+async def run(repetitions: int = 200, chat_id: int = -1):
+    hot = HotQueries()
+    order_json = make_order_json()
+    try:
+        rows = [
+            ("sesión", await measure(lambda: orm_session_check(chat_id), repetitions),
+             await measure(lambda: prepared_session_check(hot, chat_id), repetitions)),
+            ("pedido", await measure(lambda: orm_insert(order_json), repetitions),
+             await measure(lambda: prepared_insert(hot, order_json), repetitions)),
+        ]
+    finally:
+        await engine.dispose()
+
+    print(f"{repetitions} repeticiones (mediana)")
+    print(f"{'':<8} {'ORM (ms)':>10} {'preparado (ms)':>15} {'mejora':>8}")
+    for name, orm_ms, prepared_ms in rows:
+        print(f"{name:<8} {orm_ms:>10.3f} {prepared_ms:>15.3f} {orm_ms / prepared_ms:>7.1f}x")
+    print(f"stats: {hot.stats()}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:3]
+    asyncio.run(run(*(int(arg) for arg in args)))
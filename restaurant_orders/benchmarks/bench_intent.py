@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: clasificación de intenciones con el regex compilado frente a
+los bucles de palabras clave que usaban el webhook y el agente de IA.
+
+Uso: python benchmarks/bench_intent.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.intent import classify_intent
+
+LOGIN_KEYWORDS = [
+    'iniciar sesión', 'iniciar sesion', 'login', 'log in', 'autenticar', 'autenticarme',
+    'ingresar', 'entrar', 'acceder', 'registrarme', 'registrar',
+    'quiero iniciar', 'necesito iniciar', 'deseo iniciar',
+    'session', 'sesion', 'loguear', 'loguearme', 'acceder',
+    'enviame el enlace', 'dame el link', 'link de login', 'enlace de login'
+]
+STATUS_KEYWORDS = ['estoy logueado', 'estoy autenticado', 'estoy login', 'status login', 'mi estado']
+LOGOUT_KEYWORDS = ['cerrar sesion', 'logout', 'cerrar sesión', 'desconectar', 'salir']
+
+MESSAGES = [
+    "hola",
+    "gracias!",
+    "¿qué hay hoy de menú?",
+    "Hola, me gustaría pedir dos pizzas de pepperoni grandes y una ensalada césar. "
+    "La entrega es en la Calle Falsa 123, una de las pizzas sin aceitunas por favor.",
+    "quiero iniciar sesión",
+    "mi estado",
+    "cerrar sesión",
+]
+
+
+def legacy_classify(message: str):
+    """Recorridos del flujo anterior: webhook (login, estado, logout) + agente (login)."""
+    message_lower = message.lower()
+    if any(keyword in message_lower for keyword in LOGIN_KEYWORDS):
+        return "login"
+    if any(keyword in message_lower for keyword in STATUS_KEYWORDS):
+        return "status"
+    if any(keyword in message_lower for keyword in LOGOUT_KEYWORDS):
+        return "logout"
+    # Mensaje normal: el agente de IA volvía a buscar las palabras de login
+    message_lower = message.lower()
+    for keyword in LOGIN_KEYWORDS:
+        if keyword in message_lower:
+            return "login"
+    return None
+
+
+def run(number: int = 20000):
+    print(f"{'mensaje':<40} {'legacy (µs)':>12} {'regex (µs)':>12}")
+    for message in MESSAGES:
+        legacy = timeit.timeit(lambda: legacy_classify(message), number=number) / number * 1e6
+        compiled = timeit.timeit(lambda: classify_intent(message), number=number) / number * 1e6
+        label = (message[:37] + "...") if len(message) > 40 else message
+        print(f"{label:<40} {legacy:>12.2f} {compiled:>12.2f}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark: inserción de un pedido con una llamada SQL por item (flujo anterior)
+frente a `insert_pedido_completo`, que inserta pedido, items y pago en un solo
+viaje. Mide viajes a la base de datos y latencia por pedido con 1, 10 y 50 items.
+
+Necesita la base de datos de settings.DATABASE_URL con database_functions.sql
+aplicado. Cada pedido se inserta en una transacción que se deshace al final.
+
+Uso: python benchmarks/bench_order_insert.py [repeticiones]
+"""
+
+import asyncio
+import datetime
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.config import settings
+from app.services.order_processor import INSERT_ORDER_SQL, build_order_payload, group_tool_calls
+
+SIZES = (1, 10, 50)
+
+
+def make_tool_calls(n_items: int):
+    calls = [{"function_call": {"name": "insert_pedido", "args": {
+        "v_cliente_test": "benchmark", "v_hora_entrega": "12:30", "v_destino": "Av. Larco 123",
+        "v_importe_total": 10.0 * n_items, "v_observaciones": None,
+    }}}]
+    for i in range(n_items):
+        calls.append({"function_call": {"name": "insert_detalle_pedido", "args": {
+            "v_producto_test": f"Producto {i}", "v_cantidad": 1, "v_precio": 10.0, "v_notas": None,
+        }}})
+    calls.append({"function_call": {"name": "insert_pago", "args": {
+        "v_metodo": "efectivo", "v_importe": 10.0 * n_items, "v_estado": "pendiente",
+        "v_fecha_hora": datetime.datetime.utcnow(),
+    }}})
+    return calls
+
+
+async def insert_per_call(conn, tool_calls):
+    """Flujo anterior: tres recorridos de tool_calls y una sentencia por llamada."""
+    pedido_id = None
+    for part in tool_calls:
+        if part['function_call']['name'] == "insert_pedido":
+            args = part['function_call']['args']
+            result = await conn.execute(
+                text("SELECT insert_pedido(:v_cliente_test, :v_hora_entrega, :v_destino, :v_importe_total, :v_observaciones)"),
+                args
+            )
+            pedido_id = result.scalar_one()
+            break
+    for part in tool_calls:
+        if part['function_call']['name'] == "insert_detalle_pedido":
+            await conn.execute(
+                text("SELECT insert_detalle_pedido(:v_pedido_id, :v_producto_test, :v_cantidad, :v_precio, :v_notas)"),
+                {"v_pedido_id": pedido_id, **part['function_call']['args']}
+            )
+    for part in tool_calls:
+        if part['function_call']['name'] == "insert_pago":
+            await conn.execute(
+                text("SELECT insert_pago(:v_pedido_id, :v_metodo, :v_importe, :v_estado, :v_fecha_hora)"),
+                {"v_pedido_id": pedido_id, **part['function_call']['args']}
+            )
+            break
+    return pedido_id
+
+
+async def insert_bulk(conn, tool_calls):
+    pedido, items, pago = group_tool_calls(tool_calls)
+    result = await conn.execute(
+        INSERT_ORDER_SQL,
+        {"v_pedido": json.dumps(build_order_payload(pedido, items, pago), default=str)}
+    )
+    return result.scalar_one()
+
+
+async def measure(engine, counter, insert, tool_calls, repetitions):
+    latencies, round_trips = [], []
+    for _ in range(repetitions):
+        async with engine.connect() as conn:
+            transaction = await conn.begin()
+            counter["statements"] = 0
+            start = time.perf_counter()
+            await insert(conn, tool_calls)
+            latencies.append((time.perf_counter() - start) * 1000)
+            round_trips.append(counter["statements"])
+            await transaction.rollback()
+    return statistics.median(round_trips), statistics.median(latencies)
+
+
+async def run(repetitions: int = 50):
+    engine = create_async_engine(settings.DATABASE_URL, echo=False)
+    counter = {"statements": 0}
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def count_statement(*_):
+        counter["statements"] += 1
+
+    print(f"{'items':>6} {'viajes antes':>13} {'viajes ahora':>13} {'ms antes':>10} {'ms ahora':>10}")
+    try:
+        for size in SIZES:
+            tool_calls = make_tool_calls(size)
+            legacy_trips, legacy_ms = await measure(engine, counter, insert_per_call, tool_calls, repetitions)
+            bulk_trips, bulk_ms = await measure(engine, counter, insert_bulk, tool_calls, repetitions)
+            print(f"{size:>6} {legacy_trips:>13.0f} {bulk_trips:>13.0f} {legacy_ms:>10.2f} {bulk_ms:>10.2f}")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(run(int(sys.argv[1]) if len(sys.argv) > 1 else 50))
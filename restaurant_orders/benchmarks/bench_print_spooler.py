@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark: impresión de tickets en el event loop (conectando en cada ticket,
+como hacía `PrinterService.print_ticket`) frente al spooler con hilo propio y
+conexión persistente.
+
+La impresora se simula con latencias típicas de una térmica USB, así que no hace
+falta hardware. Se mide el tiempo total y el bloqueo máximo del event loop (lo
+que tardaría en atenderse un webhook mientras se imprime).
+
+Uso: python benchmarks/bench_print_spooler.py [tickets]
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.print_spooler import PrintSpooler
+from app.services.ticket_template import LAYOUTS, TicketTemplate
+
+CONNECT_SECONDS = 0.05  # abrir el dispositivo USB
+WRITE_SECONDS = 0.005   # escritura del ticket completo
+
+ORDER = {
+    "id": 1234,
+    "v_cliente_test": "Cliente de prueba",
+    "v_importe_total": 33.0,
+    "v_observaciones": "Una de las pizzas sin aceitunas",
+    "items": [
+        {"v_cantidad": 2, "v_producto_test": "Pizza Pepperoni Grande", "v_precio": 12.5},
+        {"v_cantidad": 1, "v_producto_test": "Ensalada César", "v_precio": 8.0},
+    ],
+}
+
+
+class SlowPrinter:
+    def __init__(self):
+        time.sleep(CONNECT_SECONDS)
+
+    def _raw(self, data):
+        time.sleep(WRITE_SECONDS)
+
+    def close(self):
+        pass
+
+
+async def watch_loop_lag(stop: asyncio.Event, lags: list, interval: float = 0.001):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+async def measure(print_all) -> tuple:
+    stop, lags = asyncio.Event(), []
+    watcher = asyncio.create_task(watch_loop_lag(stop, lags))
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await print_all()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await watcher
+    return elapsed, max(lags, default=0.0)
+
+
+async def run(tickets: int = 20):
+    ticket = TicketTemplate(LAYOUTS["58mm"]).render(ORDER)
+
+    async def legacy():
+        for _ in range(tickets):
+            printer = SlowPrinter()
+            printer._raw(ticket)
+            printer.close()
+            await asyncio.sleep(0)
+
+    spooler = PrintSpooler(SlowPrinter, maxsize=tickets)
+
+    async def spooled():
+        await asyncio.gather(*(spooler.print(lambda p: p._raw(ticket)) for _ in range(tickets)))
+
+    legacy_total, legacy_lag = await measure(legacy)
+    spooled_total, spooled_lag = await measure(spooled)
+    await spooler.stop()
+
+    print(f"{tickets} tickets")
+    print(f"{'':<22} {'total (ms)':>12} {'bloqueo máx. loop (ms)':>24}")
+    print(f"{'en el event loop':<22} {legacy_total * 1000:>12.1f} {legacy_lag * 1000:>24.1f}")
+    print(f"{'spooler':<22} {spooled_total * 1000:>12.1f} {spooled_lag * 1000:>24.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(run(int(sys.argv[1]) if len(sys.argv) > 1 else 20))
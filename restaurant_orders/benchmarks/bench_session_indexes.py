@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Benchmark: planes y tiempos de las consultas sobre `user_sessions` con un
+historial grande, antes y después de los índices de auth_schema.sql.
+
+Siembra una copia temporal de `user_sessions` (TEMP TABLE, no toca datos
+reales) con N filas: casi todas caducadas o cerradas, como queda la tabla
+sin limpieza, y unas pocas sesiones vigentes. Después mide:
+
+- chat_auth: sesión vigente de un chat (cada mensaje de Telegram);
+- janitor: un lote de sesiones caducadas a borrar.
+
+Necesita la base de datos de settings.DATABASE_URL.
+
+Uso: python benchmarks/bench_session_indexes.py [filas] [repeticiones]
+"""
+
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import text
+
+from app.database.connection import engine
+
+CHATS = 5000
+
+SEED = """
+    CREATE TEMP TABLE bench_user_sessions (LIKE user_sessions INCLUDING DEFAULTS) ON COMMIT DROP;
+    INSERT INTO bench_user_sessions (id, token, telegram_chat_id, user_id, is_active, created_at, expires_at)
+    SELECT g, md5(g::text), g % {chats}, g % 50 + 1,
+           -- una de cada 500 sigue activa; el resto se cerró o caducó
+           g % 500 = 0,
+           now() - (({rows} - g) || ' seconds')::interval - interval '1 hour',
+           now() - (({rows} - g) || ' seconds')::interval + CASE WHEN g % 500 = 0 THEN interval '1 day' ELSE interval '0' END
+    FROM generate_series(1, {rows}) AS g;
+    ALTER TABLE bench_user_sessions ADD PRIMARY KEY (id);
+    ANALYZE bench_user_sessions;
+"""
+
+INDEXES = """
+    CREATE INDEX ON bench_user_sessions(telegram_chat_id, expires_at DESC) WHERE is_active;
+    CREATE INDEX ON bench_user_sessions(expires_at);
+    ANALYZE bench_user_sessions;
+"""
+
+QUERIES = {
+    "chat_auth": """
+        SELECT user_id, expires_at FROM bench_user_sessions
+        WHERE telegram_chat_id = :chat_id AND is_active AND user_id IS NOT NULL AND expires_at > now()
+        ORDER BY expires_at DESC LIMIT 1
+    """,
+    "janitor": """
+        SELECT id FROM bench_user_sessions
+        WHERE expires_at < now() - interval '24 hours'
+        LIMIT 1000 FOR UPDATE SKIP LOCKED
+    """,
+}
+
+
+async def execute_script(conn, script: str):
+    for statement in filter(str.strip, script.split(";")):
+        await conn.execute(text(statement))
+
+
+async def plan(conn, sql: str, params: dict) -> dict:
+    result = await conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}"), params)
+    raw = result.scalar_one()
+    return (json.loads(raw) if isinstance(raw, str) else raw)[0]
+
+
+def describe(node: dict) -> str:
+    """Tipos de nodo del plan, del exterior al interior."""
+    kinds = []
+    while node:
+        name = node["Node Type"]
+        if "Index Name" in node:
+            name += f" ({node['Index Name']})"
+        kinds.append(name)
+        node = (node.get("Plans") or [None])[0]
+    return " > ".join(kinds)
+
+
+async def measure(conn, repetitions: int) -> dict:
+    results = {}
+    for name, sql in QUERIES.items():
+        params = {"chat_id": 500} if "chat_id" in sql else {}
+        explained = await plan(conn, sql, params)
+        latencies = []
+        for i in range(repetitions):
+            if "chat_id" in params:
+                # Chats múltiplos de 500: los que tienen sesiones vigentes
+                params["chat_id"] = i * 500 % CHATS
+            start = time.perf_counter()
+            await conn.execute(text(sql), params)
+            latencies.append((time.perf_counter() - start) * 1000)
+        results[name] = (
+            statistics.median(latencies),
+            # Las tablas temporales van por buffers locales, no compartidos
+            explained["Plan"].get("Local Hit Blocks", 0) + explained["Plan"].get("Local Read Blocks", 0),
+            describe(explained["Plan"]),
+        )
+    return results
+
+
+async def run(rows: int = 1_000_000, repetitions: int = 50):
+    try:
+        async with engine.connect() as conn:
+            transaction = await conn.begin()
+            start = time.perf_counter()
+            await execute_script(conn, SEED.format(rows=rows, chats=CHATS))
+            print(f"{rows} sesiones sembradas en {time.perf_counter() - start:.1f}s")
+
+            before = await measure(conn, repetitions)
+            await execute_script(conn, INDEXES)
+            after = await measure(conn, repetitions)
+            await transaction.rollback()
+    finally:
+        await engine.dispose()
+
+    print(f"{repetitions} repeticiones (mediana)")
+    print(f"{'':<10} {'antes (ms)':>11} {'bloques':>8} {'después (ms)':>13} {'bloques':>8}")
+    for name in QUERIES:
+        (before_ms, before_blocks, _), (after_ms, after_blocks, _) = before[name], after[name]
+        print(f"{name:<10} {before_ms:>11.3f} {before_blocks:>8} {after_ms:>13.3f} {after_blocks:>8}")
+    for name in QUERIES:
+        print(f"\n{name}\n  antes:   {before[name][2]}\n  después: {after[name][2]}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:3]
+    asyncio.run(run(*(int(arg) for arg in args)))
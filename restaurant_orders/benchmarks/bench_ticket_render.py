@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Benchmark: ticket construido con llamadas sueltas a `printer.text`/`printer.set`
+(una escritura USB por llamada, como el `print_ticket` original) frente a la
+plantilla ESC/POS precompilada que genera un único buffer y lo escribe de una vez.
+
+Usa la impresora `Dummy` de python-escpos y simula el coste fijo de cada
+transferencia USB. Uso: python benchmarks/bench_ticket_render.py [tickets]
+"""
+
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from escpos.printer import Dummy
+
+from app.services.ticket_template import LAYOUTS, TicketTemplate
+
+TRANSFER_SECONDS = 0.0005  # latencia fija de una transferencia bulk USB
+
+ORDER = {
+    "id": 1234,
+    "v_cliente_test": "Cliente de prueba",
+    "v_importe_total": 33.0,
+    "v_observaciones": "Una de las pizzas sin aceitunas",
+    "items": [
+        {"v_cantidad": 2, "v_producto_test": "Pizza Pepperoni Grande", "v_precio": 12.5},
+        {"v_cantidad": 1, "v_producto_test": "Ensalada César", "v_precio": 8.0},
+        {"v_cantidad": 3, "v_producto_test": "Limonada Frozen", "v_precio": 3.0},
+    ],
+}
+
+
+class UsbLikeDummy(Dummy):
+    """Dummy que cuenta las escrituras y paga una latencia por cada una."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.writes = 0
+
+    def _raw(self, msg):
+        self.writes += 1
+        time.sleep(TRANSFER_SECONDS)
+        super()._raw(msg)
+
+
+def legacy_ticket(printer, order_data):
+    """Formato del `print_ticket` original, llamada a llamada."""
+    printer.text("================================\n")
+    printer.set(align='center', bold=True, double_height=True)
+    printer.text("RESTAURANT NAME\n")
+    printer.set(align='left', bold=False, double_height=False)
+    printer.text("================================\n")
+    printer.text(f"Orden #: {order_data.get('id', 'N/A')}\n")
+    printer.text(f"Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M')}\n")
+    printer.text(f"Cliente: {order_data.get('v_cliente_test', 'N/A')}\n")
+    printer.text("--------------------------------\n")
+    printer.text("ITEMS:\n")
+    for item in order_data.get('items', []):
+        printer.text(f"{item.get('v_cantidad', 0)} x {item.get('v_producto_test', 'N/A')}\n")
+        printer.text(f"    ${item.get('v_precio', 0):.2f}\n")
+    printer.text("--------------------------------\n")
+    printer.set(align='right', bold=True)
+    printer.text(f"TOTAL: ${order_data.get('v_importe_total', 0):.2f}\n")
+    printer.set(align='left', bold=False)
+    if order_data.get('v_observaciones'):
+        printer.text("\nInstrucciones especiales:\n")
+        printer.text(f"{order_data['v_observaciones']}\n")
+    printer.text("================================\n")
+    printer.text("¡Gracias por su preferencia!\n")
+    printer.cut()
+
+
+def run(tickets: int = 200):
+    printer = UsbLikeDummy()
+    start = time.perf_counter()
+    for _ in range(tickets):
+        legacy_ticket(printer, ORDER)
+    legacy = (time.perf_counter() - start) / tickets
+    legacy_writes = printer.writes / tickets
+
+    print(f"{'método':<28} {'µs/ticket':>10} {'escrituras':>11} {'render µs':>10}")
+    print(f"{'text()/set() por línea':<28} {legacy * 1e6:>10.1f} {legacy_writes:>11.1f} {'-':>10}")
+
+    for name, layout in LAYOUTS.items():
+        template = TicketTemplate(layout)
+        printer = UsbLikeDummy()
+        render_time = 0.0
+        start = time.perf_counter()
+        for _ in range(tickets):
+            render_start = time.perf_counter()
+            ticket = template.render(ORDER)
+            render_time += time.perf_counter() - render_start
+            printer._raw(ticket)
+        total = (time.perf_counter() - start) / tickets
+        label = f"plantilla {name}"
+        print(f"{label:<28} {total * 1e6:>10.1f} {printer.writes / tickets:>11.1f} {render_time / tickets * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Benchmark: difusión de un pedido a 500 dashboards simulados.
+
+- secuencial: `send_json` socket a socket, como el `broadcast_order` original,
+  serializando el pedido para cada cliente;
+- colas: `DashboardManager` con el pedido serializado una vez, una cola y una
+  tarea de escritura por cliente y expulsión de los clientes que no leen.
+
+Un pequeño porcentaje de sockets simula tablets con mala Wi-Fi. Se mide cuánto
+tarda `broadcast_order` en volver y cuándo recibe el mensaje el último cliente sano.
+
+Uso: python benchmarks/bench_ws_fanout.py [clientes] [pedidos]
+"""
+
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.api.websocket.connection import DashboardManager
+
+FAST_SEND_SECONDS = 0.0002
+SLOW_SEND_SECONDS = 0.5
+SLOW_RATIO = 0.02
+
+ORDER = {
+    "id": 1234, "v_cliente_test": "Cliente", "v_destino": "Av. Larco 123", "v_importe_total": 33.0,
+    "status": "pending", "created_at": "2024-05-01T12:30:00",
+    "items": [{"v_producto_test": f"Producto {i}", "v_cantidad": 1, "v_precio": 10.0} for i in range(8)],
+}
+
+
+class FakeSocket:
+    def __init__(self, slow: bool):
+        self.delay = SLOW_SEND_SECONDS if slow else FAST_SEND_SECONDS
+        self.slow = slow
+        self.received = 0
+        self.last_received_at = 0.0
+        self.serializations = 0
+
+    async def send_json(self, data):
+        json.dumps(data)
+        self.serializations += 1
+        await self.send_text(None)
+
+    async def send_text(self, payload):
+        await asyncio.sleep(self.delay)
+        self.received += 1
+        self.last_received_at = time.perf_counter()
+
+    async def close(self, code=1000):
+        pass
+
+
+def make_sockets(clients: int):
+    random.seed(1)
+    return [FakeSocket(slow=random.random() < SLOW_RATIO) for _ in range(clients)]
+
+
+async def legacy_broadcast(sockets, order):
+    for socket in sockets:
+        await socket.send_json(order)
+
+
+async def run(clients: int = 500, orders: int = 5):
+    sockets = make_sockets(clients)
+    start = time.perf_counter()
+    for _ in range(orders):
+        await legacy_broadcast(sockets, ORDER)
+    legacy_call = (time.perf_counter() - start) / orders
+    legacy_last = max(s.last_received_at for s in sockets if not s.slow) - start
+
+    sockets = make_sockets(clients)
+    manager = DashboardManager(queue_size=2, send_timeout=1.0)
+    for socket in sockets:
+        manager.register(socket)
+    start = time.perf_counter()
+    call_time = 0.0
+    for _ in range(orders):
+        call_start = time.perf_counter()
+        await manager.broadcast_order(ORDER)
+        call_time += time.perf_counter() - call_start
+        await asyncio.sleep(0.01)
+    # Esperar a que los clientes sanos vacíen sus colas
+    healthy = [s for s in sockets if not s.slow]
+    while any(s.received < orders for s in healthy):
+        await asyncio.sleep(0.001)
+    queued_last = max(s.last_received_at for s in healthy) - start
+
+    print(f"{clients} clientes ({sum(s.slow for s in sockets)} lentos), {orders} pedidos")
+    print(f"{'':<12} {'broadcast (ms)':>15} {'último cliente sano (ms)':>26} {'serializaciones':>16}")
+    print(f"{'secuencial':<12} {legacy_call * 1000:>15.2f} {legacy_last * 1000:>26.1f} {clients * orders:>16}")
+    print(f"{'colas':<12} {call_time / orders * 1000:>15.2f} {queued_last * 1000:>26.1f} {orders:>16}")
+    print(f"stats: {manager.stats()}")
+
+    for websocket in list(manager.clients):
+        manager.disconnect(websocket)
+
+
+if __name__ == "__main__":
+    asyncio.run(run(*(int(arg) for arg in sys.argv[1:3])))
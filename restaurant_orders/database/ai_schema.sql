@@ -0,0 +1,15 @@
+-- Schema for AI response caching
+-- Run this script in your PostgreSQL database
+
+-- Cached LLM replies keyed by normalized message, model and prompt version
+CREATE TABLE IF NOT EXISTS llm_response_cache (
+    cache_key VARCHAR(64) PRIMARY KEY,
+    model VARCHAR(255) NOT NULL,
+    prompt_version VARCHAR(50) NOT NULL,
+    normalized_message TEXT NOT NULL,
+    response TEXT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_llm_response_cache_expires_at ON llm_response_cache(expires_at);
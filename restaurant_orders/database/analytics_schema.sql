@@ -0,0 +1,168 @@
+-- Schema for the sales rollups read by the analytics endpoint
+-- Run this script in your PostgreSQL database (after orders_schema.sql)
+
+-- Totals per hour; buckets are UTC hours (date_trunc('hour', ..., 'UTC'), PostgreSQL 12+),
+-- so any service timezone with whole-hour offsets can group them into its own days
+CREATE TABLE IF NOT EXISTS sales_hourly (
+    hour TIMESTAMP WITH TIME ZONE PRIMARY KEY,
+    orders INTEGER NOT NULL DEFAULT 0,
+    revenue NUMERIC(14, 2) NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS sales_product_hourly (
+    hour TIMESTAMP WITH TIME ZONE NOT NULL,
+    product VARCHAR NOT NULL,
+    quantity INTEGER NOT NULL DEFAULT 0,
+    revenue NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (hour, product)
+);
+
+CREATE TABLE IF NOT EXISTS sales_payment_hourly (
+    hour TIMESTAMP WITH TIME ZONE NOT NULL,
+    method VARCHAR NOT NULL,
+    payments INTEGER NOT NULL DEFAULT 0,
+    amount NUMERIC(14, 2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (hour, method)
+);
+
+-- Rollups are maintained by statement-level triggers with transition tables:
+-- insert_pedido_completo inserts all items of an order in one statement, so each
+-- order costs one upsert per rollup table, in the same transaction as the order.
+
+CREATE OR REPLACE FUNCTION rollup_orders_insert() RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO sales_hourly (hour, orders, revenue)
+    SELECT date_trunc('hour', created_at, 'UTC'), COUNT(*), COALESCE(SUM(importe_total), 0)
+    FROM new_orders
+    WHERE status IS DISTINCT FROM 'cancelled'
+    GROUP BY 1
+    ON CONFLICT (hour) DO UPDATE
+    SET orders = sales_hourly.orders + EXCLUDED.orders,
+        revenue = sales_hourly.revenue + EXCLUDED.revenue;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION rollup_order_items_insert() RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO sales_product_hourly (hour, product, quantity, revenue)
+    SELECT date_trunc('hour', o.created_at, 'UTC'), i.v_producto_test,
+           SUM(COALESCE(i.v_cantidad, 0)), SUM(COALESCE(i.v_cantidad, 0) * COALESCE(i.v_precio, 0))
+    FROM new_items i
+    JOIN orders o ON o.id = i.v_pedido_id
+    WHERE i.v_producto_test IS NOT NULL AND o.status IS DISTINCT FROM 'cancelled'
+    GROUP BY 1, 2
+    ON CONFLICT (hour, product) DO UPDATE
+    SET quantity = sales_product_hourly.quantity + EXCLUDED.quantity,
+        revenue = sales_product_hourly.revenue + EXCLUDED.revenue;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION rollup_payments_insert() RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO sales_payment_hourly (hour, method, payments, amount)
+    SELECT date_trunc('hour', o.created_at, 'UTC'), COALESCE(p.v_metodo, 'desconocido'), COUNT(*), COALESCE(SUM(p.v_importe), 0)
+    FROM new_payments p
+    JOIN orders o ON o.id = p.v_pedido_id
+    WHERE o.status IS DISTINCT FROM 'cancelled'
+    GROUP BY 1, 2
+    ON CONFLICT (hour, method) DO UPDATE
+    SET payments = sales_payment_hourly.payments + EXCLUDED.payments,
+        amount = sales_payment_hourly.amount + EXCLUDED.amount;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- A cancelled order leaves the rollups (and comes back if the cancellation is undone)
+CREATE OR REPLACE FUNCTION rollup_order_cancellation() RETURNS TRIGGER AS $$
+DECLARE
+    direction INTEGER;
+    bucket TIMESTAMP WITH TIME ZONE := date_trunc('hour', NEW.created_at, 'UTC');
+BEGIN
+    IF (OLD.status IS DISTINCT FROM 'cancelled') = (NEW.status IS DISTINCT FROM 'cancelled') THEN
+        RETURN NULL;
+    END IF;
+    direction := CASE WHEN NEW.status = 'cancelled' THEN -1 ELSE 1 END;
+
+    INSERT INTO sales_hourly (hour, orders, revenue)
+    VALUES (bucket, direction, direction * COALESCE(NEW.importe_total, 0))
+    ON CONFLICT (hour) DO UPDATE
+    SET orders = sales_hourly.orders + EXCLUDED.orders,
+        revenue = sales_hourly.revenue + EXCLUDED.revenue;
+
+    INSERT INTO sales_product_hourly (hour, product, quantity, revenue)
+    SELECT bucket, v_producto_test, direction * SUM(COALESCE(v_cantidad, 0)), direction * SUM(COALESCE(v_cantidad, 0) * COALESCE(v_precio, 0))
+    FROM order_items
+    WHERE v_pedido_id = NEW.id AND v_producto_test IS NOT NULL
+    GROUP BY v_producto_test
+    ON CONFLICT (hour, product) DO UPDATE
+    SET quantity = sales_product_hourly.quantity + EXCLUDED.quantity,
+        revenue = sales_product_hourly.revenue + EXCLUDED.revenue;
+
+    INSERT INTO sales_payment_hourly (hour, method, payments, amount)
+    SELECT bucket, COALESCE(v_metodo, 'desconocido'), direction * COUNT(*), direction * COALESCE(SUM(v_importe), 0)
+    FROM payments
+    WHERE v_pedido_id = NEW.id
+    GROUP BY 2
+    ON CONFLICT (hour, method) DO UPDATE
+    SET payments = sales_payment_hourly.payments + EXCLUDED.payments,
+        amount = sales_payment_hourly.amount + EXCLUDED.amount;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_rollup_orders_insert ON orders;
+CREATE TRIGGER trg_rollup_orders_insert
+    AFTER INSERT ON orders
+    REFERENCING NEW TABLE AS new_orders
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_orders_insert();
+
+DROP TRIGGER IF EXISTS trg_rollup_order_items_insert ON order_items;
+CREATE TRIGGER trg_rollup_order_items_insert
+    AFTER INSERT ON order_items
+    REFERENCING NEW TABLE AS new_items
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_order_items_insert();
+
+DROP TRIGGER IF EXISTS trg_rollup_payments_insert ON payments;
+CREATE TRIGGER trg_rollup_payments_insert
+    AFTER INSERT ON payments
+    REFERENCING NEW TABLE AS new_payments
+    FOR EACH STATEMENT EXECUTE FUNCTION rollup_payments_insert();
+
+DROP TRIGGER IF EXISTS trg_rollup_order_cancellation ON orders;
+CREATE TRIGGER trg_rollup_order_cancellation
+    AFTER UPDATE OF status ON orders
+    FOR EACH ROW EXECUTE FUNCTION rollup_order_cancellation();
+
+-- Recomputes every rollup from orders, order_items and payments (first install or repair):
+--   SELECT rebuild_sales_rollups();
+CREATE OR REPLACE FUNCTION rebuild_sales_rollups() RETURNS VOID AS $$
+BEGIN
+    LOCK TABLE sales_hourly, sales_product_hourly, sales_payment_hourly IN EXCLUSIVE MODE;
+    DELETE FROM sales_hourly;
+    DELETE FROM sales_product_hourly;
+    DELETE FROM sales_payment_hourly;
+
+    INSERT INTO sales_hourly (hour, orders, revenue)
+    SELECT date_trunc('hour', created_at, 'UTC'), COUNT(*), COALESCE(SUM(importe_total), 0)
+    FROM orders
+    WHERE status IS DISTINCT FROM 'cancelled' AND created_at IS NOT NULL
+    GROUP BY 1;
+
+    INSERT INTO sales_product_hourly (hour, product, quantity, revenue)
+    SELECT date_trunc('hour', o.created_at, 'UTC'), i.v_producto_test,
+           SUM(COALESCE(i.v_cantidad, 0)), SUM(COALESCE(i.v_cantidad, 0) * COALESCE(i.v_precio, 0))
+    FROM order_items i
+    JOIN orders o ON o.id = i.v_pedido_id
+    WHERE i.v_producto_test IS NOT NULL AND o.status IS DISTINCT FROM 'cancelled' AND o.created_at IS NOT NULL
+    GROUP BY 1, 2;
+
+    INSERT INTO sales_payment_hourly (hour, method, payments, amount)
+    SELECT date_trunc('hour', o.created_at, 'UTC'), COALESCE(p.v_metodo, 'desconocido'), COUNT(*), COALESCE(SUM(p.v_importe), 0)
+    FROM payments p
+    JOIN orders o ON o.id = p.v_pedido_id
+    WHERE o.status IS DISTINCT FROM 'cancelled' AND o.created_at IS NOT NULL
+    GROUP BY 1, 2;
+END;
+$$ LANGUAGE plpgsql;
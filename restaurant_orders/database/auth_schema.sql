@@ -39,4 +39,11 @@ CREATE TABLE IF NOT EXISTS user_sessions (
 CREATE INDEX IF NOT EXISTS idx_users_email ON users(email);
 CREATE INDEX IF NOT EXISTS idx_magic_links_email ON magic_links(email);
 CREATE INDEX IF NOT EXISTS idx_magic_links_token ON magic_links(token);
-CREATE INDEX IF NOT EXISTS idx_magic_links_expires_at ON magic_links(expires_at);
\ No newline at end of file
+CREATE INDEX IF NOT EXISTS idx_magic_links_expires_at ON magic_links(expires_at);
+
+-- Sesiones vigentes de un chat (cada mensaje de Telegram y /logout): parcial sobre
+-- is_active para que el índice no crezca con el historial de sesiones cerradas
+CREATE INDEX IF NOT EXISTS idx_user_sessions_chat_active
+    ON user_sessions(telegram_chat_id, expires_at DESC) WHERE is_active;
+-- Lotes de sesiones caducadas para el janitor
+CREATE INDEX IF NOT EXISTS ix_user_sessions_expires_at ON user_sessions(expires_at);
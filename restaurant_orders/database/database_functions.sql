@@ -45,3 +45,54 @@ BEGIN
     VALUES (v_pedido_id, v_metodo, v_importe, v_estado, v_fecha_hora);
 END;
 $$ LANGUAGE plpgsql;
+
+-- 4. Función para insertar un pedido completo (pedido, items y pago) en un solo viaje.
+-- Recibe un documento JSON con los argumentos de insert_pedido más:
+--   "items": lista de objetos con los argumentos de insert_detalle_pedido
+--   "pago":  objeto con los argumentos de insert_pago (o null)
+--   "v_entrega_at", "v_franja_entrega": hora de entrega interpretada e inicio de su franja (o null)
+CREATE OR REPLACE FUNCTION insert_pedido_completo(
+    v_pedido JSONB
+) RETURNS INTEGER AS $$
+DECLARE
+    new_pedido_id INTEGER;
+    v_pago JSONB := v_pedido->'pago';
+BEGIN
+    INSERT INTO orders (cliente_test, hora_entrega, entrega_at, franja_entrega, destino, importe_total, observaciones, status, created_at)
+    VALUES (
+        v_pedido->>'v_cliente_test',
+        v_pedido->>'v_hora_entrega',
+        (v_pedido->>'v_entrega_at')::TIMESTAMPTZ,
+        (v_pedido->>'v_franja_entrega')::TIMESTAMPTZ,
+        v_pedido->>'v_destino',
+        (v_pedido->>'v_importe_total')::NUMERIC,
+        v_pedido->>'v_observaciones',
+        'pending',
+        NOW()
+    )
+    RETURNING id INTO new_pedido_id;
+
+    -- Todos los items con un único INSERT ... SELECT, en el orden del pedido
+    INSERT INTO order_items (v_pedido_id, v_producto_test, v_cantidad, v_precio, v_notas)
+    SELECT new_pedido_id,
+           e.item->>'v_producto_test',
+           (e.item->>'v_cantidad')::NUMERIC::INTEGER,
+           (e.item->>'v_precio')::NUMERIC,
+           e.item->>'v_notas'
+    FROM jsonb_array_elements(COALESCE(v_pedido->'items', '[]'::JSONB)) WITH ORDINALITY AS e(item, ord)
+    ORDER BY e.ord;
+
+    IF jsonb_typeof(v_pago) = 'object' THEN
+        INSERT INTO payments (v_pedido_id, v_metodo, v_importe, v_estado, v_fecha_hora)
+        VALUES (
+            new_pedido_id,
+            v_pago->>'v_metodo',
+            (v_pago->>'v_importe')::NUMERIC,
+            v_pago->>'v_estado',
+            COALESCE((v_pago->>'v_fecha_hora')::TIMESTAMP, NOW())
+        );
+    END IF;
+
+    RETURN new_pedido_id;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,31 @@
+-- Schema for the menu / product catalog
+-- Run this script in your PostgreSQL database
+
+-- Products offered by the restaurant. To withdraw a product set is_active = FALSE
+-- instead of deleting it, so running processes pick up the change incrementally.
+CREATE TABLE IF NOT EXISTS products (
+    id SERIAL PRIMARY KEY,
+    name VARCHAR(255) UNIQUE NOT NULL,
+    category VARCHAR(100),
+    price NUMERIC(10, 2) NOT NULL,
+    aliases TEXT[] NOT NULL DEFAULT '{}',
+    is_active BOOLEAN NOT NULL DEFAULT TRUE,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Keep updated_at current for any UPDATE, including manual edits from psql
+CREATE OR REPLACE FUNCTION touch_products_updated_at() RETURNS TRIGGER AS $$
+BEGIN
+    NEW.updated_at = NOW();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_products_updated_at ON products;
+CREATE TRIGGER trg_products_updated_at
+    BEFORE UPDATE ON products
+    FOR EACH ROW EXECUTE FUNCTION touch_products_updated_at();
+
+-- Incremental refresh reads rows changed since the last seen updated_at
+CREATE INDEX IF NOT EXISTS idx_products_updated_at ON products(updated_at);
@@ -0,0 +1,70 @@
+-- Schema for orders, their items and payments
+-- Run this script in your PostgreSQL database
+
+CREATE TABLE IF NOT EXISTS orders (
+    id SERIAL PRIMARY KEY,
+    cliente_test VARCHAR,
+    hora_entrega VARCHAR,
+    destino VARCHAR,
+    importe_total DOUBLE PRECISION,
+    observaciones TEXT,
+    status VARCHAR DEFAULT 'pending',
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS order_items (
+    id SERIAL PRIMARY KEY,
+    v_pedido_id INTEGER REFERENCES orders(id),
+    v_producto_test VARCHAR,
+    v_cantidad INTEGER,
+    v_precio DOUBLE PRECISION,
+    v_notas TEXT
+);
+
+CREATE TABLE IF NOT EXISTS payments (
+    id SERIAL PRIMARY KEY,
+    v_pedido_id INTEGER REFERENCES orders(id),
+    v_metodo VARCHAR,
+    v_importe DOUBLE PRECISION,
+    v_estado VARCHAR,
+    v_fecha_hora TIMESTAMP
+);
+
+-- Delivery time parsed when the order is inserted and start of its slot; added
+-- with ALTER so that orders tables created before these columns get them too
+ALTER TABLE orders ADD COLUMN IF NOT EXISTS entrega_at TIMESTAMP WITH TIME ZONE;
+ALTER TABLE orders ADD COLUMN IF NOT EXISTS franja_entrega TIMESTAMP WITH TIME ZONE;
+
+-- Backfill of existing orders whose hora_entrega is a plain HH:MM. setup_db.py sets
+-- app.service_timezone and app.delivery_slot_minutes from SERVICE_TIMEZONE and
+-- DELIVERY_SLOT_MINUTES; run by hand, the defaults (America/Lima, 30) apply
+WITH params AS (
+    SELECT COALESCE(NULLIF(current_setting('app.service_timezone', true), ''), 'America/Lima') AS tz
+)
+UPDATE orders
+SET entrega_at = ((created_at AT TIME ZONE params.tz)::DATE + hora_entrega::TIME) AT TIME ZONE params.tz
+FROM params
+WHERE entrega_at IS NULL AND hora_entrega ~ '^([01]?[0-9]|2[0-3]):[0-5][0-9]$';
+
+-- Slot start in local time, as delivery_time.slot_start computes it
+WITH params AS (
+    SELECT COALESCE(NULLIF(current_setting('app.service_timezone', true), ''), 'America/Lima') AS tz,
+           COALESCE(NULLIF(current_setting('app.delivery_slot_minutes', true), ''), '30')::INTEGER AS slot_minutes
+)
+UPDATE orders
+SET franja_entrega = (
+    date_trunc('day', entrega_at AT TIME ZONE params.tz)
+    + floor(extract(epoch FROM (entrega_at AT TIME ZONE params.tz)::TIME) / 60 / params.slot_minutes)
+      * params.slot_minutes * INTERVAL '1 minute'
+) AT TIME ZONE params.tz
+FROM params
+WHERE franja_entrega IS NULL AND entrega_at IS NOT NULL;
+
+-- Keyset pagination on (created_at, id), unfiltered and with each listing filter
+CREATE INDEX IF NOT EXISTS idx_orders_created_at_id ON orders(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_orders_status_created_at_id ON orders(status, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_orders_delivery_slot_created_at_id ON orders(franja_entrega, created_at, id) INCLUDE (status);
+
+-- Items and payment of a page of orders are loaded with v_pedido_id IN (...)
+CREATE INDEX IF NOT EXISTS ix_order_items_v_pedido_id ON order_items(v_pedido_id);
+CREATE INDEX IF NOT EXISTS ix_payments_v_pedido_id ON payments(v_pedido_id);
@@ -0,0 +1,22 @@
+-- Schema for the transactional outbox of order side effects
+-- Run this script in your PostgreSQL database
+
+-- Events (ticket printing, dashboard broadcast) written in the same transaction
+-- as the order and delivered afterwards by the outbox dispatcher
+CREATE TABLE IF NOT EXISTS order_outbox (
+    id BIGSERIAL PRIMARY KEY,
+    event_type VARCHAR(50) NOT NULL,
+    payload JSONB NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    available_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    processed_at TIMESTAMP WITH TIME ZONE
+);
+
+-- Only pending events are polled
+CREATE INDEX IF NOT EXISTS idx_order_outbox_pending ON order_outbox(available_at) WHERE status = 'pending';
+CREATE INDEX IF NOT EXISTS idx_order_outbox_created_at ON order_outbox(created_at);
+-- Delivered events are purged by processed_at after OUTBOX_RETENTION_HOURS
+CREATE INDEX IF NOT EXISTS idx_order_outbox_done ON order_outbox(processed_at) WHERE status = 'done';
@@ -0,0 +1,10 @@
+-- Schema for Telegram webhook bookkeeping
+-- Run this script in your PostgreSQL database
+
+-- Update IDs already processed, used to ignore Telegram re-deliveries across restarts
+CREATE TABLE IF NOT EXISTS processed_updates (
+    update_id BIGINT PRIMARY KEY,
+    processed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_processed_updates_processed_at ON processed_updates(processed_at);
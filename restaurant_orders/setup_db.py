@@ -9,6 +9,18 @@ import asyncpg
 import bcrypt
 from app.config import settings
 
+# Schemas executed in order on every run (all statements are idempotent)
+SCHEMA_FILES = [
+    "database/auth_schema.sql",
+    "database/telegram_schema.sql",
+    "database/ai_schema.sql",
+    "database/menu_schema.sql",
+    "database/orders_schema.sql",
+    "database/analytics_schema.sql",
+    "database/outbox_schema.sql",
+    "database/database_functions.sql",
+]
+
 def hash_password(password: str) -> str:
     """Hash a password using bcrypt"""
     return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
@@ -25,12 +37,19 @@ async def setup_database():
             port=5432
         )
 
-        # Read and execute schema
-        with open("database/auth_schema.sql", "r") as f:
-            schema_sql = f.read()
+        # Settings read by the backfills in the schemas (orders_schema.sql)
+        await conn.execute(
+            "SELECT set_config('app.service_timezone', $1, false), set_config('app.delivery_slot_minutes', $2, false)",
+            settings.SERVICE_TIMEZONE, str(settings.DELIVERY_SLOT_MINUTES),
+        )
+
+        # Read and execute schemas
+        for schema_file in SCHEMA_FILES:
+            with open(schema_file, "r") as f:
+                schema_sql = f.read()
 
-        # Execute schema
-        await conn.execute(schema_sql)
+            # Execute schema
+            await conn.execute(schema_sql)
 
         # Add role column to existing users table if it doesn't exist
         try:
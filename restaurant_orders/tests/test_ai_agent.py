@@ -0,0 +1,130 @@
+import asyncio
+import functools
+import json
+import pytest
+# Añadir la raíz del proyecto al path para que Python encuentre los módulos de la app
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from types import SimpleNamespace
+
+import httpx
+
+from app.config import settings
+from app.services import ai_agent
+from app.services.ai_agent import AIOrderAgent
+from app.services.llm_cache import ResponseCache
+from app.services.llm_governor import LLMGovernor
+from app.services.order_intake import as_function_calls
+
+
+class FakeStreamingLLM:
+    def __init__(self, chunks, fail_after: int = None):
+        self.chunks = chunks
+        self.fail_after = fail_after
+
+    async def astream(self, messages):
+        for i, chunk in enumerate(self.chunks):
+            if i == self.fail_after:
+                raise RuntimeError("provider error")
+            yield SimpleNamespace(content=chunk)
+
+
+def make_agent(llm) -> AIOrderAgent:
+    # Sin __init__: no necesita MODEL_KEY ni cliente de OpenRouter
+    agent = AIOrderAgent.__new__(AIOrderAgent)
+    agent.llm = agent.llm_with_tools = llm
+    agent.model_name = "test-model"
+    agent.response_cache = ResponseCache(ttl_seconds=60)
+    agent.governor = LLMGovernor(timeout=1.0)
+    return agent
+
+
+async def collect(agent, message: str):
+    return [part async for part in agent.stream_response({"message": message})]
+
+
+def test_completed_stream_is_cached():
+    agent = make_agent(FakeStreamingLLM(["¡Hola", "! ¿Qué", " deseas?"]))
+
+    first = asyncio.run(collect(agent, "hola"))
+    agent.llm = FakeStreamingLLM(["otra respuesta"])
+    second = asyncio.run(collect(agent, "hola"))
+
+    assert "".join(first) == "¡Hola! ¿Qué deseas?"
+    assert second == ["¡Hola! ¿Qué deseas?"]
+    assert agent.response_cache.stores == 1
+
+
+def test_stream_failing_midway_is_not_cached():
+    agent = make_agent(FakeStreamingLLM(["¡Hola", "! ¿Qué", " deseas?"], fail_after=1))
+
+    parts = asyncio.run(collect(agent, "hola"))
+
+    assert parts == ["¡Hola"]
+    assert agent.response_cache.stores == 0
+    assert agent.governor.failures == 1
+
+
+def test_stream_failing_before_any_chunk_serves_fallback():
+    agent = make_agent(FakeStreamingLLM(["¡Hola"], fail_after=0))
+
+    assert asyncio.run(collect(agent, "hola")) == ["Entendido: hola"]
+    assert agent.response_cache.stores == 0
+
+
+def test_order_tools_are_bound_to_the_model(monkeypatch):
+    monkeypatch.setattr(settings, "MODEL_KEY", "test-key")
+    agent = AIOrderAgent()
+
+    tools = {spec["function"]["name"]: spec["function"]["parameters"]["properties"]
+             for spec in agent.llm_with_tools.kwargs["tools"]}
+    assert set(tools) == {"insert_pedido", "insert_detalle_pedido", "insert_pago"}
+    assert {"v_producto_test", "v_cantidad", "v_precio", "v_notas"} <= set(tools["insert_detalle_pedido"])
+
+
+def tool_call(call_id: str, name: str, args: dict) -> dict:
+    return {"id": call_id, "type": "function", "function": {"name": name, "arguments": json.dumps(args)}}
+
+
+# Respuesta de la API de chat completions con las llamadas a herramientas del pedido
+COMPLETION = {
+    "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": "test-model",
+    "choices": [{
+        "index": 0, "finish_reason": "tool_calls",
+        "message": {"role": "assistant", "content": None, "tool_calls": [
+            tool_call("call_1", "insert_pedido", {"v_destino": "Av. Larco 123", "v_hora_entrega": "a las 8"}),
+            tool_call("call_2", "insert_detalle_pedido", {"v_producto_test": "Pizza Pepperoni Grande", "v_cantidad": 2}),
+            tool_call("call_3", "insert_detalle_pedido", {"v_producto_test": "Limonada", "v_cantidad": 1}),
+            tool_call("call_4", "insert_pago", {"v_metodo": "yape"}),
+        ]},
+    }],
+    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+}
+
+
+def test_model_tool_calls_reach_the_order_processor(monkeypatch):
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(json.loads(request.content))
+        return httpx.Response(200, json=COMPLETION)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(settings, "MODEL_KEY", "test-key")
+    monkeypatch.setattr(ai_agent, "ChatOpenAI", functools.partial(ai_agent.ChatOpenAI, http_async_client=client))
+    agent = AIOrderAgent()
+    agent.governor = LLMGovernor(timeout=5.0)
+
+    tool_calls = asyncio.run(agent.process_message("2 pizzas pepperoni y una limonada a Av. Larco 123 a las 8"))
+    calls = as_function_calls(tool_calls)
+
+    assert [tool["function"]["name"] for tool in requests[0]["tools"]] == ["insert_pedido", "insert_detalle_pedido", "insert_pago"]
+    # Formato de OrderProcessor: {"function_call": {"name", "args"}}
+    assert calls == [
+        {"function_call": {"name": "insert_pedido", "args": {"v_destino": "Av. Larco 123", "v_hora_entrega": "a las 8"}}},
+        {"function_call": {"name": "insert_detalle_pedido", "args": {"v_producto_test": "Pizza Pepperoni Grande", "v_cantidad": 2}}},
+        {"function_call": {"name": "insert_detalle_pedido", "args": {"v_producto_test": "Limonada", "v_cantidad": 1}}},
+        {"function_call": {"name": "insert_pago", "args": {"v_metodo": "yape"}}},
+    ]
@@ -0,0 +1,135 @@
+import asyncio
+import pytest
+# Añadir la raíz del proyecto al path para que Python encuentre los módulos de la app
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from app.config import settings
+from app.database.unit_of_work import UnitOfWork
+from app.services import auth_cache as auth_cache_module
+from app.services.auth_cache import MISSING, AuthCache, ChatAuth
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(auth_cache_module, "time", SimpleNamespace(monotonic=clock))
+    return clock
+
+
+def session(hours: float = 1) -> ChatAuth:
+    return ChatAuth(user_id=1, role="admin", expires_at=datetime.now(timezone.utc) + timedelta(hours=hours))
+
+
+def test_authenticated_chat_is_cached_for_the_positive_ttl(clock):
+    cache = AuthCache(ttl_seconds=15, negative_ttl_seconds=5)
+    auth = session()
+    cache.set(42, auth)
+
+    clock.now += 14
+    assert cache.get(42) is auth
+    clock.now += 2
+    assert cache.get(42) is MISSING
+    assert cache.hits == 1 and cache.misses == 1
+
+
+def test_unauthenticated_chat_uses_the_shorter_negative_ttl(clock):
+    cache = AuthCache(ttl_seconds=15, negative_ttl_seconds=5)
+    cache.set(42, None)
+
+    clock.now += 4
+    assert cache.get(42) is None
+    clock.now += 2
+    assert cache.get(42) is MISSING
+
+
+def test_entry_never_outlives_the_session(clock):
+    cache = AuthCache(ttl_seconds=15)
+    cache.set(42, session(hours=-1))
+
+    assert cache.get(42) is MISSING
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_chat_is_evicted(clock):
+    cache = AuthCache(capacity=2)
+    cache.set(1, None)
+    cache.set(2, None)
+    cache.get(1)
+    cache.set(3, None)
+
+    assert cache.get(2) is MISSING
+    assert cache.get(1) is None and cache.get(3) is None
+
+
+class FakeSession:
+    def __init__(self):
+        self.statements = []
+        self.commits = 0
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        pass
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def webhook(monkeypatch):
+    monkeypatch.setattr(settings, "MODEL_KEY", "test-key")
+    from app.api.routes import webhook
+    return webhook
+
+
+def test_logout_invalidates_the_cached_chat(webhook, monkeypatch):
+    cache = AuthCache()
+    monkeypatch.setattr(webhook, "auth_cache", cache)
+    cache.set(42, session())
+    uow = UnitOfWork(session_factory=FakeSession)
+
+    assert asyncio.run(webhook.logout_user(uow, 42))
+
+    assert uow.session.commits == 1
+    assert cache.get(42) is MISSING
+
+
+def test_login_invalidates_the_cached_chat(monkeypatch):
+    from app.api.routes import auth
+
+    cache = AuthCache()
+    monkeypatch.setattr(auth, "auth_cache", cache)
+    cache.set(42, None)
+
+    async def find_login_session(uow, token, username):
+        return (7, 42, 1, "hash", True)
+
+    async def link_login_session(uow, session_id, user_id):
+        pass
+
+    monkeypatch.setattr(auth, "find_login_session", find_login_session)
+    monkeypatch.setattr(auth, "link_login_session", link_login_session)
+    monkeypatch.setattr(auth, "verify_password", lambda password, hashed: True)
+
+    response = asyncio.run(auth.handle_login_form(username="ana", password="secreto", token="t",
+                                                  uow=UnitOfWork(session_factory=FakeSession)))
+
+    assert response.status_code == 200
+    assert cache.get(42) is MISSING
@@ -0,0 +1,186 @@
+import asyncio
+import json
+import pytest
+# Añadir la raíz del proyecto al path para que Python encuentre los módulos de la app
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import asyncpg
+
+from app.services.dashboard_broker import RELOAD_EVENT, PostgresBroker, listen_dsn, pack_events
+
+
+def status(order_id: int, note: str = "") -> dict:
+    return {"type": "order_status", "order_id": order_id, "status": "ready", "note": note}
+
+
+def test_events_are_packed_in_order_under_the_notify_limit():
+    events = [status(order_id, "x" * 40) for order_id in range(20)]
+
+    payloads = pack_events(events, limit=300)
+
+    assert len(payloads) > 1
+    assert all(len(payload.encode("utf-8")) <= 300 for payload in payloads)
+    unpacked = [event for payload in payloads for event in json.loads(payload)]
+    assert unpacked == events
+
+
+def test_event_too_large_for_a_notify_becomes_a_reload():
+    payloads = pack_events([status(1), status(2, "ñ" * 200), status(3)], limit=300)
+
+    assert [event for payload in payloads for event in json.loads(payload)] == [status(1), RELOAD_EVENT, status(3)]
+
+
+def test_listen_dsn_drops_the_sqlalchemy_driver():
+    assert listen_dsn("postgresql+asyncpg://u:p@db:5432/orders") == "postgresql://u:p@db:5432/orders"
+
+
+class FakeConnection:
+    def __init__(self, engine):
+        self.engine = engine
+
+    async def execute(self, statement, params):
+        if self.engine.fail:
+            raise ConnectionError("database is down")
+        self.engine.executed.append(params)
+
+
+class FakeEngine:
+    """Engine que anota los parámetros de cada NOTIFY enviado."""
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.executed = []
+
+    def begin(self):
+        engine = self
+
+        class Begin:
+            async def __aenter__(self):
+                return FakeConnection(engine)
+
+            async def __aexit__(self, *exc):
+                pass
+        return Begin()
+
+
+def make_broker(engine=None, delivered=None, reloads=None) -> PostgresBroker:
+    async def on_reload():
+        reloads.append(None)
+
+    return PostgresBroker(engine or FakeEngine(), "postgresql://db/orders", "dashboard",
+                          deliver=(delivered if delivered is not None else []).append,
+                          on_reload=on_reload, batch_window=0.01, reconnect_delay=0, keepalive=1.0)
+
+
+def test_events_published_in_the_same_window_share_one_notify():
+    engine = FakeEngine()
+    broker = make_broker(engine)
+
+    async def scenario():
+        await asyncio.gather(*(broker.publish(status(order_id)) for order_id in range(3)))
+
+    asyncio.run(scenario())
+    assert len(engine.executed) == 1
+    [payload] = engine.executed[0]["payloads"]
+    assert [event["order_id"] for event in json.loads(payload)] == [0, 1, 2]
+    assert broker.stats()["published"] == 3 and broker.stats()["notifies"] == 1
+
+
+def test_failed_notify_fails_every_publisher_in_the_batch():
+    broker = make_broker(FakeEngine(fail=True))
+
+    async def scenario():
+        return await asyncio.gather(broker.publish(status(1)), broker.publish(status(2)), return_exceptions=True)
+
+    assert [type(result) for result in asyncio.run(scenario())] == [ConnectionError, ConnectionError]
+    assert broker.published == 0
+
+
+def test_relay_delivers_bursts_in_one_batch_without_timestamps():
+    delivered = []
+    broker = make_broker(delivered=delivered, reloads=[])
+
+    async def scenario():
+        for order_id in (1, 2):
+            broker._on_notification(None, 0, "dashboard", json.dumps([{**status(order_id), "ts": 1.0}]))
+        broker._on_notification(None, 0, "dashboard", "not json")
+        relay = asyncio.create_task(broker._relay_loop())
+        await asyncio.sleep(0.01)
+        relay.cancel()
+
+    asyncio.run(scenario())
+    assert delivered == [[status(1), status(2)]]
+    assert broker.relay_batches == 1 and broker.received == 2
+
+
+def test_reload_in_a_batch_replaces_delivery():
+    delivered, reloads = [], []
+    broker = make_broker(delivered=delivered, reloads=reloads)
+
+    asyncio.run(broker._relay_batch([json.dumps([status(1)]), json.dumps([RELOAD_EVENT])]))
+
+    assert delivered == [] and len(reloads) == 1
+
+
+class FakeListenConnection:
+    def __init__(self):
+        self.listeners = {}
+        self.on_terminate = None
+        self.closed = False
+
+    def add_termination_listener(self, callback):
+        self.on_terminate = callback
+
+    async def add_listener(self, channel, callback):
+        self.listeners[channel] = callback
+
+    async def execute(self, query):
+        pass
+
+    def is_closed(self):
+        return self.closed
+
+    async def close(self, timeout=None):
+        self.closed = True
+
+
+def test_listener_reconnects_and_reloads_after_a_failure(monkeypatch):
+    reloads = []
+    broker = make_broker(reloads=reloads)
+    connections = []
+
+    async def connect(dsn):
+        # El primer intento falla: el servidor aún no acepta conexiones
+        if not connections:
+            connections.append(None)
+            raise OSError("connection refused")
+        connections.append(FakeListenConnection())
+        return connections[-1]
+
+    monkeypatch.setattr(asyncpg, "connect", connect)
+
+    async def wait_for(condition):
+        for _ in range(100):
+            if condition():
+                return
+            await asyncio.sleep(0.001)
+        pytest.fail("condition not reached")
+
+    async def scenario():
+        await broker.start()
+        await wait_for(lambda: broker.connected and reloads)
+        first = connections[-1]
+        assert "dashboard" in first.listeners
+
+        # Se cae la conexión LISTEN: se cierra, se reconecta y se recarga el estado
+        first.on_terminate(first)
+        await wait_for(lambda: len(connections) == 3 and broker.connected and len(reloads) == 2)
+        await broker.stop()
+        return first
+
+    first = asyncio.run(scenario())
+    assert first.closed
+    assert broker.reconnects == 1 and broker.reloads == 2
+    assert not broker.connected
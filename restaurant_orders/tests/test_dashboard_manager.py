@@ -0,0 +1,41 @@
+import asyncio
+# Añadir la raíz del proyecto al path para que Python encuentre los módulos de la app
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.api.websocket.connection import DashboardManager
+
+
+class FakeWebSocket:
+    def __init__(self, fail_sends: bool = False):
+        self.fail_sends = fail_sends
+        self.sent = []
+        self.close_code = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, payload: str):
+        if self.fail_sends:
+            raise RuntimeError("connection reset")
+        self.sent.append(payload)
+
+    async def close(self, code: int = 1000):
+        self.close_code = code
+
+
+def test_failed_send_closes_the_socket():
+    async def scenario():
+        manager = DashboardManager(queue_size=10, send_timeout=1.0)
+        healthy, broken = FakeWebSocket(), FakeWebSocket(fail_sends=True)
+        await manager.connect(healthy)
+        await manager.connect(broken)
+        manager.publish('{"type": "ping"}')
+        await asyncio.sleep(0.01)
+        return manager, healthy, broken
+
+    manager, healthy, broken = asyncio.run(scenario())
+    assert manager.active_connections == [healthy]
+    assert healthy.sent == ['{"type": "ping"}']
+    assert broken.close_code == 1013
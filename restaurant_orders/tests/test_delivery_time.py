@@ -0,0 +1,84 @@
+import pytest
+# Añadir la raíz del proyecto al path para que Python encuentre los módulos de la app
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from datetime import datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+from app.services.menu_index import MenuIndex, MenuItem
+from app.services.order_parser import OrderParser
+from app.services.delivery_time import parse_delivery_time, schedule_delivery, service_day_bounds
+
+LIMA = ZoneInfo("America/Lima")
+NOW = datetime(2024, 5, 1, 11, 5, tzinfo=LIMA)
+
+
+@pytest.mark.parametrize("text, delivery, slot", [
+    ("12:30", time(12, 30), time(12, 30)),
+    ("12:45 pm", time(12, 45), time(12, 30)),
+    ("a las 2", time(14, 0), time(14, 0)),
+    ("2 y media", time(14, 30), time(14, 30)),
+    ("8 de la noche", time(20, 0), time(20, 0)),
+    ("mediodía", time(12, 0), time(12, 0)),
+    ("lo antes posible", time(11, 5), time(11, 0)),
+])
+def test_delivery_time_is_normalized_to_timestamp_and_slot(text, delivery, slot):
+    delivery_at, delivery_slot = schedule_delivery(text, LIMA, 30, now=NOW)
+
+    assert delivery_at == datetime.combine(NOW.date(), delivery, tzinfo=LIMA)
+    assert delivery_slot == datetime.combine(NOW.date(), slot, tzinfo=LIMA)
+
+
+@pytest.mark.parametrize("text, days, delivery", [
+    ("8 de la mañana", 1, time(8, 0)),
+    ("mañana a las 10", 1, time(10, 0)),
+    ("mañana por la mañana a las 9", 1, time(9, 0)),
+    ("a las 9 ya sabes", 0, time(21, 0)),
+    ("12 de la noche", 1, time(0, 0)),
+    ("medianoche", 1, time(0, 0)),
+    ("1 de la madrugada", 1, time(1, 0)),
+    ("9am", 1, time(9, 0)),
+    ("11 y 45", 0, time(11, 45)),
+    ("2 y cuarto", 0, time(14, 15)),
+    ("11 y 45 de la noche", 0, time(23, 45)),
+])
+def test_spanish_times_at_ten_in_the_morning(text, days, delivery):
+    now = datetime(2024, 5, 1, 10, 0, tzinfo=LIMA)
+    expected = datetime.combine(now.date() + timedelta(days=days), delivery, tzinfo=LIMA)
+    assert parse_delivery_time(text, now) == expected
+
+
+@pytest.mark.parametrize("text", ["ya", "¡Ya!", "ahora mismo", "lo antes posible por favor"])
+def test_asap_phrases_mean_now(text):
+    assert parse_delivery_time(text, NOW) == NOW
+
+
+def test_unrecognized_delivery_time_has_no_slot():
+    assert schedule_delivery("cuando pueda", LIMA, 30, now=NOW) == (None, None)
+    assert schedule_delivery(None, LIMA, 30, now=NOW) == (None, None)
+
+
+def test_service_day_is_bounded_in_restaurant_timezone():
+    start, end = service_day_bounds(NOW.date(), LIMA)
+    assert start.isoformat() == "2024-05-01T00:00:00-05:00"
+    assert (end - start).days == 1
+
+
+@pytest.mark.parametrize("message, days, delivery, slot", [
+    ("1 limonada, delivery a Av. Larco 123 para las 10 de la noche", 0, time(22, 0), time(22, 0)),
+    ("1 limonada, delivery a Av. Larco 123 a las 12 y 30", 0, time(12, 30), time(12, 30)),
+    ("1 limonada, delivery a Av. Larco 123 a las 8", 0, time(20, 0), time(20, 0)),
+    ("1 limonada, delivery a Av. Larco 123 a las 7:45 pm", 0, time(19, 45), time(19, 30)),
+    ("1 limonada, delivery a Av. Larco 123 mañana por la mañana a las 9", 1, time(9, 0), time(9, 0)),
+    ("1 limonada, delivery a Av. Larco 123 mañana a mediodía", 1, time(12, 0), time(12, 0)),
+])
+def test_parsed_delivery_phrase_is_scheduled_into_its_slot(message, days, delivery, slot):
+    order = OrderParser(MenuIndex([MenuItem("Limonada", 3.0, "bebidas")])).parse(message)
+    day = NOW.date() + timedelta(days=days)
+
+    assert order.destination == "Av. Larco 123"
+    assert schedule_delivery(order.delivery_time, LIMA, 30, now=NOW) == (
+        datetime.combine(day, delivery, tzinfo=LIMA),
+        datetime.combine(day, slot, tzinfo=LIMA),
+    )
@@ -0,0 +1,191 @@
+import asyncio
+import json
+import pytest
+# Añadir la raíz del proyecto al path para que Python encuentre los módulos de la app
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import datetime, timedelta, timezone
+
+from app.config import settings
+from app.database.hot_queries import STATEMENTS, HotQueries
+from app.database.instrumentation import QueryTimer
+from app.database.unit_of_work import UnitOfWork
+from app.services.auth_cache import AuthCache
+from app.services.outbox import ORDER_EVENTS
+
+EXPIRES_AT = datetime.now(timezone.utc) + timedelta(hours=1)
+
+
+class FakePrepared:
+    def __init__(self, driver, sql: str):
+        self.driver = driver
+        self.sql = sql
+
+    async def _call(self, *args):
+        self.driver.calls.append((self.sql, args))
+        return self.driver.results.get(self.sql)
+
+    fetchrow = fetchval = fetch = _call
+
+
+class FakeDriver:
+    """Conexión de asyncpg: prepara statements y devuelve el resultado configurado para cada SQL."""
+
+    def __init__(self, results):
+        self.results = results
+        self.prepared = []
+        self.calls = []
+
+    async def prepare(self, sql: str, name: str):
+        self.prepared.append(name)
+        return FakePrepared(self, sql)
+
+
+class FakeAdapted:
+    """Adaptador asyncpg de SQLAlchemy: la transacción se abre de forma perezosa."""
+
+    def __init__(self):
+        self._transaction = None
+
+    async def _start_transaction(self):
+        self._transaction = "BEGIN"
+
+
+class FakeRaw:
+    def __init__(self, driver):
+        self.info = {}
+        self.driver_connection = driver
+        self.dbapi_connection = FakeAdapted()
+
+
+class FakeConnection:
+    def __init__(self, raw):
+        self.raw = raw
+
+    async def get_raw_connection(self):
+        return self.raw
+
+
+class FakeSession:
+    """Sesión con una sola conexión; `connection()` devuelve siempre la misma, como una AsyncSession."""
+
+    def __init__(self, results=None, rows=None):
+        self.raw = FakeRaw(FakeDriver(results or {}))
+        self.rows = rows or []
+        self.connections = 0
+        self.executed = []
+        self.added = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    async def connection(self):
+        self.connections += 1
+        return FakeConnection(self.raw)
+
+    async def execute(self, statement, params=None):
+        self.executed.append((statement, params))
+        rows = self.rows
+        return type("Result", (), {"first": lambda self: rows[0] if rows else None,
+                                   "scalar_one_or_none": lambda self: rows[0][0] if rows else None})()
+
+    def add_all(self, objects):
+        self.added.extend(objects)
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def webhook(monkeypatch):
+    monkeypatch.setattr(settings, "MODEL_KEY", "test-key")
+    from app.api.routes import webhook
+    monkeypatch.setattr(webhook, "auth_cache", AuthCache())
+    return webhook
+
+
+def test_chat_auth_runs_on_the_unit_of_work_connection(webhook, monkeypatch):
+    session = FakeSession(results={STATEMENTS["chat_auth"]: (5, "admin", EXPIRES_AT)})
+    timer = QueryTimer(slow_ms=0)
+    hot = HotQueries(timer)
+    monkeypatch.setattr(webhook, "hot_queries", hot)
+
+    async def scenario():
+        uow = UnitOfWork(session_factory=lambda: session)
+        first = await webhook.get_chat_auth(uow, 42)
+        # Otro chat en la misma unidad de trabajo: misma conexión y mismo statement preparado
+        await webhook.get_chat_auth(uow, 43)
+        return first
+
+    chat_auth = asyncio.run(scenario())
+    assert (chat_auth.user_id, chat_auth.role, chat_auth.expires_at) == (5, "admin", EXPIRES_AT)
+    assert session.raw.driver_connection.calls == [(STATEMENTS["chat_auth"], (42,)), (STATEMENTS["chat_auth"], (43,))]
+    assert len(session.raw.driver_connection.prepared) == 1
+    assert hot.stats() == {"prepares": 1, "executions": 2}
+    # Una lectura no abre transacción
+    assert session.raw.dbapi_connection._transaction is None
+    assert timer.queries == 2
+
+
+def test_chat_auth_without_session_is_cached_as_unauthenticated(webhook, monkeypatch):
+    monkeypatch.setattr(webhook, "hot_queries", HotQueries())
+    uow = UnitOfWork(session_factory=FakeSession)
+
+    assert asyncio.run(webhook.get_chat_auth(uow, 42)) is None
+    assert webhook.auth_cache.get(42) is None
+
+
+def test_chat_auth_falls_back_to_sqlalchemy(webhook, monkeypatch):
+    monkeypatch.setattr(webhook, "hot_queries", None)
+    session = FakeSession(rows=[(5, "cocina", EXPIRES_AT)])
+    uow = UnitOfWork(session_factory=lambda: session)
+
+    chat_auth = asyncio.run(webhook.get_chat_auth(uow, 42))
+
+    assert (chat_auth.user_id, chat_auth.role) == (5, "cocina")
+    assert len(session.executed) == 1 and session.connections == 0
+
+
+def test_insert_order_joins_the_session_transaction():
+    session = FakeSession(results={STATEMENTS["insert_order"]: 17})
+    hot = HotQueries()
+
+    order_id = asyncio.run(hot.insert_order(session, '{"items": []}', outbox_events=ORDER_EVENTS,
+                                            outbox_payload=lambda order_id: json.dumps({"id": order_id})))
+
+    assert order_id == 17
+    assert session.raw.driver_connection.calls == [
+        (STATEMENTS["insert_order"], ('{"items": []}',)),
+        (STATEMENTS["insert_outbox"], (list(ORDER_EVENTS), '{"id": 17}')),
+    ]
+    # La transacción queda abierta: la confirma quien llama, junto con el resto de la unidad de trabajo
+    assert session.raw.dbapi_connection._transaction == "BEGIN"
+    assert session.commits == 0
+
+
+def test_insert_order_without_id_skips_the_outbox():
+    session = FakeSession(results={STATEMENTS["insert_order"]: None})
+
+    assert asyncio.run(HotQueries().insert_order(session, "{}", outbox_events=ORDER_EVENTS,
+                                                 outbox_payload=lambda order_id: "{}")) is None
+    assert [sql for sql, _ in session.raw.driver_connection.calls] == [STATEMENTS["insert_order"]]
+
+
+def test_statements_are_prepared_again_on_a_replaced_connection():
+    session = FakeSession(results={STATEMENTS["chat_auth"]: None})
+    hot = HotQueries()
+
+    asyncio.run(hot.chat_auth(session, 1))
+    # El pool reemplazó la conexión asyncpg (p. ej. tras invalidarse) conservando su `info`
+    session.raw.driver_connection = FakeDriver({})
+    asyncio.run(hot.chat_auth(session, 1))
+
+    assert hot.prepares == 2
+    assert session.raw.driver_connection.prepared[0].startswith("hq_chat_auth_")
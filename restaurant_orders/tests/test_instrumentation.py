@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import pytest
+# Añadir la raíz del proyecto al path para que Python encuentre los módulos de la app
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import time
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.util import greenlet_spawn
+
+from app.database.connection import statement_timeout_args
+from app.database.instrumentation import InstrumentedPool, QueryTimer, WaitHistogram, pool_stats
+
+
+def test_histogram_buckets_are_cumulative_by_upper_limit():
+    histogram = WaitHistogram(buckets_ms=(1, 10))
+    for seconds in (0.0005, 0.001, 0.005, 0.5):
+        histogram.observe(seconds)
+
+    snapshot = histogram.snapshot()
+    assert snapshot["buckets"] == {"le_1ms": 2, "le_10ms": 1, "inf": 1}
+    assert snapshot["count"] == 4
+    assert snapshot["max_ms"] == 500.0
+    assert snapshot["avg_ms"] == pytest.approx(126.625)
+    assert WaitHistogram().snapshot()["avg_ms"] == 0.0
+
+
+def test_query_timer_aggregates_statements_and_logs_slow_ones(caplog):
+    engine = create_engine("sqlite://")
+    timer = QueryTimer(slow_ms=0.000001, max_statements=2)
+    timer.attach(engine)
+
+    with caplog.at_level(logging.WARNING), engine.connect() as conn:
+        for _ in range(3):
+            conn.execute(text("SELECT 1"))
+        conn.execute(text("SELECT 2"))
+        conn.execute(text("SELECT   3"))
+        with pytest.raises(Exception):
+            conn.execute(text("SELECT * FROM missing_table"))
+
+    stats = timer.stats()
+    by_statement = {row["statement"]: row["count"] for row in stats["top_by_total_time"]}
+    # Al superar max_statements las sentencias nuevas se agrupan en "(other)"
+    assert by_statement == {"SELECT 1": 3, "SELECT 2": 1, "(other)": 1}
+    assert stats["queries"] == 5
+    assert stats["slow_queries"] == 5
+    assert "Slow query" in caplog.text
+
+
+def test_query_timer_measures_statements_sent_outside_sqlalchemy():
+    timer = QueryTimer(slow_ms=10)
+
+    with timer.measure("SELECT insert_pedido_completo($1::jsonb)"):
+        time.sleep(0.02)
+    with pytest.raises(ValueError):
+        with timer.measure("SELECT 1"):
+            raise ValueError("failed statement")
+
+    assert timer.queries == 1 and timer.slow_queries == 1
+    assert timer.stats()["recent_slow"][0]["statement"] == "SELECT insert_pedido_completo($1::jsonb)"
+
+
+class FakeDBAPIConnection:
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def slow_connect():
+    time.sleep(0.05)
+    return FakeDBAPIConnection()
+
+
+def test_pool_reports_wait_and_connect_time_separately():
+    pool = InstrumentedPool(slow_connect, pool_size=1, max_overflow=0, timeout=0.05)
+
+    def checkouts():
+        first = pool.connect()
+        with pytest.raises(PoolTimeoutError):
+            pool.connect()
+        first.close()
+        pool.connect().close()
+
+    asyncio.run(greenlet_spawn(checkouts))
+
+    stats = pool_stats(pool)
+    assert stats["timeouts"] == 1
+    # Una sola conexión abierta; su apertura no cuenta como espera
+    assert stats["connect_time"]["count"] == 1 and stats["connect_time"]["max_ms"] >= 50
+    assert stats["checkout_wait"]["count"] == 3
+    assert stats["checkout_wait"]["buckets"]["le_1ms"] == 2
+
+
+def test_statement_timeout_is_passed_per_driver():
+    assert statement_timeout_args("postgresql+asyncpg://db", 15000) == {"server_settings": {"statement_timeout": "15000"}}
+    assert statement_timeout_args("postgresql+psycopg://db", 15000) == {"options": "-c statement_timeout=15000"}
+    assert statement_timeout_args("postgresql+asyncpg://db", 0) == {}
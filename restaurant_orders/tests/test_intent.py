@@ -0,0 +1,38 @@
+import pytest
+# Añadir la raíz del proyecto al path para que Python encuentre los módulos de la app
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.intent import Intent, classify_intent, normalize_text
+
+
+@pytest.mark.parametrize("message, expected", [
+    ("Quiero INICIAR SESIÓN", Intent.LOGIN),
+    ("quiero iniciar sesion", Intent.LOGIN),
+    ("dame el link por favor", Intent.LOGIN),
+    ("¿Estoy logueado?", Intent.STATUS),
+    ("mi estado", Intent.STATUS),
+    ("estoy login?", Intent.STATUS),
+    ("Cerrar sesión", Intent.LOGOUT),
+    ("quiero salir", Intent.LOGOUT),
+    ("2 pizzas pepperoni grandes", None),
+    ("", None),
+])
+def test_classify_intent(message, expected):
+    assert classify_intent(message) is expected
+
+
+def test_leftmost_keyword_wins():
+    """La primera palabra clave del mensaje decide la intención."""
+    assert classify_intent("necesito entrar, no sé si estoy logueado") is Intent.LOGIN
+    assert classify_intent("mi estado antes de iniciar sesión") is Intent.STATUS
+
+
+def test_normalize_text_strips_accents_and_case():
+    assert normalize_text("SESIÓN Ñandú") == "sesion nandu"
+    assert normalize_text("hola") == "hola"
+
+
+def test_combining_accents_are_normalized():
+    assert classify_intent("cerrar sesio\u0301n") is Intent.LOGOUT
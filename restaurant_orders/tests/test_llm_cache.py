@@ -0,0 +1,150 @@
+import asyncio
+import pytest
+# Añadir la raíz del proyecto al path para que Python encuentre los módulos de la app
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import postgresql
+
+from app.database.unit_of_work import unit_of_work
+from app.services import llm_cache
+from app.services.llm_cache import ResponseCache, normalize_message
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(llm_cache, "time", SimpleNamespace(monotonic=clock))
+    return clock
+
+
+class FakeSession:
+    def __init__(self, stored=None, fail: bool = False):
+        self.stored = stored
+        self.fail = fail
+        self.statements = []
+        self.commits = 0
+
+    async def execute(self, statement):
+        if self.fail:
+            raise ConnectionError("database is down")
+        self.statements.append(statement)
+        return SimpleNamespace(scalar=lambda: self.stored)
+
+    async def commit(self):
+        self.commits += 1
+
+    async def close(self):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+
+def test_messages_that_differ_only_in_case_accents_and_punctuation_share_a_key():
+    cache = ResponseCache()
+
+    assert normalize_message("¡Hola!!  ¿Qué   tal?") == "hola que tal"
+    key = cache.key_for("¡Hola!!", "model", "1")
+    assert key == cache.key_for("hola", "model", "1")
+    assert key != cache.key_for("hola", "other-model", "1")
+    assert key != cache.key_for("hola", "model", "2")
+
+
+def test_long_empty_or_disabled_messages_are_not_cached():
+    assert ResponseCache(max_message_length=10).key_for("quiero dos pizzas grandes", "model", "1") is None
+    assert ResponseCache().key_for("¡¡!!", "model", "1") is None
+    assert ResponseCache(enabled=False).key_for("hola", "model", "1") is None
+
+
+def test_entries_expire_after_the_ttl(clock):
+    cache = ResponseCache(ttl_seconds=60)
+
+    async def scenario():
+        await cache.set("k", "hola", "¡Hola!", "model", "1")
+        clock.now += 59
+        first = await cache.get("k")
+        clock.now += 2
+        return first, await cache.get("k")
+
+    assert asyncio.run(scenario()) == ("¡Hola!", None)
+    assert cache.memory_hits == 1 and cache.misses == 1
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = ResponseCache(max_entries=2)
+
+    async def scenario():
+        await cache.set("a", "a", "A", "model", "1")
+        await cache.set("b", "b", "B", "model", "1")
+        await cache.get("a")
+        await cache.set("c", "c", "C", "model", "1")
+        return [await cache.get(key) for key in ("a", "b", "c")]
+
+    assert asyncio.run(scenario()) == ["A", None, "C"]
+
+
+def test_persisted_responses_survive_a_restart(monkeypatch):
+    sessions = []
+
+    def session_factory():
+        sessions.append(FakeSession(stored="¡Hola!"))
+        return sessions[-1]
+
+    monkeypatch.setattr(llm_cache, "async_session", session_factory)
+
+    async def scenario():
+        await ResponseCache(persist=True).set("k", "¡Hola!", "¡Hola!", "model", "1")
+        # Proceso nuevo: memoria vacía, la respuesta sale de la tabla y queda en memoria
+        restarted = ResponseCache(persist=True)
+        return restarted, await restarted.get("k"), await restarted.get("k")
+
+    restarted, first, second = asyncio.run(scenario())
+    assert first == second == "¡Hola!"
+    assert restarted.db_hits == 1 and restarted.memory_hits == 1
+
+    upsert = str(sessions[0].statements[0].compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (cache_key) DO UPDATE" in upsert
+    assert sessions[0].commits == 1
+    assert len(sessions) == 2
+
+
+def test_lookup_uses_the_current_unit_of_work_session(monkeypatch):
+    monkeypatch.setattr(llm_cache, "async_session", lambda: pytest.fail("should reuse the unit of work"))
+    session = FakeSession(stored="¡Hola!")
+
+    async def scenario():
+        async with unit_of_work() as uow:
+            uow._session = session
+            return await ResponseCache(persist=True).get("k")
+
+    assert asyncio.run(scenario()) == "¡Hola!"
+    assert len(session.statements) == 1
+
+
+def test_database_errors_are_treated_as_misses(monkeypatch):
+    monkeypatch.setattr(llm_cache, "async_session", lambda: FakeSession(fail=True))
+    cache = ResponseCache(persist=True)
+
+    async def scenario():
+        await cache.set("k", "hola", "¡Hola!", "model", "1")
+        return await ResponseCache(persist=True).get("k")
+
+    assert asyncio.run(scenario()) is None
+    # Aunque falle la tabla, la respuesta sigue en la memoria del proceso
+    assert asyncio.run(cache.get("k")) == "¡Hola!"
@@ -0,0 +1,120 @@
+import asyncio
+import pytest
+# Añadir la raíz del proyecto al path para que Python encuentre los módulos de la app
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.llm_governor import CircuitBreaker, CircuitOpenError, LLMGovernor
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30.0)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()  # un éxito reinicia la cuenta
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED and breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+    assert breaker.times_opened == 1
+
+
+def test_breaker_half_open_lets_a_single_probe_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()  # la prueba sigue en curso
+
+    breaker.record_failure()  # la prueba falla: vuelve a abrirse
+    assert breaker.state == CircuitBreaker.OPEN
+
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow() and breaker.allow()
+
+
+def test_identical_concurrent_prompts_share_one_call():
+    calls = []
+
+    async def scenario():
+        governor = LLMGovernor(timeout=1.0)
+
+        async def ask():
+            calls.append(None)
+            await asyncio.sleep(0.01)
+            return "respuesta"
+
+        results = await asyncio.gather(*(governor.call(ask, key=("chat", "hola")) for _ in range(5)),
+                                       governor.call(ask, key=("chat", "adiós")))
+        return governor, results
+
+    governor, results = asyncio.run(scenario())
+    assert results == ["respuesta"] * 6
+    assert len(calls) == 2
+    assert governor.coalesced == 4
+    assert governor._inflight == {}
+
+
+def test_coalesced_callers_all_receive_the_error():
+    async def scenario():
+        governor = LLMGovernor(timeout=1.0, failure_threshold=10)
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("provider error")
+
+        return governor, await asyncio.gather(*(governor.call(fail, key="k") for _ in range(3)),
+                                              return_exceptions=True)
+
+    governor, results = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert governor.failures == 1 and governor.coalesced == 2
+
+
+def test_open_circuit_rejects_calls_without_reaching_the_provider():
+    async def scenario():
+        governor = LLMGovernor(timeout=0.01, failure_threshold=2, reset_timeout=60.0)
+
+        async def hang():
+            await asyncio.sleep(1)
+
+        for _ in range(2):
+            with pytest.raises(asyncio.TimeoutError):
+                await governor.call(hang)
+        with pytest.raises(CircuitOpenError):
+            await governor.call(hang)
+        return governor
+
+    governor = asyncio.run(scenario())
+    assert governor.timeouts == 2
+    assert governor.rejected == 1
+    assert governor.stats()["circuit_state"] == CircuitBreaker.OPEN
+
+
+def test_concurrency_is_limited_by_the_semaphore():
+    peak = 0
+    running = 0
+
+    async def scenario():
+        governor = LLMGovernor(max_concurrency=2, timeout=1.0)
+
+        async def ask():
+            nonlocal peak, running
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+        await asyncio.gather(*(governor.call(ask) for _ in range(6)))
+        return governor
+
+    governor = asyncio.run(scenario())
+    assert peak == 2
+    assert governor.calls == 6 and governor.in_flight_calls == 0
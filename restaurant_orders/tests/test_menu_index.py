@@ -0,0 +1,39 @@
+import pytest
+# Añadir la raíz del proyecto al path para que Python encuentre los módulos de la app
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.menu_index import MenuIndex, MenuItem
+
+
+@pytest.fixture
+def menu() -> MenuIndex:
+    return MenuIndex([
+        MenuItem("Pizza Pepperoni Grande", 12.5, "pizzas", id=1),
+        MenuItem("Ensalada César", 8.0, "ensaladas", id=2),
+        MenuItem("Limonada", 3.0, "bebidas", aliases=("limonada frozen",), id=3),
+    ])
+
+
+def test_exact_normalized_and_trigram_lookup(menu):
+    assert menu.resolve("Ensalada César")[0].id == 2
+    assert menu.resolve("ensalada cesar")[0].id == 2
+    assert menu.resolve("LIMONADA FROZEN")[0].id == 3
+    item, score = menu.resolve("pizza peperoni grande")
+    assert item.id == 1 and 0.6 <= score < 1.0
+
+
+def test_unknown_product_is_not_resolved(menu):
+    assert menu.resolve("Hamburguesa doble")[0] is None
+
+
+def test_incremental_update_and_removal(menu):
+    menu.add(MenuItem("Limonada Clásica", 3.5, "bebidas", id=3))
+    assert len(menu) == 3
+    assert menu.resolve("limonada clasica")[0].price == 3.5
+    assert menu.resolve("limonada frozen")[0] is None
+
+    menu.remove(2)
+    assert menu.resolve("ensalada cesar")[0] is None
+    assert menu.match("una ensalada")[0] is None
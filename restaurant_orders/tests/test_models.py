@@ -0,0 +1,33 @@
+import pytest
+# Añadir la raíz del proyecto al path para que Python encuentre los módulos de la app
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+import app.models  # noqa: F401  registra todos los modelos en Base.metadata
+from app.database.connection import Base
+
+
+def test_all_models_compile_to_postgres_ddl():
+    dialect = postgresql.dialect()
+    for table in Base.metadata.sorted_tables:
+        assert str(CreateTable(table).compile(dialect=dialect))
+        for index in table.indexes:
+            assert str(CreateIndex(index).compile(dialect=dialect))
+
+
+def test_user_sessions_partial_index():
+    indexes = {index.name: index for index in Base.metadata.tables["user_sessions"].indexes}
+    ddl = str(CreateIndex(indexes["idx_user_sessions_chat_active"]).compile(dialect=postgresql.dialect()))
+    assert "telegram_chat_id" in ddl
+    assert "WHERE is_active" in ddl
+    assert "ix_user_sessions_expires_at" in indexes
+
+
+def test_magic_links_only_index_their_own_columns():
+    table = Base.metadata.tables["magic_links"]
+    for index in table.indexes:
+        assert all(column.table is table for column in index.columns)
@@ -0,0 +1,90 @@
+import json
+# Añadir la raíz del proyecto al path para que Python encuentre los módulos de la app
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import date, datetime
+from zoneinfo import ZoneInfo
+
+from app.services import order_feed
+from app.services.order_feed import OrderFeed
+
+LIMA = ZoneInfo("America/Lima")
+
+
+def new_order(order_id: int) -> dict:
+    return {"id": order_id, "v_cliente_test": f"Cliente {order_id}", "v_hora_entrega": "12:30",
+            "items": [{"v_producto_test": "Limonada", "v_cantidad": 1}]}
+
+
+def test_resume_returns_only_missed_deltas():
+    feed = OrderFeed(ring_size=10)
+    first = json.loads(feed.order_created(new_order(1)))
+    feed.order_created(new_order(2))
+    feed.status_changed(2, "preparing")
+
+    missed = [json.loads(payload) for payload in feed.since(first["epoch"], first["seq"])]
+    assert [event["seq"] for event in missed] == [2, 3]
+    assert missed[1] == {"type": "order_status", "order_id": 2, "status": "preparing",
+                         "seq": 3, "epoch": feed.epoch}
+    assert feed.since(feed.epoch, feed.seq) == []
+
+
+def test_resume_falls_back_to_snapshot_when_gap_is_lost():
+    feed = OrderFeed(ring_size=2)
+    for order_id in range(1, 5):
+        feed.order_created(new_order(order_id))
+
+    assert feed.since(feed.epoch, 1) is None
+    assert feed.since("otro-epoch", feed.seq) is None
+    assert feed.since(feed.epoch, feed.seq + 1) is None
+
+
+def test_closed_orders_leave_the_snapshot():
+    feed = OrderFeed()
+    feed.order_created(new_order(1))
+    feed.order_created(new_order(2))
+    feed.status_changed(1, "delivered")
+    feed.status_changed(2, "ready")
+
+    snapshot = json.loads(feed.snapshot())
+    assert snapshot["seq"] == 4
+    assert [(order["id"], order["status"]) for order in snapshot["orders"]] == [(2, "ready")]
+
+
+def test_reload_starts_a_new_epoch():
+    feed = OrderFeed()
+    feed.apply({"type": "order_created", "order": {"id": 1, "status": "pending", "items": []}})
+    epoch, seq = feed.epoch, feed.seq
+
+    feed.load([{"id": 1, "status": "ready", "items": []}])
+
+    assert feed.epoch != epoch
+    assert feed.since(epoch, seq) is None
+    assert json.loads(feed.snapshot())["orders"][0]["status"] == "ready"
+
+
+class FrozenDatetime(datetime):
+    current = datetime(2024, 5, 1, 21, 0, tzinfo=LIMA)
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls.current.astimezone(tz)
+
+
+def test_day_rolls_over_in_the_service_timezone(monkeypatch):
+    monkeypatch.setattr(order_feed, "datetime", FrozenDatetime)
+    feed = OrderFeed(tz=LIMA)
+    # 20:00 en Lima del 1 de mayo: ya es 2 de mayo en UTC
+    feed.load([{**new_order(1), "created_at": "2024-05-02T01:00:00"},
+               {**new_order(2), "created_at": "2024-05-01T20:30:00-05:00"}])
+    assert feed._day == date(2024, 5, 1)
+
+    feed.order_created({**new_order(3), "created_at": "2024-05-02T02:00:00"})
+    assert feed.stats()["open_orders"] == 3
+
+    # Pasada la medianoche de Lima (05:10 UTC) los pedidos del día anterior salen
+    monkeypatch.setattr(FrozenDatetime, "current", datetime(2024, 5, 2, 0, 10, tzinfo=LIMA))
+    feed.order_created({**new_order(4), "created_at": "2024-05-02T05:10:00"})
+    assert [order["id"] for order in json.loads(feed.snapshot())["orders"]] == [4]
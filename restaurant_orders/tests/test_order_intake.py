@@ -0,0 +1,67 @@
+import asyncio
+# Añadir la raíz del proyecto al path para que Python encuentre los módulos de la app
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.menu_index import MenuIndex, MenuItem
+from app.services.order_intake import OrderIntake
+from app.services.order_parser import OrderParser
+
+MENU = MenuIndex([
+    MenuItem(name="Pizza Pepperoni Grande", price=12.5, category="pizzas", aliases=("pepperoni",)),
+    MenuItem(name="Limonada", price=3.0, category="bebidas"),
+])
+
+
+class FakeAgent:
+    def __init__(self, tool_calls):
+        self.tool_calls = tool_calls
+        self.messages = []
+
+    async def process_message(self, message: str):
+        self.messages.append(message)
+        return self.tool_calls
+
+
+def test_confident_parse_skips_the_llm():
+    agent = FakeAgent([])
+    intake = OrderIntake(OrderParser(MENU), agent)
+
+    calls, source = asyncio.run(intake.extract_tool_calls("2 pizza pepperoni grande y 1 limonada", "Ana"))
+
+    assert source == "parser"
+    assert agent.messages == []
+    assert [call["function_call"]["name"] for call in calls][:1] == ["insert_pedido"]
+
+
+def test_low_confidence_order_uses_llm_tool_calls():
+    # Formato de LangChain: {"name", "args", "id"}
+    agent = FakeAgent([
+        {"name": "insert_pedido", "args": {"v_destino": "Av. Larco 123"}, "id": "call_1"},
+        {"name": "insert_detalle_pedido", "args": {"v_producto_test": "Pizza Pepperoni Grande", "v_cantidad": 2}, "id": "call_2"},
+    ])
+    intake = OrderIntake(OrderParser(MENU), agent)
+
+    calls, source = asyncio.run(intake.extract_tool_calls("quiero 2 de esas pizzas con pepperoni porfa"))
+
+    assert source == "llm"
+    assert calls[1] == {"function_call": {"name": "insert_detalle_pedido",
+                                          "args": {"v_producto_test": "Pizza Pepperoni Grande", "v_cantidad": 2}}}
+    assert intake.stats()["llm_fallbacks"] == 1
+
+
+def test_llm_without_order_calls_is_not_an_order():
+    intake = OrderIntake(OrderParser(MENU), FakeAgent([]))
+
+    assert asyncio.run(intake.extract_tool_calls("quiero 2 de esas pizzas con pepperoni porfa")) == (None, None)
+    assert intake.stats()["not_orders"] == 1
+
+
+def test_question_about_a_product_does_not_reach_the_llm():
+    agent = FakeAgent([{"name": "insert_pedido", "args": {}, "id": "call_1"}])
+    intake = OrderIntake(OrderParser(MENU), agent)
+
+    assert asyncio.run(intake.extract_tool_calls("¿tienen limonada?")) == (None, None)
+    assert agent.messages == []
+    assert intake.stats()["not_orders"] == 1
@@ -0,0 +1,116 @@
+import pytest
+# Añadir la raíz del proyecto al path para que Python encuentre los módulos de la app
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.menu_index import MenuIndex, MenuItem
+from app.services.order_parser import OrderParser
+
+
+@pytest.fixture
+def parser() -> OrderParser:
+    menu = MenuIndex([
+        MenuItem("Pizza Pepperoni Grande", 12.5, "pizzas"),
+        MenuItem("Pizza Pepperoni Mediana", 9.5, "pizzas"),
+        MenuItem("Pizza Jamón y Queso", 11.0, "pizzas"),
+        MenuItem("Ensalada César", 8.0, "ensaladas"),
+        MenuItem("Limonada", 3.0, "bebidas", aliases=("limonada frozen",)),
+    ])
+    return OrderParser(menu)
+
+
+def test_simple_order_is_parsed_with_high_confidence(parser):
+    order = parser.parse("2 pizzas pepperoni grandes, 1 ensalada césar, delivery a Av. Larco 123 a las 12:30")
+
+    assert [(p.quantity, p.item.name) for p in order.items] == [
+        (2, "Pizza Pepperoni Grande"),
+        (1, "Ensalada César"),
+    ]
+    assert order.destination == "Av. Larco 123"
+    assert order.delivery_time == "a las 12:30"
+    assert order.total == 33.0
+    assert order.confidence == 1.0
+
+
+def test_natural_language_order(parser):
+    order = parser.parse(
+        "Hola, me gustaría pedir dos pizzas de pepperoni grandes a $12.50 cada una y una ensalada césar de $8. "
+        "La entrega es en la Calle Falsa 123. Una de las pizzas sin aceitunas, por favor. "
+        "Pagaremos con tarjeta de crédito un total de $33."
+    )
+
+    assert [(p.quantity, p.item.name) for p in order.items] == [
+        (2, "Pizza Pepperoni Grande"),
+        (1, "Ensalada César"),
+    ]
+    assert order.destination == "Calle Falsa 123"
+    assert order.payment_method == "tarjeta"
+    assert order.observations == ["Una de las pizzas sin aceitunas"]
+
+
+def test_item_names_containing_y_and_notes(parser):
+    order = parser.parse("3 limonadas y 1 pizza jamon y queso sin cebolla para las 1 pm")
+
+    assert [(p.quantity, p.item.name, p.notes) for p in order.items] == [
+        (3, "Limonada", None),
+        (1, "Pizza Jamón y Queso", "sin cebolla"),
+    ]
+    assert order.delivery_time == "para las 1 pm"
+
+
+def test_unknown_item_lowers_confidence(parser):
+    order = parser.parse("2 hamburguesas y una limonada")
+
+    assert order.looks_like_order
+    assert order.unmatched == ["2 hamburguesas"]
+    assert order.confidence < 0.5
+
+
+def test_chat_message_is_not_an_order(parser):
+    order = parser.parse("hola, ¿qué hay hoy?")
+
+    assert not order.looks_like_order
+    assert order.confidence == 0.0
+
+
+@pytest.mark.parametrize("message, reason", [
+    ("pizza pepperoni grande?", "question"),
+    ("¿tienen limonada?", "question"),
+    ("no quiero limonada", "negation"),
+    ("cancela la limonada", "negation"),
+    ("ayer pedí 2 limonadas", "past"),
+])
+def test_messages_that_mention_items_without_ordering_are_rejected(parser, message, reason):
+    order = parser.parse(message)
+
+    assert order.rejected == reason
+    assert not order.looks_like_order
+    assert order.confidence == 0.0
+
+
+@pytest.mark.parametrize("message", ["limonada", "gracias por la limonada"])
+def test_item_without_quantity_or_order_verb_is_left_to_the_llm(parser, message):
+    order = parser.parse(message)
+
+    assert [p.item.name for p in order.items] == ["Limonada"]
+    assert order.rejected is None
+    assert order.confidence < 0.85
+
+
+@pytest.mark.parametrize("message", ["quiero limonada", "me traes una limonada", "1 limonada"])
+def test_order_verb_or_explicit_quantity_is_confident(parser, message):
+    order = parser.parse(message)
+
+    assert [(p.quantity, p.item.name) for p in order.items] == [(1, "Limonada")]
+    assert order.confidence == 1.0
+
+
+def test_tool_calls_match_order_processor_format(parser):
+    calls = parser.parse("2 pizzas pepperoni grandes").to_tool_calls("Ana")
+
+    names = [call["function_call"]["name"] for call in calls]
+    assert names == ["insert_pedido", "insert_detalle_pedido", "insert_pago"]
+    assert calls[0]["function_call"]["args"]["v_cliente_test"] == "Ana"
+    assert calls[0]["function_call"]["args"]["v_importe_total"] == 25.0
+    assert calls[1]["function_call"]["args"]["v_cantidad"] == 2
@@ -0,0 +1,156 @@
+import asyncio
+import json
+import pytest
+# Añadir la raíz del proyecto al path para que Python encuentre los módulos de la app
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.menu_index import MenuIndex, MenuItem
+from app.services.order_processor import (
+    INSERT_ORDER_SQL, CatalogUnavailableError, OrderProcessor, OrderValidationError, build_order_payload, group_tool_calls,
+)
+
+CALLS = [
+    {"function_call": {"name": "insert_pedido", "args": {"v_cliente_test": "Ana", "v_importe_total": 1.0}}},
+    {"function_call": {"name": "insert_detalle_pedido", "args": {"v_producto_test": "pizza pepperoni", "v_cantidad": 2, "v_precio": 0.5}}},
+    {"function_call": {"name": "insert_pago", "args": {"v_metodo": "efectivo", "v_importe": 1.0}}},
+]
+
+
+def make_processor(catalog) -> OrderProcessor:
+    # Sin sesión, impresora ni dashboard: los casos probados no llegan a usarlos
+    return OrderProcessor(None, None, None, catalog=catalog)
+
+
+def test_catalog_prices_replace_the_ones_supplied():
+    catalog = MenuIndex([MenuItem("Pizza Pepperoni Grande", 12.5, "Pizzas", aliases=("pizza pepperoni",))])
+
+    validated = make_processor(catalog).validate_and_price(CALLS)
+
+    args = {call["function_call"]["name"]: call["function_call"]["args"] for call in validated}
+    assert args["insert_detalle_pedido"]["v_producto_test"] == "Pizza Pepperoni Grande"
+    assert args["insert_detalle_pedido"]["v_precio"] == 12.5
+    assert args["insert_pedido"]["v_importe_total"] == 25.0
+    assert args["insert_pago"]["v_importe"] == 25.0
+
+
+def test_unknown_products_are_rejected():
+    catalog = MenuIndex([MenuItem("Limonada", 3.0, "Bebidas")])
+
+    with pytest.raises(OrderValidationError) as error:
+        make_processor(catalog).validate_and_price(CALLS)
+    assert error.value.unknown_products == ["pizza pepperoni"]
+
+
+def test_empty_catalog_rejects_the_order():
+    with pytest.raises(CatalogUnavailableError):
+        asyncio.run(make_processor(MenuIndex()).create_order_from_llm(CALLS))
+
+
+def test_order_payload_is_built_from_one_pass_over_the_calls():
+    calls = CALLS + [{"function_call": {"name": "insert_detalle_pedido", "args": {"v_producto_test": "Limonada"}}}]
+
+    pedido, items, pago = group_tool_calls(calls)
+    payload = build_order_payload(pedido, items, pago)
+
+    assert payload["v_cliente_test"] == "Ana"
+    assert payload["items"] == [
+        {"v_producto_test": "pizza pepperoni", "v_cantidad": 2, "v_precio": 0.5, "v_notas": None},
+        {"v_producto_test": "Limonada", "v_cantidad": None, "v_precio": None, "v_notas": None},
+    ]
+    assert payload["pago"]["v_metodo"] == "efectivo"
+    assert build_order_payload(pedido, items, None)["pago"] is None
+
+
+class FakeResult:
+    def __init__(self, value):
+        self.value = value
+
+    def scalar_one_or_none(self):
+        return self.value
+
+
+class FakeSession:
+    """Sesión que devuelve `order_id` como resultado de insert_pedido_completo, o lanza `error`."""
+
+    def __init__(self, order_id=None, error=None):
+        self.order_id = order_id
+        self.error = error
+        self.executed = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    async def execute(self, statement, params=None):
+        self.executed.append((statement, params))
+        if self.error is not None:
+            raise self.error
+        return FakeResult(self.order_id)
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+    def begin(self):
+        session = self
+
+        class Transaction:
+            async def __aenter__(self):
+                return session
+
+            async def __aexit__(self, exc_type, exc, tb):
+                if exc_type is None:
+                    await session.commit()
+                else:
+                    await session.rollback()
+        return Transaction()
+
+
+class Recorder:
+    def __init__(self):
+        self.orders = []
+
+    async def print_ticket(self, order):
+        self.orders.append(order)
+
+    async def broadcast_order(self, order):
+        self.orders.append(order)
+
+
+def test_order_is_inserted_with_a_single_function_call():
+    session, printer, dashboard = FakeSession(order_id=17), Recorder(), Recorder()
+    catalog = MenuIndex([MenuItem("Pizza Pepperoni Grande", 12.5, "Pizzas", aliases=("pizza pepperoni",))])
+
+    order = asyncio.run(OrderProcessor(session, printer, dashboard, catalog=catalog).create_order_from_llm(CALLS))
+
+    [(statement, params)] = session.executed
+    assert statement is INSERT_ORDER_SQL
+    payload = json.loads(params["v_pedido"])
+    assert payload["v_importe_total"] == 25.0
+    assert payload["items"] == [{"v_producto_test": "Pizza Pepperoni Grande", "v_cantidad": 2,
+                                 "v_precio": 12.5, "v_notas": None}]
+    assert payload["pago"]["v_importe"] == 25.0
+    assert session.commits == 1 and session.rollbacks == 0
+    assert order["id"] == 17
+    assert printer.orders == [order] and dashboard.orders == [order]
+
+
+def test_database_function_error_rolls_back_and_skips_side_effects():
+    session, printer, dashboard = FakeSession(error=RuntimeError('null value in column "v_pedido_id"')), Recorder(), Recorder()
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(OrderProcessor(session, printer, dashboard).create_order_from_llm(CALLS))
+
+    assert session.rollbacks == 1 and session.commits == 0
+    assert printer.orders == [] and dashboard.orders == []
+
+
+def test_function_without_an_id_is_an_error():
+    session, printer, dashboard = FakeSession(order_id=None), Recorder(), Recorder()
+
+    with pytest.raises(Exception, match="no devolvió un ID"):
+        asyncio.run(OrderProcessor(session, printer, dashboard).create_order_from_llm(CALLS))
+
+    assert printer.orders == [] and dashboard.orders == []
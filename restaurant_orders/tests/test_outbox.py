@@ -0,0 +1,181 @@
+import asyncio
+import json
+# Añadir la raíz del proyecto al path para que Python encuentre los módulos de la app
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import datetime, timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import postgresql
+
+from app.services.outbox import BROADCAST_ORDER, PRINT_TICKET, OutboxDispatcher, order_event_payload
+
+
+def event(event_id: int, event_type: str = PRINT_TICKET, attempts: int = 1):
+    return SimpleNamespace(id=event_id, event_type=event_type, payload={"id": event_id}, attempts=attempts)
+
+
+class RecordingDispatcher(OutboxDispatcher):
+    """Dispatcher con la base de datos sustituida por listas: reclama `batches` y anota los resultados."""
+
+    def __init__(self, handlers, batches, **kwargs):
+        super().__init__(handlers, **kwargs)
+        self.batches = list(batches)
+        self.recorded = []
+
+    async def _claim(self):
+        return self.batches.pop(0) if self.batches else []
+
+    async def _record(self, done, failures):
+        self.recorded.append((done, [(e.id, error, self.failure_values(e, error)) for e, error in failures]))
+
+    async def _purge_batch(self):
+        return 0
+
+
+def test_claim_locks_a_batch_of_due_events_and_leases_it():
+    dispatcher = OutboxDispatcher({}, batch_size=20, lease_seconds=60.0)
+    compiled = dispatcher.claim_statement().compile(dialect=postgresql.dialect())
+    sql = " ".join(str(compiled).split())
+
+    assert "FOR UPDATE SKIP LOCKED" in sql
+    assert "order_outbox.status = %(status_1)s" in sql
+    assert "order_outbox.available_at <= now()" in sql
+    assert "ORDER BY order_outbox.available_at, order_outbox.id" in sql
+    assert "attempts=(order_outbox.attempts +" in sql
+    assert "available_at=(now() + %(now_1)s)" in sql
+    assert "RETURNING" in sql
+    assert compiled.params["status_1"] == "pending"
+    assert compiled.params["param_1"] == 20
+    assert compiled.params["now_1"] == timedelta(seconds=60)
+
+
+def test_retry_delay_is_exponential_and_capped():
+    dispatcher = OutboxDispatcher({}, retry_base_seconds=2.0)
+
+    assert [dispatcher.retry_delay(attempts) for attempts in (1, 2, 3, 4)] == [2.0, 4.0, 8.0, 16.0]
+    assert dispatcher.retry_delay(20) == 300.0
+
+
+def test_failure_is_retried_until_max_attempts():
+    dispatcher = OutboxDispatcher({}, max_attempts=3, retry_base_seconds=2.0)
+
+    retry = dispatcher.failure_values(event(1, attempts=2), "printer offline")
+    assert "status" not in retry
+    assert retry["last_error"] == "printer offline"
+    assert retry["available_at"].right.value == timedelta(seconds=4)
+
+    final = dispatcher.failure_values(event(1, attempts=3), "printer offline")
+    assert final["status"] == "failed"
+    assert "available_at" not in final
+
+
+def test_dispatch_delivers_concurrently_and_records_outcomes():
+    in_flight = []
+    overlapped = []
+
+    async def print_ticket(payload):
+        in_flight.append(payload["id"])
+        await asyncio.sleep(0.01)
+        overlapped.append(len(in_flight))
+        in_flight.remove(payload["id"])
+        if payload["id"] == 2:
+            raise IOError("printer offline")
+
+    async def broadcast(payload):
+        pass
+
+    batch = [event(1), event(2, attempts=8), event(3, BROADCAST_ORDER), event(4, "unknown")]
+    dispatcher = RecordingDispatcher({PRINT_TICKET: print_ticket, BROADCAST_ORDER: broadcast}, [batch],
+                                     max_attempts=8)
+
+    assert asyncio.run(dispatcher.dispatch_once()) == 4
+    done, failures = dispatcher.recorded[0]
+    assert done == [1, 3]
+    assert [(event_id, error) for event_id, error, _ in failures] == [
+        (2, "printer offline"), (4, "No handler for event type unknown"),
+    ]
+    assert failures[0][2]["status"] == "failed"
+    assert "status" not in failures[1][2]
+    assert dispatcher.stats()["delivered"] == 2
+    assert dispatcher.failed == 1 and dispatcher.retried == 1
+    # Los dos tickets se entregaron a la vez, no uno tras otro
+    assert max(overlapped) == 2
+
+
+def test_run_loop_keeps_claiming_while_batches_are_full():
+    delivered = []
+
+    async def handler(payload):
+        delivered.append(payload["id"])
+
+    batches = [[event(1), event(2)], [event(3), event(4)], [event(5)]]
+    dispatcher = RecordingDispatcher({PRINT_TICKET: handler}, batches, batch_size=2, poll_interval=60.0)
+
+    async def scenario():
+        await dispatcher.start()
+        await asyncio.sleep(0.05)
+        await dispatcher.stop()
+
+    asyncio.run(scenario())
+    # Sin esperar al siguiente sondeo de 60 s
+    assert delivered == [1, 2, 3, 4, 5]
+
+
+def test_order_payload_serializes_dates_and_decimals():
+    payload = json.loads(order_event_payload({"id": 1, "importe": Decimal("12.50"),
+                                              "created_at": datetime(2024, 5, 1, 12, 30)}))
+    assert payload == {"id": 1, "importe": "12.50", "created_at": "2024-05-01 12:30:00"}
+
+
+def test_purge_deletes_old_delivered_events_in_locked_batches():
+    dispatcher = OutboxDispatcher({}, retention_hours=72, purge_batch_size=500)
+    compiled = dispatcher.purge_statement().compile(dialect=postgresql.dialect())
+    sql = " ".join(str(compiled).split())
+
+    assert sql.startswith("DELETE FROM order_outbox WHERE order_outbox.id IN")
+    assert "order_outbox.processed_at < now() - %(now_1)s" in sql
+    assert "FOR UPDATE SKIP LOCKED" in sql
+    assert compiled.params["status_1"] == "done"
+    assert compiled.params["now_1"] == timedelta(hours=72)
+    assert compiled.params["param_1"] == 500
+
+
+def test_purge_continues_while_batches_are_full():
+    class PurgingDispatcher(OutboxDispatcher):
+        def __init__(self, counts, **kwargs):
+            super().__init__({}, **kwargs)
+            self.counts = list(counts)
+
+        async def _purge_batch(self):
+            return self.counts.pop(0)
+
+    dispatcher = PurgingDispatcher([2, 2, 1, 2], purge_batch_size=2)
+
+    assert asyncio.run(dispatcher.purge_done()) == 5
+    assert dispatcher.counts == [2]
+    assert dispatcher.stats()["purged"] == 5
+
+
+def test_run_loop_purges_once_per_interval():
+    purges = []
+
+    class PurgingDispatcher(RecordingDispatcher):
+        async def _purge_batch(self):
+            purges.append(None)
+            return 0
+
+    dispatcher = PurgingDispatcher({}, [], poll_interval=0.005, purge_interval=60.0)
+
+    async def scenario():
+        await dispatcher.start()
+        await asyncio.sleep(0.05)
+        await dispatcher.stop()
+
+    asyncio.run(scenario())
+    assert len(purges) == 1
+    # Sin retención no se borra nada
+    assert OutboxDispatcher({}, retention_hours=0).retention is None
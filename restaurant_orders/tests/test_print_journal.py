@@ -0,0 +1,61 @@
+import asyncio
+import os
+import pytest
+# Añadir la raíz del proyecto al path para que Python encuentre los módulos de la app
+import sys
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.print_journal import PrintJournal
+
+
+def open_journal(path, **kwargs) -> PrintJournal:
+    journal = PrintJournal(str(path), fsync_interval=0, **kwargs)
+    journal.open()
+    return journal
+
+
+def test_unprinted_tickets_survive_restart(tmp_path):
+    journal = open_journal(tmp_path)
+
+    async def append():
+        return [await journal.append(order_id, f"ticket {order_id}".encode()) for order_id in (1, 2, 3)]
+
+    offsets = asyncio.run(append())
+    journal.mark_printed(offsets[0])
+    journal.close()
+
+    journal = open_journal(tmp_path)
+    assert [journal.read(offset) for offset in journal.unprinted()] == [b"ticket 2", b"ticket 3"]
+    assert journal.ticket_for_order(1) == b"ticket 1"
+    journal.close()
+
+
+def test_incomplete_tail_record_is_truncated(tmp_path):
+    journal = open_journal(tmp_path)
+    journal.write(7, b"complete ticket")
+    journal.close()
+
+    path = next(p for p in os.listdir(tmp_path) if p.endswith(".journal"))
+    with open(tmp_path / path, "ab") as handle:
+        handle.write(b"\x54\x49\x00\x00")  # cabecera a medio escribir
+
+    journal = open_journal(tmp_path)
+    assert len(journal.unprinted()) == 1
+    assert journal.write(8, b"next") > 0
+    assert journal.ticket_for_order(8) == b"next"
+    journal.close()
+
+
+def test_rotation_keeps_reprints_from_history(tmp_path):
+    journal = open_journal(tmp_path, max_bytes=10)
+    offset = journal.write(5, b"a ticket longer than ten bytes")
+    journal.mark_printed(offset)
+
+    assert journal.stats()["generation"] == 2
+    assert journal.unprinted() == []
+    assert journal.ticket_for_order(5) == b"a ticket longer than ten bytes"
+    journal.close()
+
+    journal = open_journal(tmp_path, max_bytes=10)
+    assert journal.ticket_for_order(5) == b"a ticket longer than ten bytes"
+    journal.close()
@@ -0,0 +1,52 @@
+import pytest
+# Añadir la raíz del proyecto al path para que Python encuentre los módulos de la app
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.menu_index import MenuIndex, MenuItem
+from app.services.print_routing import StationRouter, StationRule
+
+ORDER = {
+    "id": 10,
+    "v_importe_total": 30.5,
+    "items": [
+        {"v_producto_test": "Pizza Pepperoni Grande", "v_cantidad": 2},
+        {"v_producto_test": "Limonada", "v_cantidad": 1},
+        {"v_producto_test": "Cerveza Artesanal", "v_cantidad": 2},
+        {"v_producto_test": "Tiramisú", "v_cantidad": 1},
+    ],
+}
+
+
+@pytest.fixture
+def router() -> StationRouter:
+    catalog = MenuIndex([
+        MenuItem("Pizza Pepperoni Grande", 12.5, "Pizzas"),
+        MenuItem("Limonada", 3.0, "Bebidas"),
+    ])
+    rules = [StationRule.from_config(config) for config in [
+        {"name": "cocina", "categories": ["pizzas"], "default": True},
+        {"name": "bar", "categories": ["bebidas"], "keywords": ["cerveza"]},
+        {"name": "caja", "full_ticket": True},
+    ]]
+    return StationRouter(rules, catalog)
+
+
+def products(order):
+    return [item["v_producto_test"] for item in order["items"]]
+
+
+def test_items_are_split_by_category_and_keyword(router):
+    routed = router.route(ORDER)
+
+    assert products(routed["cocina"]) == ["Pizza Pepperoni Grande", "Tiramisú"]
+    assert products(routed["bar"]) == ["Limonada", "Cerveza Artesanal"]
+    assert products(routed["caja"]) == products(ORDER)
+    assert all(routed[name]["station"] == name for name in routed)
+
+
+def test_station_without_items_gets_no_ticket(router):
+    routed = router.route({"id": 11, "items": [{"v_producto_test": "Limonada", "v_cantidad": 1}]})
+
+    assert set(routed) == {"bar", "caja"}
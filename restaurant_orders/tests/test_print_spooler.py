@@ -0,0 +1,158 @@
+import asyncio
+import threading
+import pytest
+# Añadir la raíz del proyecto al path para que Python encuentre los módulos de la app
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.print_spooler import PrintSpooler, PrintQueueFullError
+
+
+class FakePrinter:
+    def __init__(self, fail_writes: int = 0):
+        self.output = []
+        self.closed = False
+        self.fail_writes = fail_writes
+
+    def text(self, value: str):
+        if self.fail_writes:
+            self.fail_writes -= 1
+            raise IOError("USB write timeout")
+        self.output.append(value)
+
+    def close(self):
+        self.closed = True
+
+
+def make_spooler(printers, fail_writes: int = 0, maxsize: int = 100) -> PrintSpooler:
+    def connect():
+        # Solo la primera conexión falla
+        printer = FakePrinter(fail_writes=fail_writes if not printers else 0)
+        printers.append(printer)
+        return printer
+    return PrintSpooler(connect, maxsize=maxsize, reconnect_delay=0)
+
+
+def test_connection_is_reused_between_tickets():
+    printers = []
+
+    async def scenario():
+        spooler = make_spooler(printers)
+        await asyncio.gather(*(spooler.print(lambda p, i=i: p.text(f"ticket {i}")) for i in range(5)))
+        await spooler.stop()
+        return spooler
+
+    spooler = asyncio.run(scenario())
+    assert len(printers) == 1
+    assert printers[0].output == [f"ticket {i}" for i in range(5)]
+    assert printers[0].closed
+    assert spooler.printed == 5
+
+
+def test_failed_write_is_not_retried_and_next_ticket_reconnects():
+    printers = []
+
+    async def scenario():
+        spooler = make_spooler(printers, fail_writes=1)
+        # Un ticket es una sola escritura: si falla, pudo salir una parte
+        with pytest.raises(IOError):
+            await spooler.print(lambda p: p.text("ticket"))
+        await spooler.print(lambda p: p.text("siguiente"))
+        await spooler.stop()
+        return spooler
+
+    spooler = asyncio.run(scenario())
+    assert len(printers) == 2
+    assert printers[0].closed and printers[1].output == ["siguiente"]
+    assert spooler.reconnects == 0 and spooler.failed == 1
+
+
+def test_error_after_partial_write_is_not_retried():
+    printers = []
+
+    class FailsMidTicket(FakePrinter):
+        def text(self, value: str):
+            if self.output:
+                raise IOError("USB write timeout")
+            self.output.append(value)
+
+    def connect():
+        printer = FailsMidTicket() if not printers else FakePrinter()
+        printers.append(printer)
+        return printer
+
+    async def scenario():
+        spooler = PrintSpooler(connect, reconnect_delay=0)
+        with pytest.raises(IOError):
+            await spooler.print(lambda p: (p.text("cabecera"), p.text("items")))
+        # El siguiente ticket sí usa una conexión nueva
+        await spooler.print(lambda p: p.text("siguiente"))
+        await spooler.stop()
+        return spooler
+
+    spooler = asyncio.run(scenario())
+    assert printers[0].output == ["cabecera"] and printers[0].closed
+    assert printers[1].output == ["siguiente"]
+    assert spooler.reconnects == 0
+    assert spooler.failed == 1
+
+
+def test_connect_error_is_retried():
+    attempts = []
+
+    def connect():
+        attempts.append(None)
+        if len(attempts) == 1:
+            raise IOError("USB device not found")
+        return FakePrinter()
+
+    async def scenario():
+        spooler = PrintSpooler(connect, reconnect_delay=0)
+        await spooler.print(lambda p: p.text("ticket"))
+        await spooler.stop()
+        return spooler
+
+    spooler = asyncio.run(scenario())
+    assert len(attempts) == 2
+    assert spooler.printed == 1 and spooler.reconnects == 1
+
+
+def test_failed_retry_closes_the_new_connection():
+    printers = []
+
+    def connect():
+        if not printers:
+            printers.append(None)
+            raise IOError("USB device not found")
+        printers.append(FakePrinter(fail_writes=1))
+        return printers[-1]
+
+    async def scenario():
+        spooler = PrintSpooler(connect, reconnect_delay=0)
+        with pytest.raises(IOError):
+            await spooler.print(lambda p: p.text("ticket"))
+        stats = spooler.stats()
+        await spooler.stop()
+        return spooler, stats
+
+    spooler, stats = asyncio.run(scenario())
+    assert printers[1].closed
+    assert not stats["connected"]
+    assert spooler.reconnects == 1 and spooler.failed == 1
+
+
+def test_full_queue_rejects_without_blocking():
+    async def scenario():
+        spooler = make_spooler([], maxsize=1)
+        blocker = threading.Event()
+        first = spooler.submit(lambda p: blocker.wait(5))
+        await asyncio.sleep(0.05)  # el hilo ya tiene el primer trabajo
+        spooler.submit(lambda p: None)
+        with pytest.raises(PrintQueueFullError):
+            spooler.submit(lambda p: None)
+        blocker.set()
+        await first
+        await spooler.stop()
+
+    asyncio.run(scenario())
@@ -0,0 +1,107 @@
+import asyncio
+import pytest
+# Añadir la raíz del proyecto al path para que Python encuentre los módulos de la app
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from escpos.printer import Dummy
+
+from app.config import settings
+from app.services.menu_index import MenuIndex, MenuItem
+from app.services.printer import PrinterService
+
+ORDER = {
+    "id": 7,
+    "items": [
+        {"v_producto_test": "Pizza Pepperoni Grande", "v_cantidad": 1},
+        {"v_producto_test": "Limonada", "v_cantidad": 2},
+    ],
+}
+
+
+@pytest.fixture
+def service():
+    catalog = MenuIndex([
+        MenuItem("Pizza Pepperoni Grande", 12.5, "Pizzas"),
+        MenuItem("Limonada", 3.0, "Bebidas"),
+    ])
+    service = PrinterService(stations=[
+        {"name": "cocina", "backend": "dummy", "categories": ["pizzas"], "default": True},
+        {"name": "bar", "backend": "dummy", "categories": ["bebidas"]},
+    ], catalog=catalog)
+    service.printed = []
+    service.bar_down = True
+
+    # Sin arrancar hilos ni journal: cada estación solo anota lo que imprime
+    for name, station in service.stations.items():
+        async def print_ticket(order, name=name):
+            if name == "bar" and service.bar_down:
+                raise IOError("bar printer offline")
+            service.printed.append((name, order["id"]))
+        station.print_ticket = print_ticket
+    return service
+
+
+def test_retry_only_prints_on_stations_that_failed(service):
+    with pytest.raises(IOError):
+        asyncio.run(service.print_ticket(ORDER))
+    assert service.printed == [("cocina", 7)]
+
+    # Reintento del outbox con el bar todavía caído: la cocina no repite
+    with pytest.raises(IOError):
+        asyncio.run(service.print_ticket(ORDER))
+    assert service.printed == [("cocina", 7)]
+
+    service.bar_down = False
+    asyncio.run(service.print_ticket(ORDER))
+    assert service.printed == [("cocina", 7), ("bar", 7)]
+
+
+def test_completed_orders_are_forgotten(service):
+    service.bar_down = False
+    asyncio.run(service.print_ticket(ORDER))
+    asyncio.run(service.print_ticket(ORDER))
+
+    # Un pedido impreso en todas las estaciones no deja rastro: otro envío imprime de nuevo
+    assert service.printed == [("cocina", 7), ("bar", 7), ("cocina", 7), ("bar", 7)]
+
+
+def test_without_journal_a_failed_station_is_retried_alone(monkeypatch):
+    # Sin journal cada estación espera a la impresora y el error llega al outbox
+    monkeypatch.setattr(settings, "PRINT_JOURNAL_ENABLED", False)
+    catalog = MenuIndex([MenuItem("Pizza Pepperoni Grande", 12.5, "Pizzas"), MenuItem("Limonada", 3.0, "Bebidas")])
+    service = PrinterService(stations=[
+        {"name": "cocina", "backend": "dummy", "categories": ["pizzas"], "default": True},
+        {"name": "bar", "backend": "dummy", "categories": ["bebidas"]},
+    ], catalog=catalog)
+    printers = {"cocina": Dummy(), "bar": Dummy()}
+    bar_connects = []
+
+    def connect_bar():
+        bar_connects.append(None)
+        if len(bar_connects) <= 2:
+            raise IOError("bar printer offline")
+        return printers["bar"]
+
+    service.stations["cocina"].spooler.connect = lambda: printers["cocina"]
+    service.stations["bar"].spooler.connect = connect_bar
+    for station in service.stations.values():
+        station.spooler.reconnect_delay = 0
+
+    async def scenario():
+        await service.start()
+        with pytest.raises(IOError):
+            await service.print_ticket(ORDER)
+        kitchen_ticket = printers["cocina"].output
+        await service.print_ticket(ORDER)
+        await service.stop()
+        return kitchen_ticket
+
+    kitchen_ticket = asyncio.run(scenario())
+    assert b"Pizza Pepperoni Grande" in kitchen_ticket
+    # El reintento solo imprime en el bar; la cocina no repite su ticket
+    assert printers["cocina"].output == kitchen_ticket
+    assert b"Limonada" in printers["bar"].output
+    assert b"Pizza" not in printers["bar"].output
+    assert not service._partial
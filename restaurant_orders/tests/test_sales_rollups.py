@@ -0,0 +1,152 @@
+import asyncio
+import pytest
+# Añadir la raíz del proyecto al path para que Python encuentre los módulos de la app
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from zoneinfo import ZoneInfo
+
+from app.database import connection
+from app.services.sales_rollups import SalesRollups, summarize
+
+LIMA = ZoneInfo("America/Lima")
+DAY = date(2024, 5, 1)
+
+
+def utc_hour(hour: int) -> datetime:
+    # Los buckets son horas UTC; 17:00 UTC son las 12:00 en Lima
+    return datetime(2024, 5, 1, hour, tzinfo=timezone.utc)
+
+
+def test_day_summary_totals_hours_products_and_payments():
+    summary = summarize(
+        DAY, LIMA,
+        hourly=[(utc_hour(18), 2, Decimal("30.00")), (utc_hour(17), 3, Decimal("45.50"))],
+        products=[
+            (utc_hour(17), "Pizza", 2, Decimal("25.00")),
+            (utc_hour(18), "Pizza", 1, Decimal("12.50")),
+            (utc_hour(18), "Limonada", 3, Decimal("9.00")),
+        ],
+        payments=[
+            (utc_hour(17), "efectivo", 3, Decimal("45.50")),
+            (utc_hour(18), "tarjeta", 2, Decimal("30.00")),
+        ],
+    )
+
+    assert summary["day"] == "2024-05-01"
+    assert summary["orders"] == 5
+    assert summary["revenue"] == 75.5
+    assert summary["average_ticket"] == 15.1
+    # Ordenadas por hora y expresadas en la zona del restaurante
+    assert [(h["hour"], h["orders"]) for h in summary["hourly"]] == [("12:00", 3), ("13:00", 2)]
+    assert summary["hourly"][0]["starts_at"] == "2024-05-01T12:00:00-05:00"
+    assert summary["products"] == [
+        {"product": "Pizza", "quantity": 3, "revenue": 37.5},
+        {"product": "Limonada", "quantity": 3, "revenue": 9.0},
+    ]
+    assert [m["method"] for m in summary["payment_methods"]] == ["efectivo", "tarjeta"]
+
+
+def test_cancelled_products_and_methods_drop_out():
+    summary = summarize(
+        DAY, LIMA,
+        hourly=[(utc_hour(17), 1, Decimal("12.50"))],
+        products=[
+            (utc_hour(17), "Pizza", 1, Decimal("12.50")),
+            # Cancelación: el trigger resta lo que sumó el pedido
+            (utc_hour(18), "Tiramisú", 1, Decimal("6.00")),
+            (utc_hour(19), "Tiramisú", -1, Decimal("-6.00")),
+        ],
+        payments=[(utc_hour(17), "yape", 1, Decimal("12.50")), (utc_hour(18), "tarjeta", 0, Decimal("0"))],
+    )
+
+    assert [p["product"] for p in summary["products"]] == ["Pizza"]
+    assert [m["method"] for m in summary["payment_methods"]] == ["yape"]
+
+
+def test_empty_day():
+    summary = summarize(DAY, LIMA, [], [], [])
+
+    assert summary["orders"] == 0 and summary["revenue"] == 0.0
+    assert summary["average_ticket"] == 0.0
+    assert summary["hourly"] == [] and summary["products"] == [] and summary["payment_methods"] == []
+
+
+class CountingRollups(SalesRollups):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.reads = 0
+
+    async def _read(self, day):
+        self.reads += 1
+        await asyncio.sleep(0.01)
+        return summarize(day, self.tz, [], [], [])
+
+
+def test_concurrent_requests_share_one_read_of_today():
+    async def scenario():
+        rollups = CountingRollups(cache_seconds=60.0)
+        await asyncio.gather(*(rollups.day_summary() for _ in range(5)))
+        rollups.invalidate()
+        await rollups.day_summary()
+        return rollups
+
+    rollups = asyncio.run(scenario())
+    assert rollups.reads == 2
+    assert rollups.hits == 4 and rollups.misses == 2
+
+
+def test_past_days_are_not_cached():
+    async def scenario():
+        rollups = CountingRollups(cache_seconds=60.0)
+        await rollups.day_summary(DAY)
+        await rollups.day_summary(DAY)
+        return rollups
+
+    assert asyncio.run(scenario()).reads == 2
+
+
+class FakeConnection:
+    def __init__(self, triggers):
+        self.triggers = triggers
+        self.created = False
+
+    async def run_sync(self, fn):
+        self.created = True
+
+    async def execute(self, statement, params):
+        found = [name for name in params["names"] if name in self.triggers]
+        return type("Result", (), {"scalars": lambda self: type("Scalars", (), {"all": lambda self: found})()})()
+
+
+class FakeEngine:
+    def __init__(self, triggers):
+        self.conn = FakeConnection(triggers)
+
+    def begin(self):
+        conn = self.conn
+
+        class Begin:
+            async def __aenter__(self):
+                return conn
+
+            async def __aexit__(self, *exc):
+                pass
+        return Begin()
+
+
+def test_startup_fails_loudly_without_the_rollup_triggers(monkeypatch):
+    engine = FakeEngine({"trg_rollup_orders_insert"})
+    monkeypatch.setattr(connection, "engine", engine)
+
+    with pytest.raises(RuntimeError, match="trg_rollup_order_items_insert.*setup_db.py"):
+        asyncio.run(connection.init_db())
+    assert engine.conn.created
+
+
+def test_startup_succeeds_with_the_rollup_triggers_installed(monkeypatch):
+    monkeypatch.setattr(connection, "engine", FakeEngine(set(connection.REQUIRED_TRIGGERS)))
+
+    asyncio.run(connection.init_db())
@@ -0,0 +1,112 @@
+import asyncio
+# Añadir la raíz del proyecto al path para que Python encuentre los módulos de la app
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from datetime import timedelta
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import postgresql
+
+from app.services import session_janitor as janitor_module
+from app.services.session_janitor import SessionJanitor
+
+
+class FakeSession:
+    """Sesión que devuelve en cada DELETE el siguiente recuento de `counts` de su tabla."""
+
+    def __init__(self, counts, statements):
+        self.counts = counts
+        self.statements = statements
+        self.commits = 0
+
+    async def execute(self, statement):
+        self.statements.append(statement)
+        table = statement.table.name
+        return SimpleNamespace(rowcount=self.counts[table].pop(0))
+
+    async def commit(self):
+        self.commits += 1
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+
+def fake_sessions(monkeypatch, counts):
+    statements, sessions = [], []
+
+    def session_factory():
+        sessions.append(FakeSession(counts, statements))
+        return sessions[-1]
+
+    monkeypatch.setattr(janitor_module, "async_session", session_factory)
+    return statements, sessions
+
+
+def test_batches_continue_while_full_and_stop_at_max_batches(monkeypatch):
+    counts = {"user_sessions": [2, 2, 1], "magic_links": [2, 2, 2, 2]}
+    statements, sessions = fake_sessions(monkeypatch, counts)
+    janitor = SessionJanitor(batch_size=2, max_batches=3, batch_pause_seconds=0)
+
+    deleted = asyncio.run(janitor.purge_once())
+
+    # Las sesiones terminan con un lote incompleto; los magic links, al llegar a max_batches
+    assert deleted == {"user_sessions": 5, "magic_links": 6}
+    assert counts == {"user_sessions": [], "magic_links": [2]}
+    # Cada lote en su propia transacción
+    assert len(sessions) == 6 and all(session.commits == 1 for session in sessions)
+    assert janitor.stats() == {"running": False, "rounds": 1,
+                               "deleted": {"user_sessions": 5, "magic_links": 6}}
+
+
+def test_batch_deletes_expired_rows_past_retention_skipping_locked_ones(monkeypatch):
+    statements, _ = fake_sessions(monkeypatch, {"user_sessions": [0], "magic_links": [0]})
+
+    asyncio.run(SessionJanitor(retention_hours=24, batch_size=500).purge_once())
+
+    compiled = statements[0].compile(dialect=postgresql.dialect())
+    sql = " ".join(str(compiled).split())
+    assert sql.startswith("DELETE FROM user_sessions WHERE user_sessions.id IN (SELECT user_sessions.id")
+    assert "user_sessions.expires_at < now() - %(now_1)s" in sql
+    assert "FOR UPDATE SKIP LOCKED" in sql
+    assert compiled.params["now_1"] == timedelta(hours=24)
+    assert compiled.params["param_1"] == 500
+    assert statements[1].table.name == "magic_links"
+
+
+def test_loop_survives_errors_and_stops_on_cancel(monkeypatch):
+    rounds = []
+
+    async def purge_once():
+        rounds.append(None)
+        if len(rounds) == 1:
+            raise ConnectionError("database is down")
+
+    janitor = SessionJanitor(interval_seconds=0.005)
+    monkeypatch.setattr(janitor, "purge_once", purge_once)
+
+    async def scenario():
+        await janitor.start()
+        running = janitor.stats()["running"]
+        await asyncio.sleep(0.05)
+        await janitor.stop()
+        stopped_at = len(rounds)
+        await asyncio.sleep(0.02)
+        return running, stopped_at
+
+    running, stopped_at = asyncio.run(scenario())
+    assert running and not janitor.stats()["running"]
+    # Tras el error sigue limpiando, y tras stop() ya no
+    assert stopped_at >= 2 and len(rounds) == stopped_at
+
+
+def test_janitor_is_disabled_with_a_zero_interval():
+    janitor = SessionJanitor(interval_seconds=0)
+
+    asyncio.run(janitor.start())
+
+    assert not janitor.stats()["running"]
@@ -0,0 +1,105 @@
+import asyncio
+import pytest
+# Añadir la raíz del proyecto al path para que Python encuentre los módulos de la app
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from types import SimpleNamespace
+
+from telegram.error import BadRequest, NetworkError
+
+from app.services import telegram_stream
+from app.services.telegram_stream import stream_reply
+
+
+class FakeBot:
+    def __init__(self, edit_error: Exception = None):
+        self.edit_error = edit_error
+        self.calls = []
+
+    async def send_message(self, chat_id, text):
+        self.calls.append(("send", text))
+        return SimpleNamespace(message_id=len(self.calls))
+
+    async def edit_message_text(self, chat_id, message_id, text):
+        self.calls.append(("edit", text))
+        if self.edit_error is not None:
+            raise self.edit_error
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(telegram_stream, "time", SimpleNamespace(monotonic=clock))
+    return clock
+
+
+async def timed_chunks(clock: Clock, chunks):
+    """Un fragmento cada 0,4 s."""
+    for chunk in chunks:
+        clock.now += 0.4
+        yield chunk
+
+
+def reply(bot, clock, chunks, **kwargs):
+    return asyncio.run(stream_reply(bot, 1, timed_chunks(clock, chunks), edit_interval=1.0, min_first_chars=5, **kwargs))
+
+
+def test_edits_are_throttled_and_the_rest_is_flushed_at_the_end(clock):
+    bot = FakeBot()
+
+    text = reply(bot, clock, ["Hola, ", "¿qué ", "te ", "sirvo ", "hoy?"])
+
+    assert text == "Hola, ¿qué te sirvo hoy?"
+    # Envío a los 0,4 s, una edición a los 1,6 s y la final con lo que quedó pendiente
+    assert bot.calls == [
+        ("send", "Hola, "),
+        ("edit", "Hola, ¿qué te sirvo "),
+        ("edit", "Hola, ¿qué te sirvo hoy?"),
+    ]
+
+
+def test_short_reply_is_sent_once(clock):
+    bot = FakeBot()
+
+    reply(bot, clock, ["Sí", "."])
+
+    assert bot.calls == [("send", "Sí.")]
+
+
+def test_failed_edit_falls_back_to_a_single_send(clock):
+    bot = FakeBot(edit_error=BadRequest("Message to edit not found"))
+
+    reply(bot, clock, ["Hola, ", "¿qué ", "te ", "sirvo ", "hoy?"])
+
+    # Tras el primer fallo no se vuelve a editar: el texto completo va en un mensaje nuevo
+    assert bot.calls == [
+        ("send", "Hola, "),
+        ("edit", "Hola, ¿qué te sirvo "),
+        ("send", "Hola, ¿qué te sirvo hoy?"),
+    ]
+
+
+def test_network_error_on_the_final_edit_sends_the_text(clock):
+    bot = FakeBot(edit_error=NetworkError("connection reset"))
+
+    reply(bot, clock, ["Hola, ", "mundo"])
+
+    assert bot.calls == [("send", "Hola, "), ("edit", "Hola, mundo"), ("send", "Hola, mundo")]
+
+
+def test_unmodified_message_is_not_resent(clock):
+    bot = FakeBot(edit_error=BadRequest("Message is not modified"))
+
+    reply(bot, clock, ["Hola, ", "¿qué ", "te ", "sirvo ", "hoy?"])
+
+    assert [call for call, _ in bot.calls] == ["send", "edit", "edit"]
@@ -0,0 +1,38 @@
+import pytest
+# Añadir la raíz del proyecto al path para que Python encuentre los módulos de la app
+import sys
+import os
+from datetime import datetime
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.ticket_template import FEED_AND_CUT, INIT, LAYOUTS, TicketTemplate, layout_for_printer
+
+ORDER = {
+    "id": 42,
+    "v_cliente_test": "Ana",
+    "v_importe_total": 33.0,
+    "items": [
+        {"v_cantidad": 2, "v_producto_test": "Pizza Pepperoni Grande", "v_precio": 12.5},
+        {"v_cantidad": 1, "v_producto_test": "Ensalada César", "v_precio": 8.0, "v_notas": "sin crutones"},
+    ],
+}
+
+
+@pytest.mark.parametrize("name, expected", [("POS-58", "58mm"), ("POS-80", "80mm"), ("", "58mm")])
+def test_layout_from_printer_name(name, expected):
+    assert layout_for_printer(name).name == expected
+
+
+@pytest.mark.parametrize("paper", ["58mm", "80mm"])
+def test_render_single_buffer_fits_paper_width(paper):
+    layout = LAYOUTS[paper]
+    ticket = TicketTemplate(layout).render(ORDER, printed_at=datetime(2024, 5, 1, 12, 30))
+
+    assert ticket.startswith(INIT) and ticket.endswith(FEED_AND_CUT)
+    text = ticket.decode(layout.encoding, errors="ignore")
+    assert "Orden #: 42" in text
+    assert "Ensalada César" in text
+    assert "TOTAL: $33.00" in text
+    for line in text.split("\n"):
+        printable = "".join(ch for ch in line if ch.isprintable())
+        assert len(printable) <= layout.width + 4  # comandos ESC/POS incrustados
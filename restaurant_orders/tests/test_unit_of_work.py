@@ -0,0 +1,81 @@
+import asyncio
+import pytest
+# Añadir la raíz del proyecto al path para que Python encuentre los módulos de la app
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.database.unit_of_work import UnitOfWork, get_current_unit_of_work, unit_of_work
+
+
+class FakeSession:
+    def __init__(self, log: list):
+        self.log = log
+
+    async def commit(self):
+        self.log.append("commit")
+
+    async def rollback(self):
+        self.log.append("rollback")
+
+    async def close(self):
+        self.log.append("close")
+
+
+class SessionFactory:
+    def __init__(self):
+        self.created = 0
+        self.log = []
+
+    def __call__(self):
+        self.created += 1
+        return FakeSession(self.log)
+
+
+def test_one_session_is_shared_and_committed_on_success():
+    factory = SessionFactory()
+
+    async def scenario():
+        async with UnitOfWork(session_factory=factory) as uow:
+            first = uow.session
+            uow.memo["chat_auth"] = None
+            assert uow.session is first
+        return uow
+
+    uow = asyncio.run(scenario())
+    assert factory.created == 1
+    assert factory.log == ["commit", "close"]
+    assert uow.memo == {}
+
+
+def test_error_rolls_back_and_closes():
+    factory = SessionFactory()
+
+    async def scenario():
+        async with UnitOfWork(session_factory=factory) as uow:
+            uow.session
+            raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        asyncio.run(scenario())
+    assert factory.log == ["rollback", "close"]
+
+
+def test_unused_unit_of_work_never_opens_a_session():
+    factory = SessionFactory()
+
+    async def scenario():
+        async with UnitOfWork(session_factory=factory):
+            pass
+
+    asyncio.run(scenario())
+    assert factory.created == 0
+
+
+def test_unit_of_work_is_published_in_the_context():
+    async def scenario():
+        async with unit_of_work() as uow:
+            assert get_current_unit_of_work() is uow
+        assert get_current_unit_of_work() is None
+
+    asyncio.run(scenario())
@@ -0,0 +1,132 @@
+import asyncio
+import pytest
+# Añadir la raíz del proyecto al path para que Python encuentre los módulos de la app
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from types import SimpleNamespace
+
+from fastapi import HTTPException
+
+from app.config import settings
+from app.services import update_dedup
+from app.services.update_dedup import UpdateDeduplicator
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def scalar(self):
+        return self.rows[0] if self.rows else None
+
+    def scalars(self):
+        return SimpleNamespace(all=lambda: list(self.rows))
+
+
+class FakeSession:
+    """Sesión que devuelve `rows` en cada consulta y anota commits y rollbacks."""
+
+    def __init__(self, rows=(), fail: bool = False):
+        self.rows = list(rows)
+        self.fail = fail
+        self.statements = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    async def execute(self, statement):
+        if self.fail:
+            raise ConnectionError("database is down")
+        self.statements.append(statement)
+        return FakeResult(self.rows)
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+
+def test_memory_window_rejects_repeats_and_evicts_the_oldest():
+    dedup = UpdateDeduplicator(capacity=2)
+
+    assert dedup.remember(1) and dedup.remember(2)
+    assert not dedup.remember(1)
+    # 1 se acaba de ver: el más antiguo es 2
+    assert dedup.remember(3)
+    assert dedup.remember(2)
+    assert not dedup.remember(3)
+    assert dedup.stats()["tracked_in_memory"] == 2
+    assert dedup.duplicates_in_memory == 2
+
+
+def test_db_claim_lost_to_another_worker_is_a_duplicate():
+    dedup = UpdateDeduplicator()
+    won = SimpleNamespace(session=FakeSession(rows=[10]))
+    lost = SimpleNamespace(session=FakeSession(rows=[]))
+
+    assert asyncio.run(dedup.claim(won, 10))
+    # ON CONFLICT DO NOTHING no devuelve fila: otro proceso lo insertó antes
+    assert not asyncio.run(dedup.claim(lost, 10))
+    assert lost.session.commits == 1
+    assert dedup.duplicates_in_db == 1
+
+
+def test_db_failure_processes_the_update_anyway():
+    dedup = UpdateDeduplicator()
+    uow = SimpleNamespace(session=FakeSession(fail=True))
+
+    assert asyncio.run(dedup.claim(uow, 10))
+    assert uow.session.rollbacks == 1
+
+
+def test_claims_prune_old_updates_periodically():
+    dedup = UpdateDeduplicator(prune_every=2)
+    uow = SimpleNamespace(session=FakeSession(rows=[1]))
+
+    for update_id in (1, 2, 3):
+        asyncio.run(dedup.claim(uow, update_id))
+
+    deletes = [statement for statement in uow.session.statements if statement.is_delete]
+    assert len(deletes) == 1
+
+
+def test_load_recent_fills_the_memory_window(monkeypatch):
+    # La consulta devuelve los update_id de más reciente a más antiguo
+    monkeypatch.setattr(update_dedup, "async_session", lambda: FakeSession(rows=[30, 20, 10]))
+    dedup = UpdateDeduplicator(capacity=3)
+
+    asyncio.run(dedup.load_recent())
+
+    assert list(dedup._seen) == [10, 20, 30]
+    assert not dedup.remember(20)
+    # El más antiguo sale primero al llegar updates nuevos
+    assert dedup.remember(40) and dedup.remember(10)
+
+
+@pytest.fixture
+def webhook(monkeypatch):
+    monkeypatch.setattr(settings, "MODEL_KEY", "test-key")
+    from app.api.routes import webhook
+    monkeypatch.setattr(webhook, "update_deduplicator", UpdateDeduplicator())
+    return webhook
+
+
+def test_update_rejected_by_a_full_queue_is_forgotten(webhook, monkeypatch):
+    monkeypatch.setattr(webhook.update_dispatcher, "enqueue", lambda update: False)
+
+    with pytest.raises(HTTPException) as rejected:
+        asyncio.run(webhook.telegram_webhook({"update_id": 7}))
+    assert rejected.value.status_code == 503
+
+    # El reintento de Telegram se acepta en lugar de confirmarse como duplicado
+    monkeypatch.setattr(webhook.update_dispatcher, "enqueue", lambda update: True)
+    assert asyncio.run(webhook.telegram_webhook({"update_id": 7})) == {"status": "queued"}
+    assert asyncio.run(webhook.telegram_webhook({"update_id": 7})) == {"status": "duplicate"}
@@ -0,0 +1,83 @@
+import asyncio
+# Añadir la raíz del proyecto al path para que Python encuentre los módulos de la app
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.services.update_queue import UpdateDispatcher
+
+
+def make_update(update_id: int, chat_id: int) -> dict:
+    return {"update_id": update_id, "message": {"chat": {"id": chat_id}, "text": f"mensaje {update_id}"}}
+
+
+def test_updates_of_a_chat_keep_their_order_while_chats_run_in_parallel():
+    handled = []
+    active = set()
+    overlapped = []
+
+    async def handler(update):
+        chat_id = update["message"]["chat"]["id"]
+        assert chat_id not in active, "dos updates del mismo chat a la vez"
+        active.add(chat_id)
+        if len(active) > 1:
+            overlapped.append(True)
+        await asyncio.sleep(0.01)
+        active.discard(chat_id)
+        handled.append((chat_id, update["update_id"]))
+
+    async def scenario():
+        dispatcher = UpdateDispatcher(handler, workers=4, maxsize=100)
+        await dispatcher.start()
+        for update_id in range(12):
+            assert dispatcher.enqueue(make_update(update_id, chat_id=update_id % 2))
+        await dispatcher.stop()
+        return dispatcher
+
+    dispatcher = asyncio.run(scenario())
+    assert dispatcher.processed == 12
+    assert dispatcher.parked == 0
+    for chat_id in (0, 1):
+        ids = [update_id for chat, update_id in handled if chat == chat_id]
+        assert ids == sorted(ids) and len(ids) == 6
+    assert overlapped
+
+
+def test_full_queue_rejects_updates():
+    async def scenario():
+        dispatcher = UpdateDispatcher(lambda update: asyncio.sleep(0), workers=1, maxsize=2)
+        results = [dispatcher.enqueue(make_update(i, chat_id=i)) for i in range(3)]
+        return dispatcher, results
+
+    dispatcher, results = asyncio.run(scenario())
+    assert results == [True, True, False]
+    assert dispatcher.rejected == 1
+
+
+def test_parked_updates_of_a_flooding_chat_count_against_the_limit():
+    release = None
+
+    async def handler(update):
+        await release.wait()
+
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        dispatcher = UpdateDispatcher(handler, workers=4, maxsize=5)
+        await dispatcher.start()
+        accepted = 0
+        for update_id in range(20):
+            accepted += dispatcher.enqueue(make_update(update_id, chat_id=42))
+            # Deja que los workers saquen updates de la cola y los aparquen
+            await asyncio.sleep(0)
+        parked = dispatcher.parked
+        release.set()
+        await dispatcher.stop()
+        return dispatcher, accepted, parked
+
+    dispatcher, accepted, parked = asyncio.run(scenario())
+    # Uno en curso más como mucho `maxsize` esperando, entre cola y aparcados
+    assert accepted <= 6
+    assert parked > 0
+    assert dispatcher.rejected == 20 - accepted
+    assert dispatcher.processed == accepted